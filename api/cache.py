@@ -1,21 +1,42 @@
 import time
-from typing import Any
+from typing import Any, Callable
 
-_cache: dict[str, tuple[float, Any]] = {}
+from gmail_parser.store import get_store
+
+# Entries are (stored at, store version, value). A write to the store from any
+# process bumps its version, so entries never outlive the data they were
+# computed from; invalidate() is only needed for state kept outside the store
+# (rules and override JSON files).
+_cache: dict[str, tuple[float, int, Any]] = {}
+_listeners: list[Callable[[tuple[str, ...]], None]] = []
 
 
 def get(key: str, ttl: int = 60) -> Any | None:
     if key in _cache:
-        ts, val = _cache[key]
-        if time.time() - ts < ttl:
+        ts, version, val = _cache[key]
+        if time.time() - ts < ttl and version == get_store().version():
             return val
     return None
 
 
 def set(key: str, val: Any):
-    _cache[key] = (time.time(), val)
+    _cache[key] = (time.time(), get_store().version(), val)
 
 
 def invalidate(*keys: str):
+    """Drop each key along with its scoped variants ("<key>:<scope>")."""
     for k in keys:
         _cache.pop(k, None)
+        for scoped in [c for c in _cache if c.startswith(f"{k}:")]:
+            _cache.pop(scoped, None)
+    for listener in _listeners:
+        listener(keys)
+
+
+def clear():
+    _cache.clear()
+
+
+def add_listener(fn: Callable[[tuple[str, ...]], None]):
+    """Call fn(keys) on every invalidate, e.g. to forward it to another process."""
+    _listeners.append(fn)
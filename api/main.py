@@ -1,4 +1,5 @@
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import Depends, FastAPI
@@ -7,6 +8,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from starlette.middleware.sessions import SessionMiddleware
 
+from api import worker
 from api.deps import require_auth
 from api.log_buffer import log_buffer
 from api.routers import (
@@ -20,14 +22,30 @@ from api.routers import (
     expenses,
     rules,
     digest,
+    push,
 )
 from api.settings import settings
+from gmail_parser.store import close_stores, get_store
 
 # Attach in-process log capture to all gmail_parser loggers
 logging.getLogger("gmail_parser").addHandler(log_buffer)
 logging.getLogger("gmail_parser").setLevel(logging.INFO)
 
-app = FastAPI(title="Gmail Dashboard API")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Open Chroma and load the metadata mirror now rather than in the first request
+    get_store().metadata_mirror()
+    if settings.ingest_worker == "off":
+        sync.start_background()
+    else:
+        worker.start(spawn=settings.ingest_worker == "spawn")
+    yield
+    worker.stop()
+    close_stores()
+
+
+app = FastAPI(title="Gmail Dashboard API", lifespan=lifespan)
 
 app.add_middleware(
     SessionMiddleware,
@@ -45,6 +63,7 @@ app.add_middleware(
 )
 
 app.include_router(auth.router, prefix="/api/auth")
+app.include_router(push.router, prefix="/api/push")
 app.include_router(
     sync.router, prefix="/api/sync", dependencies=[Depends(require_auth)]
 )
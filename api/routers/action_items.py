@@ -6,7 +6,7 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 
 from gmail_parser.config import settings
-from gmail_parser.store import EmailStore
+from gmail_parser.store import get_store
 
 router = APIRouter()
 
@@ -21,17 +21,13 @@ def _load_dismissed() -> set[str]:
 
 @router.get("")
 def get_action_items():
-    store = EmailStore()
-    try:
-        result = store.get_emails(where={"has_action_items": {"$eq": True}})
-    except Exception:
-        result = {"ids": [], "metadatas": []}
+    emails = get_store().metadata_mirror().select(lambda m: m.get("has_action_items") is True)
 
     dismissed = _load_dismissed()
     today = date.today().isoformat()
 
     actions = []
-    for gmail_id, metadata in zip(result["ids"], result["metadatas"]):
+    for gmail_id, metadata in emails:
         items = json.loads(metadata.get("action_items_json", "[]"))
         for item in items:
             key = f"{gmail_id}:{item['action']}"
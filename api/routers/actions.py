@@ -1,10 +1,12 @@
 import logging
+from collections.abc import Iterator
 
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from gmail_parser.auth import GmailAuth
 from gmail_parser.client import GmailClient
-from gmail_parser.store import EmailStore
+from gmail_parser.store import get_store
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -12,6 +14,36 @@ logger = logging.getLogger(__name__)
 _PREVIEW = {"preview": True}
 
 
+def gmail_clients(ids: list[str]) -> Iterator[tuple[str, GmailClient, list[str]]]:
+    """(account id, Gmail client, the ids it owns) for each account that owns some of `ids`."""
+    for account_id, account_ids in get_store().ids_by_account(ids).items():
+        yield account_id, GmailClient(GmailAuth(account_id=account_id)), account_ids
+
+
+def label_id_for(client: GmailClient, label_name: str) -> str:
+    """The id of the account's label called `label_name`, created if it doesn't exist."""
+    labels = client.list_labels()
+    label_id = next((l["id"] for l in labels if l["name"] == label_name), None)
+    return label_id or client.create_label(label_name)["id"]
+
+
+def record_labels(ids: list[str], add: tuple[str, ...] = (), remove: tuple[str, ...] = ()):
+    """Apply a Gmail label change to the stored metadata of `ids`, as the next sync would."""
+    store = get_store()
+    metadatas = store.get_metadatas(ids)
+    ids = [gid for gid in ids if gid in metadatas]
+    updates = []
+    for gid in ids:
+        names = [n for n in metadatas[gid].get("labels", "").strip("|").split("|") if n and n not in remove]
+        names += [n for n in add if n not in names]
+        update = {"labels": "|" + "|".join(names) + "|" if names else ""}
+        if "UNREAD" in remove:
+            update["is_read"] = True
+        updates.append(update)
+    if ids:
+        store.update_metadatas_batch(ids, updates)
+
+
 class IdsRequest(BaseModel):
     ids: list[str]
     confirm: bool = False
@@ -33,10 +65,10 @@ def trash_emails(req: IdsRequest):
     if not req.confirm:
         return {**_PREVIEW, "would_trash": len(req.ids), "ids": req.ids}
     logger.info("[actions/trash] trashing %d messages: %s", len(req.ids), req.ids)
-    client = GmailClient()
-    for mid in req.ids:
-        client.trash_message(mid)
-    store = EmailStore()
+    for _, client, ids in gmail_clients(req.ids):
+        for mid in ids:
+            client.trash_message(mid)
+    store = get_store()
     store.delete_emails(req.ids)
     store.delete_expenses(req.ids)
     logger.info("[actions/trash] done — %d messages trashed", len(req.ids))
@@ -48,9 +80,10 @@ def mark_read(req: IdsRequest):
     if not req.confirm:
         return {**_PREVIEW, "would_mark_read": len(req.ids), "ids": req.ids}
     logger.info("[actions/mark-read] marking %d messages as read", len(req.ids))
-    client = GmailClient()
-    for mid in req.ids:
-        client.modify_message(mid, remove_labels=["UNREAD"])
+    for _, client, ids in gmail_clients(req.ids):
+        for mid in ids:
+            client.modify_message(mid, remove_labels=["UNREAD"])
+    record_labels(req.ids, remove=("UNREAD",))
     logger.info("[actions/mark-read] done")
     return {"marked_read": len(req.ids)}
 
@@ -69,20 +102,20 @@ def apply_label(req: LabelRequest):
         req.label_name,
         len(req.ids),
     )
-    client = GmailClient()
-    labels = client.list_labels()
-    label_id = next((l["id"] for l in labels if l["name"] == req.label_name), None)
-    if not label_id:
-        label_id = client.create_label(req.label_name)["id"]
-    for mid in req.ids:
-        client.modify_message(mid, add_labels=[label_id])
-    logger.info("[actions/label] done — label_id=%s", label_id)
-    return {"labeled": len(req.ids), "label_id": label_id}
+    # Each account has its own label ids
+    label_ids = {}
+    for account_id, client, ids in gmail_clients(req.ids):
+        label_id = label_ids[account_id] = label_id_for(client, req.label_name)
+        for mid in ids:
+            client.modify_message(mid, add_labels=[label_id])
+    record_labels(req.ids, add=(req.label_name,))
+    logger.info("[actions/label] done — label_ids=%s", label_ids)
+    return {"labeled": len(req.ids), "label_ids": label_ids}
 
 
 @router.post("/trash-sender")
 def trash_sender(req: SenderRequest):
-    store = EmailStore()
+    store = get_store()
     result = store.get_emails(where={"sender": req.sender})
     ids = result["ids"]
     if not req.confirm:
@@ -90,9 +123,9 @@ def trash_sender(req: SenderRequest):
     logger.info(
         "[actions/trash-sender] trashing %d messages from '%s'", len(ids), req.sender
     )
-    client = GmailClient()
-    for mid in ids:
-        client.trash_message(mid)
+    for _, client, account_ids in gmail_clients(ids):
+        for mid in account_ids:
+            client.trash_message(mid)
     store.delete_emails(ids)
     store.delete_expenses(ids)
     logger.info("[actions/trash-sender] done — %d trashed", len(ids))
@@ -1,14 +1,22 @@
 import re
-from collections import Counter, defaultdict
+from collections import Counter
 from datetime import datetime, timezone, timedelta
 
+import numpy as np
 from fastapi import APIRouter, Query
 
 from api import cache
 from api.routers.alert_rules import load_rules
 from gmail_parser.categorizer import ALL_CATEGORIES, NOISE
-from gmail_parser.search import EmailSearch
-from gmail_parser.store import EmailStore
+from gmail_parser.columns import (
+    FLAG_ATTACHMENTS,
+    FLAG_HAS_DATE,
+    FLAG_READ,
+    FLAG_STARRED,
+    ColumnView,
+)
+from gmail_parser.search import EmailSearch, sender_summary
+from gmail_parser.store import get_store
 
 router = APIRouter()
 
@@ -26,113 +34,87 @@ _DO_KEYWORDS_RE = re.compile(
 _SUBSCRIPTION_LABELS = frozenset({"CATEGORY_PROMOTIONS", "CATEGORY_SOCIAL", "CATEGORY_UPDATES"})
 
 
+def _cache_key(name: str, account: str | None) -> str:
+    return f"{name}:{account}" if account else name
+
+
 @router.get("/overview")
-def overview():
-    cached = cache.get("overview", ttl=10)
+def overview(account: str | None = None):
+    key = _cache_key("overview", account)
+    cached = cache.get(key, ttl=10)
     if cached is not None:
         return cached
 
-    store = EmailStore()
-    metadatas = store.get_all_emails(include=["metadatas"])["metadatas"]
-
-    total = unread = starred = 0
-    month_counter: Counter = Counter()
-    cat_counter: Counter = Counter()
-    senders: dict[str, dict] = {}
-
-    for m in metadatas:
-        total += 1
-        if not m.get("is_read", True):
-            unread += 1
-        if m.get("is_starred", False):
-            starred += 1
-
-        date_iso = m.get("date_iso", "")
-        if date_iso:
-            try:
-                month_counter[datetime.fromisoformat(date_iso).strftime("%Y-%m")] += 1
-            except ValueError:
-                pass
-
-        cat = m.get("category", "Other")
-        if cat != NOISE:
-            cat_counter[cat] += 1
-
-        sender = m.get("sender", "")
-        if sender:
-            if sender not in senders:
-                senders[sender] = {"count": 0, "has_unsubscribe": False, "labels": set()}
-            s = senders[sender]
-            s["count"] += 1
-            if m.get("list_unsubscribe", ""):
-                s["has_unsubscribe"] = True
-            for lbl in m.get("labels", "").strip("|").split("|"):
-                if lbl:
-                    s["labels"].add(lbl)
-
-    subscription_count = sum(
-        1 for sender, s in senders.items()
-        if (
-            s["has_unsubscribe"]
-            or bool(_SUBSCRIPTION_RE.search(sender))
-            or bool(s["labels"] & _SUBSCRIPTION_LABELS)
-            or s["count"] >= 5
-        )
-    )
+    view = get_store().metadata_columns(account)
+    cat_counts = _category_counts(view)
 
     categories = sorted(
-        [{"category": cat, "count": cat_counter[cat]} for cat in ALL_CATEGORIES if cat_counter.get(cat, 0) > 0 and cat != NOISE],
+        [{"category": cat, "count": cat_counts[cat]} for cat in ALL_CATEGORIES if cat_counts.get(cat, 0) > 0 and cat != NOISE],
         key=lambda x: x["count"],
         reverse=True,
     )
 
     result = {
-        "total": total,
-        "unread": unread,
-        "starred": starred,
-        "subscription_count": subscription_count,
-        "monthly_volume": [{"period": p, "count": c} for p, c in sorted(month_counter.items())],
+        "total": len(view),
+        "unread": int((~view.has(FLAG_READ)).sum()),
+        "starred": int(view.has(FLAG_STARRED).sum()),
+        "subscription_count": int(sender_summary(view)["is_subscription"].sum()),
+        "monthly_volume": [
+            {"period": str(p), "count": int(c)}
+            for p, c in zip(*np.unique(_months(view, view.has(FLAG_HAS_DATE)), return_counts=True))
+        ],
         "categories": categories,
     }
-    cache.set("overview", result)
+    cache.set(key, result)
     return result
 
 
-@router.get("/senders")
-def get_senders(limit: int = Query(200, ge=1, le=1000)):
-    cached = cache.get("senders")
+def _category_counts(view: ColumnView, rows: np.ndarray | slice = slice(None)) -> dict[str, int]:
+    counts = np.bincount(view.category[rows], minlength=len(view.categories))
+    return {cat: int(c) for cat, c in zip(view.categories, counts) if c}
+
+
+def _months(view: ColumnView, rows: np.ndarray) -> np.ndarray:
+    """Calendar month (in the sender's timezone, like date_iso) of the selected rows."""
+    return view.local_seconds()[rows].astype("datetime64[s]").astype("datetime64[M]")
+
+
+def _sender_analytics(account: str | None) -> list[dict]:
+    key = _cache_key("senders", account)
+    cached = cache.get(key)
     if cached is None:
-        cached = EmailSearch().get_sender_analytics(limit=1000)
-        cache.set("senders", cached)
-    return cached[:limit]
+        cached = EmailSearch().get_sender_analytics(limit=1000, account_id=account)
+        cache.set(key, cached)
+    return cached
+
+
+@router.get("/senders")
+def get_senders(limit: int = Query(200, ge=1, le=1000), account: str | None = None):
+    return _sender_analytics(account)[:limit]
 
 
 @router.get("/subscriptions")
-def get_subscriptions():
-    cached = cache.get("senders")
-    if cached is None:
-        cached = EmailSearch().get_sender_analytics(limit=1000)
-        cache.set("senders", cached)
-    return [s for s in cached if s["is_subscription"]]
+def get_subscriptions(account: str | None = None):
+    return [s for s in _sender_analytics(account) if s["is_subscription"]]
 
 
 @router.get("/labels")
-def get_labels():
-    return EmailSearch().count_by_label()
+def get_labels(account: str | None = None):
+    return EmailSearch().count_by_label(account_id=account)
 
 
 @router.get("/categories")
-def get_categories():
-    store = EmailStore()
-    counter = Counter(m.get("category", "Other") for m in store.get_all_emails(include=["metadatas"])["metadatas"])
+def get_categories(account: str | None = None):
+    counter = _category_counts(get_store().metadata_columns(account))
     result = [{"category": cat, "count": counter[cat]} for cat in ALL_CATEGORIES if counter.get(cat, 0) > 0 and cat != NOISE]
     result.sort(key=lambda x: x["count"], reverse=True)
     return result
 
 
 @router.get("/alerts")
-def get_alerts(limit: int = Query(500, le=2000)):
-    cached = cache.get("alerts")
+def get_alerts(limit: int = Query(500, le=2000), account: str | None = None):
+    key = _cache_key("alerts", account)
+    cached = cache.get(key)
     if cached is not None:
         return cached[:limit]
 
@@ -145,14 +127,14 @@ def get_alerts(limit: int = Query(500, le=2000)):
     if not pinned_senders:
         return []
 
-    store = EmailStore()
-    all_emails = store.get_all_emails(include=["metadatas"])
+    store = get_store()
+    view = store.metadata_columns(account)
+    pinned_codes = [i for i, s in enumerate(view.senders) if s in pinned_senders]
+    matched = store.get_metadatas(view.ids_where(np.isin(view.sender, pinned_codes)))
     results = []
-    for id_, meta in zip(all_emails["ids"], all_emails["metadatas"]):
+    for id_, meta in matched.items():
         cat = meta.get("category", "Other")
         sender = meta.get("sender", "")
-        if sender not in pinned_senders:
-            continue
         results.append({
             "id": id_,
             "subject": meta.get("subject", ""),
@@ -163,27 +145,25 @@ def get_alerts(limit: int = Query(500, le=2000)):
         })
 
     results.sort(key=lambda x: x["date"], reverse=True)
-    cache.set("alerts", results)
+    cache.set(key, results)
     return results[:limit]
 
 
 @router.get("/triage")
-def get_triage(days: int = Query(7, ge=1, le=30)):
-    cache_key = f"triage_{days}"
+def get_triage(days: int = Query(7, ge=1, le=30), account: str | None = None):
+    cache_key = _cache_key(f"triage_{days}", account)
     cached = cache.get(cache_key, ttl=60)
     if cached is not None:
         return cached
 
-    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-    store = EmailStore()
-    all_emails = store.get_all_emails(include=["metadatas"])
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).timestamp()
+    store = get_store()
+    view = store.metadata_columns(account)
+    recent = store.get_metadatas(view.ids_where(view.has(FLAG_HAS_DATE) & (view.ts >= cutoff)))
 
     reply, do, read = [], [], []
-    for id_, meta in zip(all_emails["ids"], all_emails["metadatas"]):
+    for id_, meta in recent.items():
         date_iso = meta.get("date_iso", "")
-        if not date_iso or date_iso < cutoff:
-            continue
-
         sender = meta.get("sender", "")
         subject = meta.get("subject", "")
         category = meta.get("category", "Other")
@@ -217,96 +197,84 @@ def _extract_domain(sender: str) -> str | None:
 
 
 @router.get("/eda")
-def get_eda():
-    cached = cache.get("eda", ttl=10)
+def get_eda(account: str | None = None):
+    key = _cache_key("eda", account)
+    cached = cache.get(key, ttl=10)
     if cached is not None:
         return cached
 
-    store = EmailStore()
-    metadatas = store.get_all_emails(include=["metadatas"])["metadatas"]
+    view = get_store().metadata_columns(account)
+    n_cat = max(len(view.categories), 1)
+    n_senders = len(view.senders)
+
+    # Time distributions, in the sender's local time as date_iso shows it
+    dated = view.has(FLAG_HAS_DATE)
+    local = view.local_seconds()[dated]
+    dow = (local // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+    hour = local % 86400 // 3600
+    dow_counts = np.bincount(dow, minlength=7)
+    hour_counts = np.bincount(hour, minlength=24)
+    heatmap = np.bincount(dow * 24 + hour, minlength=7 * 24).reshape(7, 24)
+    months, month_idx = np.unique(_months(view, dated), return_inverse=True)
+    month_cat = np.bincount(
+        month_idx * n_cat + view.category[dated], minlength=len(months) * n_cat
+    ).reshape(len(months), n_cat)
+
+    # Everything else ignores noise
+    keep = view.category != view.category_code(NOISE)
+    category = view.category[keep]
+    is_read = view.has(FLAG_READ)[keep]
+    is_starred = view.has(FLAG_STARRED)[keep]
+    has_att = view.has(FLAG_ATTACHMENTS)[keep]
+    cat_count = np.bincount(category, minlength=n_cat)
+    cat_unread = np.bincount(category, weights=~is_read, minlength=n_cat)
+    cat_starred = np.bincount(category, weights=is_starred, minlength=n_cat)
+    cat_att = np.bincount(category, weights=has_att, minlength=n_cat)
+
+    sender = view.sender[keep]
+    sender_vol = np.bincount(sender, minlength=n_senders)
+    sender_unread = np.bincount(sender, weights=~is_read, minlength=n_senders)
+    if "" in view.senders:
+        sender_vol[view.senders.index("")] = 0
+    top_senders = [c for c in np.argsort(-sender_vol, kind="stable")[:15] if sender_vol[c]]
 
-    dow_counter: Counter = Counter()
-    hour_counter: Counter = Counter()
-    heatmap_counter: Counter = Counter()
-    cat_stats: dict = defaultdict(lambda: {"count": 0, "unread": 0, "starred": 0, "with_attachments": 0})
-    month_cat_counter: dict[str, Counter] = defaultdict(Counter)
-    sender_vol: Counter = Counter()
-    sender_unread: Counter = Counter()
     domain_counter: Counter = Counter()
-    total_read = total_starred = total_attachments = 0
-
-    for m in metadatas:
-        date_iso = m.get("date_iso", "")
-        if date_iso:
-            try:
-                dt = datetime.fromisoformat(date_iso)
-                dow_counter[dt.weekday()] += 1
-                hour_counter[dt.hour] += 1
-                heatmap_counter[(dt.weekday(), dt.hour)] += 1
-                month_cat_counter[dt.strftime("%Y-%m")][m.get("category", "Other")] += 1
-            except ValueError:
-                pass
-
-        cat = m.get("category", "Other")
-        if cat == NOISE:
-            continue
-        is_read = m.get("is_read", True)
-        is_starred = m.get("is_starred", False)
-        has_att = m.get("has_attachments", False)
-
-        cs = cat_stats[cat]
-        cs["count"] += 1
-        if is_read:
-            total_read += 1
-        else:
-            cs["unread"] += 1
-        if is_starred:
-            cs["starred"] += 1
-            total_starred += 1
-        if has_att:
-            cs["with_attachments"] += 1
-            total_attachments += 1
-
-        sender = m.get("sender", "")
-        if sender:
-            sender_vol[sender] += 1
-            if not is_read:
-                sender_unread[sender] += 1
-            domain = _extract_domain(sender)
-            if domain:
-                domain_counter[domain] += 1
+    for code in np.flatnonzero(sender_vol):
+        domain = _extract_domain(view.senders[code])
+        if domain:
+            domain_counter[domain] += int(sender_vol[code])
+
+    cat_codes = [c for c in np.argsort(-cat_count, kind="stable") if cat_count[c]]
+    top_cats = [view.categories[c] for c in cat_codes[:6]]
 
     # Category trend: last 12 months, top 6 categories by total
-    all_months = sorted(month_cat_counter.keys())[-12:]
-    top_cats = [cat for cat, _ in Counter({cat: s["count"] for cat, s in cat_stats.items()}).most_common(6)]
     monthly_by_category = [
-        {"period": m, **{cat: month_cat_counter[m].get(cat, 0) for cat in top_cats}}
-        for m in all_months
+        {"period": str(months[i]), **{view.categories[c]: int(month_cat[i, c]) for c in cat_codes[:6]}}
+        for i in range(len(months))[-12:]
     ]
 
-    total = len(metadatas)
+    total = len(view)
+    total_read = int(is_read.sum())
+    total_starred = int(is_starred.sum())
+    total_attachments = int(has_att.sum())
     result = {
-        "day_of_week": [{"day": _DOW_LABELS[i], "count": dow_counter.get(i, 0)} for i in range(7)],
-        "hour_of_day": [{"hour": i, "count": hour_counter.get(i, 0)} for i in range(24)],
-        "heatmap": [[heatmap_counter.get((dow, h), 0) for h in range(24)] for dow in range(7)],
-        "category_stats": sorted(
-            [
-                {
-                    "category": cat,
-                    "count": s["count"],
-                    "unread": s["unread"],
-                    "starred": s["starred"],
-                    "with_attachments": s["with_attachments"],
-                    "unread_pct": round(s["unread"] / s["count"] * 100, 1) if s["count"] else 0,
-                }
-                for cat, s in cat_stats.items()
-            ],
-            key=lambda x: x["count"],
-            reverse=True,
-        ),
+        "day_of_week": [{"day": _DOW_LABELS[i], "count": int(dow_counts[i])} for i in range(7)],
+        "hour_of_day": [{"hour": i, "count": int(hour_counts[i])} for i in range(24)],
+        "heatmap": heatmap.tolist(),
+        "category_stats": [
+            {
+                "category": view.categories[c],
+                "count": int(cat_count[c]),
+                "unread": int(cat_unread[c]),
+                "starred": int(cat_starred[c]),
+                "with_attachments": int(cat_att[c]),
+                "unread_pct": round(cat_unread[c] / cat_count[c] * 100, 1),
+            }
+            for c in cat_codes
+        ],
         "top_senders": [
-            {"sender": s, "count": c, "unread": sender_unread.get(s, 0)}
-            for s, c in sender_vol.most_common(15)
+            {"sender": view.senders[c], "count": int(sender_vol[c]), "unread": int(sender_unread[c])}
+            for c in top_senders
         ],
         "domain_distribution": [
             {"domain": d, "count": c} for d, c in domain_counter.most_common(15)
@@ -314,11 +282,11 @@ def get_eda():
         "monthly_by_category": monthly_by_category,
         "category_trend_keys": top_cats,
         "totals": {
-            "unique_senders": len(sender_vol),
+            "unique_senders": int(np.count_nonzero(sender_vol)),
             "read_rate": round(total_read / total * 100, 1) if total else 0,
             "attachment_rate": round(total_attachments / total * 100, 1) if total else 0,
             "starred_rate": round(total_starred / total * 100, 1) if total else 0,
         },
     }
-    cache.set("eda", result)
+    cache.set(key, result)
     return result
@@ -115,22 +115,11 @@ def _ensure_configured() -> None:
 
 
 def _post_login_sync():
-    """Kick off an incremental sync (or recent fallback) after login."""
+    """Kick off an incremental sync after login and resume a paused auto sync."""
     try:
-        from gmail_parser.ingestion import IngestionPipeline
-        from api.routers.sync import _run_incremental, _auto_sync, _lock
-        pipeline = IngestionPipeline()
-        state = pipeline._store.get_sync_state()
-        if state and state.get("last_history_id"):
-            logger.info("[auth] triggering incremental sync on login")
-            _run_incremental()
-        else:
-            logger.info("[auth] no history_id — skipping login sync (run full sync first)")
-        # Re-enable auto sync in case it was paused due to invalid_grant
-        with _lock:
-            if not _auto_sync["enabled"]:
-                _auto_sync["enabled"] = True
-                logger.info("[auth] re-enabled auto sync after login")
+        from api.routers.sync import resume_after_login
+
+        resume_after_login()
     except Exception as e:
         logger.warning("[auth] post-login sync failed: %s", e)
 
@@ -1,6 +1,7 @@
 import logging
 from collections import defaultdict
 
+import numpy as np
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
@@ -20,12 +21,11 @@ from gmail_parser.categorizer import (
     set_sender_category,
     set_subject_category,
 )
-from gmail_parser.store import EmailStore
+from gmail_parser.store import get_store
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-_CACHE_KEYS = ("overview", "categories", "senders", "alerts", "eda")
 
 
 @router.get("")
@@ -34,22 +34,22 @@ def list_categories():
     if cached is not None:
         return cached
 
-    store = EmailStore()
-    all_emails = store.get_all_emails(include=["metadatas"])
-
-    cat_senders: dict[str, dict[str, dict]] = defaultdict(
-        lambda: defaultdict(lambda: {"count": 0, "last_date": ""})
-    )
-    for meta in all_emails["metadatas"]:
-        cat = meta.get("category", "Other")
-        sender = meta.get("sender", "")
-        if not sender:
-            continue
-        entry = cat_senders[cat][sender]
-        entry["count"] += 1
-        date = meta.get("date_iso", "")
-        if date > entry["last_date"]:
-            entry["last_date"] = date
+    view = get_store().metadata_columns()
+
+    # Group rows by (category, sender), newest last within each group
+    no_sender = view.senders.index("") if "" in view.senders else -1
+    rows = np.flatnonzero(view.sender != no_sender)
+    pair = view.category[rows].astype(np.int64) * len(view.senders) + view.sender[rows]
+    order = rows[np.lexsort((view.ts[rows], pair))]
+    pairs, starts, counts = np.unique(np.sort(pair), return_index=True, return_counts=True)
+
+    cat_senders: dict[str, dict[str, dict]] = defaultdict(dict)
+    for key, start, count in zip(pairs, starts, counts):
+        cat, sender = divmod(int(key), len(view.senders))
+        cat_senders[view.categories[cat]][view.senders[sender]] = {
+            "count": int(count),
+            "last_date": view.iso(order[start + count - 1]),
+        }
 
     overrides = get_overrides()
     subject_overrides = get_subject_overrides()
@@ -104,7 +104,7 @@ def assign_category(req: AssignRequest):
     if req.category not in get_all_category_names():
         raise HTTPException(status_code=400, detail=f"Unknown category: {req.category}")
 
-    store = EmailStore()
+    store = get_store()
     if req.sender:
         set_sender_category(req.sender, req.category)
         result = store.get_emails(where={"sender": req.sender})
@@ -122,7 +122,7 @@ def assign_category(req: AssignRequest):
         logger.info("[assign_category] subject '%s' → %s (%d emails)", req.subject, req.category, len(ids))
         response = {"updated": len(ids), "subject": req.subject, "category": req.category}
 
-    cache.invalidate(*_CACHE_KEYS)
+    cache.invalidate("categories")
     return response
 
 
@@ -136,7 +136,7 @@ def remove_override(req: RemoveOverrideRequest):
     if not req.sender and not req.subject:
         raise HTTPException(status_code=400, detail="Either sender or subject is required")
 
-    store = EmailStore()
+    store = get_store()
     if req.sender:
         remove_sender_override(req.sender)
         result = store.get_emails(where={"sender": req.sender})
@@ -154,7 +154,7 @@ def remove_override(req: RemoveOverrideRequest):
         logger.info("[remove_override] subject '%s' removed (%d emails → Other)", req.subject, len(ids))
         response = {"removed": req.subject, "reassigned": len(ids)}
 
-    cache.invalidate(*_CACHE_KEYS)
+    cache.invalidate("categories")
     return response
 
 
@@ -193,16 +193,12 @@ def rename_category(req: RenameRequest):
 
     rename_custom_category(req.old_name, new_name)
 
-    store = EmailStore()
-    all_emails = store.get_all_emails(include=["metadatas"])
-    ids_to_update = [
-        eid for eid, meta in zip(all_emails["ids"], all_emails["metadatas"])
-        if meta.get("category") == req.old_name
-    ]
+    store = get_store()
+    ids_to_update = list(store.iter_ids(where={"category": req.old_name}))
     if ids_to_update:
         store.update_metadatas_batch(ids_to_update, [{"category": new_name}] * len(ids_to_update))
 
-    cache.invalidate(*_CACHE_KEYS)
+    cache.invalidate("categories")
     logger.info("[rename_category] %s → %s (%d emails)", req.old_name, new_name, len(ids_to_update))
     return {"renamed": len(ids_to_update), "old_name": req.old_name, "new_name": new_name}
 
@@ -217,15 +213,11 @@ def delete_category(name: str):
 
     delete_custom_category(name)
 
-    store = EmailStore()
-    all_emails = store.get_all_emails(include=["metadatas"])
-    ids_to_update = [
-        eid for eid, meta in zip(all_emails["ids"], all_emails["metadatas"])
-        if meta.get("category") == name
-    ]
+    store = get_store()
+    ids_to_update = list(store.iter_ids(where={"category": name}))
     if ids_to_update:
         store.update_metadatas_batch(ids_to_update, [{"category": "Other"}] * len(ids_to_update))
 
-    cache.invalidate(*_CACHE_KEYS)
+    cache.invalidate("categories")
     logger.info("[delete_category] %s deleted, %d emails → Other", name, len(ids_to_update))
     return {"deleted": name, "reassigned": len(ids_to_update)}
@@ -4,8 +4,9 @@ import io
 
 from gmail_parser.auth import GmailAuth
 from gmail_parser.client import GmailClient
-from gmail_parser.search import EmailSearch, SearchFilters
-from gmail_parser.store import EmailStore
+from gmail_parser.exceptions import SearchError
+from gmail_parser.search import EmailSearch, SearchFilters, make_cursor
+from gmail_parser.store import get_store
 
 router = APIRouter()
 
@@ -21,6 +22,8 @@ def list_emails(
     starred: bool | None = None,
     search: str | None = None,
     mode: str = "hybrid",
+    account: str | None = None,
+    cursor: str | None = None,
 ):
     search_obj = EmailSearch()
 
@@ -39,14 +42,28 @@ def list_emails(
         category=category,
         is_read=None if unread is None else not unread,
         is_starred=starred,
+        account_id=account,
     )
-    results = search_obj.filter_emails(filters, limit=limit, offset=(page - 1) * limit)
-    return {"emails": results, "page": page, "limit": limit}
+    # `cursor` (the previous response's next_cursor) is cheaper than `page` for deep pages
+    try:
+        results = search_obj.filter_emails(
+            filters, limit=limit, offset=0 if cursor else (page - 1) * limit, cursor=cursor
+        )
+    except SearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = make_cursor(results[-1]) if len(results) == limit else None
+    return {"emails": results, "page": page, "limit": limit, "next_cursor": next_cursor}
+
+
+def _client_for(gmail_id: str) -> GmailClient:
+    """A Gmail client for the account the email belongs to."""
+    (account_id,) = get_store().ids_by_account([gmail_id])
+    return GmailClient(GmailAuth(account_id=account_id))
 
 
 @router.get("/{gmail_id}")
 def get_email(gmail_id: str):
-    email = EmailStore().get_email(gmail_id)
+    email = get_store().get_email(gmail_id)
     if not email:
         raise HTTPException(status_code=404, detail="Email not found")
     return email
@@ -54,11 +71,14 @@ def get_email(gmail_id: str):
 
 @router.get("/{gmail_id}/body")
 def get_email_body(gmail_id: str):
-    client = GmailClient(GmailAuth())
+    """The message body from Gmail; the stored plain-text body when Gmail can't be reached."""
     try:
-        raw = client.get_message(gmail_id, format="full")
+        raw = _client_for(gmail_id).get_message(gmail_id, format="full")
     except Exception as e:
-        raise HTTPException(status_code=502, detail=str(e))
+        stored = get_store().get_bodies([gmail_id])
+        if gmail_id not in stored:
+            raise HTTPException(status_code=502, detail=str(e))
+        return {"text": stored[gmail_id]}
     _, body_html = GmailClient._extract_body(raw.get("payload", {}))
     if body_html:
         return {"html": body_html}
@@ -68,7 +88,7 @@ def get_email_body(gmail_id: str):
 
 @router.get("/{gmail_id}/attachments")
 def list_attachments(gmail_id: str):
-    client = GmailClient(GmailAuth())
+    client = _client_for(gmail_id)
     try:
         raw = client.get_message(gmail_id, format="full")
     except Exception as e:
@@ -78,7 +98,7 @@ def list_attachments(gmail_id: str):
 
 @router.get("/{gmail_id}/attachments/{attachment_id}/download")
 def download_attachment(gmail_id: str, attachment_id: str, filename: str = "attachment", mime_type: str = "application/octet-stream"):
-    client = GmailClient(GmailAuth())
+    client = _client_for(gmail_id)
     try:
         data = client.download_attachment(gmail_id, attachment_id)
     except Exception as e:
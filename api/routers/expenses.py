@@ -12,15 +12,14 @@ from gmail_parser.embeddings import EmbeddingModel
 from gmail_parser.categorizer import categorize
 from gmail_parser.expenses import extract_expense
 from gmail_parser.config import settings as parser_settings
-from gmail_parser.store import EmailStore
+from gmail_parser.store import EmailStore, get_store
 
 router = APIRouter()
 
 
 def _get_llm_transactions(store: EmailStore) -> list[dict]:
-    result = store.get_emails(where={"has_transactions": {"$eq": True}})
     transactions = []
-    for gid, meta in zip(result["ids"], result["metadatas"]):
+    for gid, meta in store.metadata_mirror().select(lambda m: m.get("has_transactions") is True):
         spending_raw = meta.get("spending_json") or ""
         if not spending_raw:
             continue
@@ -173,7 +172,7 @@ def set_rules(rules: ExpenseRules):
 
 @router.post("/override")
 def override_expense(req: ExpenseOverride):
-    store = EmailStore()
+    store = get_store()
     embedding = EmbeddingModel()
 
     expense_id = req.gmail_id or f"manual_{uuid4().hex}"
@@ -204,7 +203,6 @@ def override_expense(req: ExpenseOverride):
     doc = f"{req.merchant} {req.category} {req.amount} {req.currency}".strip()
     vec = embedding.encode(doc)
     store.upsert_expenses_batch([expense_id], [doc], [vec], [meta])
-    cache.invalidate("expenses_overview", "expenses_tx")
     return {"id": expense_id, **meta}
 
 
@@ -214,7 +212,7 @@ def reprocess_expenses():
     rule_list = rules.get("rules", [])
     include_ids = set(rules.get("include_ids", []))
 
-    store = EmailStore()
+    store = get_store()
     embedding = EmbeddingModel()
 
     existing = store.get_all_expenses(include=["metadatas"])
@@ -226,10 +224,12 @@ def reprocess_expenses():
     if delete_ids:
         store.delete_expenses(delete_ids)
 
-    all_emails = store.get_all_emails(include=["documents", "metadatas"])
-    ids = all_emails["ids"]
-    docs = all_emails["documents"]
-    metas = all_emails["metadatas"]
+    emails = (
+        row
+        for page in store.iter_emails(include=["documents", "metadatas"])
+        for row in zip(page["ids"], page["documents"], page["metadatas"])
+    )
+    processed = 0
 
     expense_ids = []
     expense_docs = []
@@ -238,7 +238,8 @@ def reprocess_expenses():
     missing_amount = 0
     matched_samples = []  # (subject, sender) for emails that matched but had no amount
 
-    for gmail_id, doc, meta in zip(ids, docs, metas):
+    for gmail_id, doc, meta in emails:
+        processed += 1
         doc = doc or ""
         meta = dict(meta)
         meta["gmail_id"] = gmail_id
@@ -287,10 +288,8 @@ def reprocess_expenses():
     if expense_ids:
         vectors = embedding.encode_batch(expense_docs)
         store.upsert_expenses_batch(expense_ids, expense_docs, vectors, expense_metas)
-
-    cache.invalidate("expenses_overview", "expenses_tx")
     return {
-        "processed": len(ids),
+        "processed": processed,
         "matched": matched_total,
         "extracted": len(expense_ids),
         "missing_amount": missing_amount,
@@ -310,7 +309,7 @@ def list_transactions(
     date_from: str | None = None,
     date_to: str | None = None,
 ):
-    store = EmailStore()
+    store = get_store()
     txns = _get_llm_transactions(store)
 
     if merchant_category:
@@ -340,7 +339,7 @@ def overview():
     if cached is not None:
         return cached
 
-    store = EmailStore()
+    store = get_store()
     txns = _get_llm_transactions(store)
 
     totals: dict[str, float] = defaultdict(float)
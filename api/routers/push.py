@@ -0,0 +1,30 @@
+import hmac
+import logging
+
+from fastapi import APIRouter, HTTPException, Query
+
+from api.routers.sync import handle_push_notification
+from api.settings import settings
+from gmail_parser.exceptions import SyncError
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/gmail")
+def gmail_push(envelope: dict, token: str = Query("")):
+    """Pub/Sub push endpoint for Gmail watch notifications.
+
+    Not behind session auth — Pub/Sub authenticates with the shared `token`
+    query parameter configured in the subscription's push URL.
+    """
+    if not settings.push_token:
+        raise HTTPException(status_code=404, detail="Push notifications are not configured")
+    if not hmac.compare_digest(token, settings.push_token):
+        raise HTTPException(status_code=403, detail="Invalid push token")
+    try:
+        return handle_push_notification(envelope)
+    except SyncError as e:
+        # Acknowledge anyway: a non-2xx makes Pub/Sub redeliver the same bad message
+        logger.warning("[push] dropped notification: %s", e)
+        return {"accepted": False, "reason": str(e)}
@@ -4,10 +4,9 @@ from pathlib import Path
 from fastapi import APIRouter
 from pydantic import BaseModel
 
-from api import cache
-from gmail_parser.client import GmailClient
+from api.routers.actions import gmail_clients, label_id_for, record_labels
 from gmail_parser.config import settings as parser_settings
-from gmail_parser.store import EmailStore
+from gmail_parser.store import get_store
 
 router = APIRouter()
 
@@ -87,39 +86,40 @@ def set_rules(rules: RuleSet):
 @router.post("/run")
 def run_rules(req: RunRulesRequest):
     rules = _load_rules().get("rules", [])
-    store = EmailStore()
-    all_emails = store.get_all_emails(include=["metadatas"])
+    store = get_store()
 
+    # Collect matching ids before acting: trashing deletes from the store, which would shift pages
     matches: dict[str, list[str]] = {r["name"]: [] for r in rules}
-    for id_, meta in zip(all_emails["ids"], all_emails["metadatas"]):
-        for rule in rules:
-            if _rule_matches(rule, meta):
-                matches[rule["name"]].append(id_)
+    for page in store.iter_emails(include=["metadatas"]):
+        for id_, meta in zip(page["ids"], page["metadatas"]):
+            for rule in rules:
+                if _rule_matches(rule, meta):
+                    matches[rule["name"]].append(id_)
 
     if req.dry_run:
         return {"dry_run": True, "matches": {k: len(v) for k, v in matches.items()}}
 
-    client = GmailClient()
     for rule in rules:
         ids = matches.get(rule["name"], [])
         if not ids:
             continue
         actions = rule.get("actions", {})
+        for _, client, account_ids in gmail_clients(ids):
+            if actions.get("trash"):
+                for mid in account_ids:
+                    client.trash_message(mid)
+            if actions.get("mark_read"):
+                for mid in account_ids:
+                    client.modify_message(mid, remove_labels=["UNREAD"])
+            if actions.get("label"):
+                label_id = label_id_for(client, actions["label"])
+                for mid in account_ids:
+                    client.modify_message(mid, add_labels=[label_id])
         if actions.get("trash"):
-            for mid in ids:
-                client.trash_message(mid)
             store.delete_emails(ids)
         if actions.get("mark_read"):
-            for mid in ids:
-                client.modify_message(mid, remove_labels=["UNREAD"])
+            record_labels(ids, remove=("UNREAD",))
         if actions.get("label"):
-            label_name = actions.get("label")
-            labels = client.list_labels()
-            label_id = next((l["id"] for l in labels if l["name"] == label_name), None)
-            if not label_id:
-                label_id = client.create_label(label_name)["id"]
-            for mid in ids:
-                client.modify_message(mid, add_labels=[label_id])
-
-    cache.invalidate("overview", "senders", "categories", "alerts", "eda")
+            record_labels(ids, add=(actions["label"],))
+
     return {"dry_run": False, "matches": {k: len(v) for k, v in matches.items()}}
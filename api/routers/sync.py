@@ -5,50 +5,82 @@ from collections import Counter
 from datetime import datetime, UTC
 from pathlib import Path
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
-from api import cache
+from api import worker
 from api.log_buffer import log_buffer
+from api.settings import settings as dashboard_settings
 from gmail_parser import IngestionPipeline
+from gmail_parser.auth import GmailAuth
+from gmail_parser.backfill import BackfillScheduler
 from gmail_parser.categorizer import categorize as do_categorize
-from gmail_parser.store import EmailStore
+from gmail_parser.client import GmailClient
+from gmail_parser.config import DEFAULT_ACCOUNT, settings as parser_settings
+from gmail_parser.journal import BatchJournal
+from gmail_parser.push import Debouncer, parse_push_notification
+from gmail_parser.store import get_store
 
 SCRIPT_LOG = Path("/tmp/gmail_ingest.log")
 
 router = APIRouter()
 
-_state = {
-    "is_syncing": False,
-    "synced": 0,
-    "total": 0,
-    "events": [],  # rolling list of {"ts", "msg"} dicts
-    "error": None,
-}
+# Per-account sync state; each account syncs on its own worker thread.
+_states: dict[str, dict] = {}
+_cancel_syncs: dict[str, threading.Event] = {}
 _lock = threading.Lock()
-_cancel_sync = threading.Event()
 _cancel_llm = threading.Event()
 
-_AUTO_SYNC_INTERVAL_SECS = 30
+# With push notifications configured, polling only backstops missed or expired watches
+_AUTO_SYNC_INTERVAL_SECS = 15 * 60 if dashboard_settings.push_token else 30
 _auto_sync = {"enabled": True, "interval_hours": _AUTO_SYNC_INTERVAL_SECS / 3600, "next_run": time.time() + _AUTO_SYNC_INTERVAL_SECS}
 
 MAX_EVENTS = 200
 
 
-def _push_event(msg: str):
+def _new_state() -> dict:
+    return {"is_syncing": False, "synced": 0, "total": 0, "events": [], "error": None}
+
+
+def _state_for(account_id: str) -> dict:
+    """Caller must hold _lock."""
+    return _states.setdefault(account_id, _new_state())
+
+
+def _cancel_event(account_id: str) -> threading.Event:
+    with _lock:
+        return _cancel_syncs.setdefault(account_id, threading.Event())
+
+
+def _resolve_accounts(account: str | None) -> list[str]:
+    accounts = parser_settings.account_list()
+    if account is None:
+        return accounts
+    if account not in accounts:
+        raise HTTPException(status_code=404, detail=f"Unknown account: {account}")
+    return [account]
+
+
+def _push_event(msg: str, account_id: str = DEFAULT_ACCOUNT):
     with _lock:
-        _state["events"].append({"ts": datetime.now(UTC).isoformat(), "msg": msg})
-        if len(_state["events"]) > MAX_EVENTS:
-            _state["events"] = _state["events"][-MAX_EVENTS:]
+        state = _state_for(account_id)
+        state["events"].append(
+            {"ts": datetime.now(UTC).isoformat(), "msg": msg, "account": account_id}
+        )
+        if len(state["events"]) > MAX_EVENTS:
+            state["events"] = state["events"][-MAX_EVENTS:]
 
 
 def _auto_sync_loop():
+    time.sleep(10)
+    _recover_interrupted()
+    _resume_backfills()
     while True:
         time.sleep(10)
         with _lock:
-            if not _auto_sync["enabled"] or _state["is_syncing"]:
+            if not _auto_sync["enabled"]:
                 continue
             if (
                 _auto_sync["next_run"] is None
@@ -58,47 +90,59 @@ def _auto_sync_loop():
             _auto_sync["next_run"] = (
                 datetime.now(UTC).timestamp() + _auto_sync["interval_hours"] * 3600
             )
-        logger.info("[auto_sync] triggering scheduled incremental sync")
-        threading.Thread(target=_run_incremental, daemon=True).start()
+        started = _start_threads(_run_incremental, parser_settings.account_list())
+        if started:
+            logger.info("[auto_sync] triggering scheduled incremental sync (accounts=%s)", started)
 
 
-threading.Thread(target=_auto_sync_loop, daemon=True, name="auto-sync").start()
+_background_started = False
+
+
+def start_background():
+    """Start the auto-sync loop (after journal recovery and backfill resume) and the
+    store maintenance schedule in the process that runs ingestion — the API server,
+    or the ingestion worker."""
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+    threading.Thread(target=_auto_sync_loop, daemon=True, name="auto-sync").start()
+    threading.Thread(target=_maintenance_loop, daemon=True, name="maintenance-schedule").start()
 
 
 class SyncRequest(BaseModel):
     max_emails: int = 100000
     days_ago: int | None = 90
     query: str = ""
+    account: str | None = None  # None = every configured account, concurrently
+
+
+class AccountRequest(BaseModel):
+    account: str | None = None
 
 
-def _run_sync(req: SyncRequest):
-    _cancel_sync.clear()
+def _run_sync(req: SyncRequest, account_id: str = DEFAULT_ACCOUNT):
+    cancel = _cancel_event(account_id)
+    cancel.clear()
     with _lock:
-        _state.update(
+        _state_for(account_id).update(
             {"is_syncing": True, "synced": 0, "total": 0, "error": None, "events": [], "cancelled": False}
         )
-    cache.invalidate(
-        "overview",
-        "senders",
-        "categories",
-        "alerts",
-        "eda",
-        "expenses_overview",
-        "expenses_tx",
-    )
-    _push_event("Sync started")
+    _push_event("Sync started", account_id)
 
     def on_progress(synced: int, total: int):
         with _lock:
-            _state["synced"] = synced
-            _state["total"] = total
+            state = _state_for(account_id)
+            state["synced"] = synced
+            state["total"] = total
         _push_event(
-            f"Batch complete — {synced:,} / {total:,} emails ({int(synced / total * 100) if total else 0}%)"
+            f"Batch complete — {synced:,} / {total:,} emails ({int(synced / total * 100) if total else 0}%)",
+            account_id,
         )
 
     try:
-        pipeline = IngestionPipeline()
-        _push_event("Syncing labels…")
+        pipeline = IngestionPipeline(account_id=account_id)
+        _push_event("Syncing labels…", account_id)
         pipeline.sync_labels()
 
         kwargs: dict = {
@@ -109,144 +153,411 @@ def _run_sync(req: SyncRequest):
         if req.days_ago is not None:
             kwargs["days_ago"] = req.days_ago
             _push_event(
-                f"Fetching message list (last {req.days_ago} days, max {req.max_emails:,})…"
+                f"Fetching message list (last {req.days_ago} days, max {req.max_emails:,})…",
+                account_id,
             )
         else:
-            _push_event(f"Fetching message list (all mail, max {req.max_emails:,})…")
+            _push_event(f"Fetching message list (all mail, max {req.max_emails:,})…", account_id)
 
-        kwargs["cancel_check"] = _cancel_sync.is_set
+        kwargs["cancel_check"] = cancel.is_set
         count = pipeline.full_sync(**kwargs)
-        if _cancel_sync.is_set():
+        if cancel.is_set():
             with _lock:
-                _state["cancelled"] = True
-            _push_event(f"Sync cancelled — {count:,} emails synced before stop")
+                _state_for(account_id)["cancelled"] = True
+            _push_event(f"Sync cancelled — {count:,} emails synced before stop", account_id)
         else:
-            _push_event(f"Done — {count:,} emails synced successfully")
+            _push_event(f"Done — {count:,} emails synced successfully", account_id)
     except Exception as e:
         with _lock:
-            _state["error"] = str(e)
-        _push_event(f"ERROR: {e}")
+            _state_for(account_id)["error"] = str(e)
+        _push_event(f"ERROR: {e}", account_id)
     finally:
-        cache.invalidate(
-            "overview",
-            "senders",
-            "categories",
-            "alerts",
-            "eda",
-            "expenses_overview",
-            "expenses_tx",
-        )
-        with _lock:
-            _state["is_syncing"] = False
+        _sync_finished(account_id)
+
+
+@router.get("/accounts")
+@worker.command
+def list_accounts():
+    with _lock:
+        return [
+            {"account": a, "is_syncing": _state_for(a)["is_syncing"]}
+            for a in parser_settings.account_list()
+        ]
 
 
 @router.get("/status")
-def sync_status():
-    store = EmailStore()
-    state = store.get_sync_state()
+@worker.command
+def sync_status(account: str | None = None):
+    accounts = _resolve_accounts(account)
+    store = get_store()
+    states = {a: store.get_sync_state(a) for a in accounts}
+    last_syncs = [s["last_full_sync"] for s in states.values() if s and s.get("last_full_sync")]
+    with _lock:
+        is_syncing = any(_state_for(a)["is_syncing"] for a in accounts)
     return {
-        "last_sync": state.get("last_full_sync") if state else None,
-        "total_emails": store.count(),
-        "is_syncing": _state["is_syncing"],
-        "has_history_id": bool(state.get("last_history_id")) if state else False,
+        "last_sync": max(last_syncs) if last_syncs else None,
+        "total_emails": store.count({"account_id": account} if account else None),
+        "is_syncing": is_syncing,
+        "has_history_id": any(bool(s.get("last_history_id")) for s in states.values() if s),
     }
 
 
+def _start_threads(target, accounts: list[str], *args) -> list[str]:
+    started = []
+    with _lock:
+        for account_id in accounts:
+            state = _state_for(account_id)
+            if state["is_syncing"]:
+                continue
+            # Claim the slot before the thread starts so concurrent requests can't double-start
+            state["is_syncing"] = True
+            started.append(account_id)
+    for account_id in started:
+        threading.Thread(target=target, args=(*args, account_id), daemon=True).start()
+    return started
+
+
+def _sync_finished(account_id: str):
+    """Release the account's sync slot, then run the incremental sync a push queued meanwhile."""
+    with _lock:
+        _state_for(account_id)["is_syncing"] = False
+        pending = account_id in _push_pending
+        _push_pending.discard(account_id)
+    if pending:
+        _on_push_ready(account_id)
+
+
 @router.post("/start")
+@worker.command
 def start_sync(req: SyncRequest):
-    with _lock:
-        if _state["is_syncing"]:
-            return {"message": "Sync already in progress"}
-    thread = threading.Thread(target=_run_sync, args=(req,), daemon=True)
-    thread.start()
-    return {"message": "Sync started"}
+    started = _start_threads(_run_sync, _resolve_accounts(req.account), req)
+    if not started:
+        return {"message": "Sync already in progress"}
+    return {"message": "Sync started", "accounts": started}
 
 
-def _run_incremental():
+def _run_incremental(account_id: str = DEFAULT_ACCOUNT):
     with _lock:
-        _state.update(
+        _state_for(account_id).update(
             {"is_syncing": True, "synced": 0, "total": 0, "error": None, "events": []}
         )
-    cache.invalidate(
-        "overview",
-        "senders",
-        "categories",
-        "alerts",
-        "eda",
-        "expenses_overview",
-        "expenses_tx",
-    )
-    _push_event("Incremental sync started")
+    _push_event("Incremental sync started", account_id)
     try:
-        pipeline = IngestionPipeline()
+        pipeline = IngestionPipeline(account_id=account_id)
         result = pipeline.incremental_sync()
         suffix = " [fallback: 7-day sync]" if result.get("fallback") else ""
         _push_event(
             f"Done — +{result['added']:,} new, -{result['deleted']:,} deleted, "
-            f"{result['refreshed']:,} metadata refreshed{suffix}"
+            f"{result['refreshed']:,} metadata refreshed{suffix}",
+            account_id,
         )
     except Exception as e:
         with _lock:
-            _state["error"] = str(e)
-        _push_event(f"ERROR: {e}")
+            _state_for(account_id)["error"] = str(e)
+        _push_event(f"ERROR: {e}", account_id)
         if "invalid_grant" in str(e):
             with _lock:
                 _auto_sync["enabled"] = False
                 _auto_sync["next_run"] = None
-            logger.warning("[auto_sync] paused due to invalid_grant — will resume after next login")
-            _push_event("Auto sync paused — token expired. Log out and log back in to resume.")
+            logger.warning("[auto_sync] paused due to invalid_grant (account=%s) — will resume after next login", account_id)
+            _push_event("Auto sync paused — token expired. Log out and log back in to resume.", account_id)
     finally:
-        cache.invalidate(
-            "overview",
-            "senders",
-            "categories",
-            "alerts",
-            "eda",
-            "expenses_overview",
-            "expenses_tx",
-        )
-        with _lock:
-            _state["is_syncing"] = False
+        _sync_finished(account_id)
+
+
+def _run_recover(account_id: str = DEFAULT_ACCOUNT):
+    try:
+        result = IngestionPipeline(account_id=account_id).recover()
+        if result["runs"]:
+            _push_event(
+                f"Recovered {result['runs']} interrupted sync(s) — {result['stored']:,} emails re-stored, "
+                f"{result['llm']:,} LLM-processed",
+                account_id,
+            )
+    except Exception as e:
+        logger.warning("[recovery] failed (account=%s): %s", account_id, e)
+    finally:
+        _sync_finished(account_id)
+
+
+def _recover_interrupted():
+    """Replay the ingestion journal left by a crashed or killed server."""
+    accounts = [a for a in parser_settings.account_list() if BatchJournal().pending(a)]
+    if started := _start_threads(_run_recover, accounts):
+        logger.info("[recovery] replaying ingestion journal (accounts=%s)", started)
 
 
 @router.post("/incremental")
-def start_incremental():
-    with _lock:
-        if _state["is_syncing"]:
-            return {"message": "Sync already in progress"}
-    thread = threading.Thread(target=_run_incremental, daemon=True)
-    thread.start()
-    return {"message": "Incremental sync started"}
+@worker.command
+def start_incremental(req: AccountRequest = AccountRequest()):
+    started = _start_threads(_run_incremental, _resolve_accounts(req.account))
+    if not started:
+        return {"message": "Sync already in progress"}
+    return {"message": "Incremental sync started", "accounts": started}
 
 
 @router.get("/progress")
-def sync_progress():
+@worker.command
+def sync_progress(account: str | None = None):
+    """Progress for one account, or summed across all accounts when none is given."""
+    accounts = _resolve_accounts(account)
     with _lock:
-        s = dict(_state)
+        states = {a: dict(_state_for(a)) for a in accounts}
+    synced = sum(s["synced"] for s in states.values())
+    total = sum(s["total"] for s in states.values())
     return {
-        "is_syncing": s["is_syncing"],
-        "synced": s["synced"],
-        "total": s["total"],
-        "pct": round(s["synced"] / s["total"] * 100, 1) if s["total"] > 0 else 0,
-        "error": s["error"],
+        "is_syncing": any(s["is_syncing"] for s in states.values()),
+        "synced": synced,
+        "total": total,
+        "pct": round(synced / total * 100, 1) if total > 0 else 0,
+        "error": next((s["error"] for s in states.values() if s["error"]), None),
+        "accounts": {
+            a: {"is_syncing": s["is_syncing"], "synced": s["synced"], "total": s["total"], "error": s["error"]}
+            for a, s in states.items()
+        },
     }
 
 
 @router.get("/events")
-def sync_events(after: str | None = None):
+@worker.command
+def sync_events(after: str | None = None, account: str | None = None):
     """Return event log entries, optionally only those after a given ISO timestamp."""
+    accounts = _resolve_accounts(account)
     with _lock:
-        events = list(_state["events"])
-        is_syncing = _state["is_syncing"]
+        events = sorted(
+            (e for a in accounts for e in _state_for(a)["events"]), key=lambda e: e["ts"]
+        )
+        is_syncing = any(_state_for(a)["is_syncing"] for a in accounts)
     if after:
         events = [e for e in events if e["ts"] > after]
     return {"events": events, "is_syncing": is_syncing}
 
 
+# --- Backfill ---
+
+# Backfills run on their own per-account threads so live syncs keep flowing meanwhile
+_backfills: dict[str, dict] = {}
+_cancel_backfills: dict[str, threading.Event] = {}
+
+
+class BackfillRequest(BaseModel):
+    account: str | None = None
+    recent_days: int | None = None  # defaults from EMAIL_PARSER_BACKFILL_* settings
+    window_days: int | None = None
+    restart: bool = False  # discard stored progress and start over
+
+
+def _run_backfill(req: BackfillRequest, account_id: str = DEFAULT_ACCOUNT):
+    with _lock:
+        cancel = _cancel_backfills.setdefault(account_id, threading.Event())
+    cancel.clear()
+
+    def on_progress(state: dict, synced: int, total: int):
+        with _lock:
+            _backfills[account_id].update({"phase": state["status"], "synced": synced, "total": total})
+
+    try:
+        pipeline = IngestionPipeline(account_id=account_id)
+        scheduler = BackfillScheduler(pipeline, req.recent_days, req.window_days)
+        if req.restart:
+            scheduler.reset()
+        _push_event("Backfill started", account_id)
+        pipeline.sync_labels()
+        state = scheduler.run(progress_callback=on_progress, cancel_check=cancel.is_set)
+        if state["status"] == "complete":
+            _push_event(f"Backfill complete — {state['emails_synced']:,} emails", account_id)
+        else:
+            _push_event(f"Backfill paused at {state['cursor'][:10]}", account_id)
+    except Exception as e:
+        with _lock:
+            _backfills[account_id]["error"] = str(e)
+        _push_event(f"Backfill ERROR: {e}", account_id)
+    finally:
+        with _lock:
+            _backfills[account_id]["running"] = False
+
+
+def _start_backfills(req: BackfillRequest, accounts: list[str]) -> list[str]:
+    started = []
+    with _lock:
+        for account_id in accounts:
+            if _backfills.get(account_id, {}).get("running"):
+                continue
+            _backfills[account_id] = {"running": True, "phase": None, "synced": 0, "total": 0, "error": None}
+            started.append(account_id)
+    for account_id in started:
+        threading.Thread(
+            target=_run_backfill, args=(req, account_id), daemon=True, name=f"backfill-{account_id}"
+        ).start()
+    return started
+
+
+def _resume_backfills():
+    """Pick up backfills that were still walking history when the server stopped."""
+    try:
+        store = get_store()
+        accounts = [
+            a for a in parser_settings.account_list()
+            if (store.get_backfill_state(a) or {}).get("status") not in (None, "complete")
+        ]
+    except Exception as e:
+        logger.warning("[backfill] could not read backfill state: %s", e)
+        return
+    if started := _start_backfills(BackfillRequest(), accounts):
+        logger.info("[backfill] resuming (accounts=%s)", started)
+
+
+@router.post("/backfill")
+@worker.command
+def start_backfill(req: BackfillRequest = BackfillRequest()):
+    started = _start_backfills(req, _resolve_accounts(req.account))
+    if not started:
+        return {"message": "Backfill already in progress"}
+    return {"message": "Backfill started", "accounts": started}
+
+
+@router.get("/backfill")
+@worker.command
+def backfill_status(account: str | None = None):
+    """Stored window progress plus live progress of the window being fetched, per account."""
+    accounts = _resolve_accounts(account)
+    store = get_store()
+    stored = {a: store.get_backfill_state(a) for a in accounts}
+    with _lock:
+        live = {a: dict(_backfills.get(a) or {"running": False}) for a in accounts}
+    return {a: {**live[a], "progress": stored[a]} for a in accounts}
+
+
+@router.post("/backfill/cancel")
+@worker.command
+def cancel_backfill(req: AccountRequest = AccountRequest()):
+    accounts = _resolve_accounts(req.account)
+    with _lock:
+        for account_id in accounts:
+            _cancel_backfills.setdefault(account_id, threading.Event()).set()
+    return {"message": "Backfill cancel requested", "accounts": accounts}
+
+
+# --- Push notifications ---
+
+_PUSH_DEBOUNCE_SECS = 5
+_PUSH_MAX_DELAY_SECS = 30
+
+_UNKNOWN_ADDRESS_TTL_SECS = 300
+
+_push_state = {"received": 0, "stale": 0, "syncs": 0, "last_received": None}
+_push_pending: set[str] = set()  # accounts with a push that arrived while they were syncing
+_account_addresses: dict[str, str] = {}  # mailbox address -> account id
+_unknown_addresses: dict[str, float] = {}  # mailbox address -> when it last failed to resolve
+
+
+def _on_push_ready(account_id: str):
+    with _lock:
+        state = _state_for(account_id)
+        if state["is_syncing"]:
+            # The running sync may have read history before this burst arrived; it starts
+            # one incremental sync when it finishes (see _sync_finished)
+            _push_pending.add(account_id)
+            return
+        state["is_syncing"] = True
+        _push_state["syncs"] += 1
+    threading.Thread(target=_run_incremental, args=(account_id,), daemon=True).start()
+
+
+_push_debouncer = Debouncer(_on_push_ready, delay=_PUSH_DEBOUNCE_SECS, max_delay=_PUSH_MAX_DELAY_SECS)
+
+
+def _account_for_address(address: str) -> str | None:
+    with _lock:
+        if address in _account_addresses:
+            return _account_addresses[address]
+        # Don't look up every account's profile again for each notification to a mailbox
+        # that isn't configured here, or whose account's lookup keeps failing
+        if time.monotonic() - _unknown_addresses.get(address, float("-inf")) < _UNKNOWN_ADDRESS_TTL_SECS:
+            return None
+        known = set(_account_addresses.values())
+    for account_id in parser_settings.account_list():
+        if account_id in known:
+            continue
+        try:
+            profile = GmailClient(GmailAuth(account_id=account_id)).get_profile()
+        except Exception as e:
+            logger.warning("[push] could not resolve mailbox for account %s: %s", account_id, e)
+            continue
+        resolved = profile.get("emailAddress", "").lower()
+        with _lock:
+            _account_addresses[resolved] = account_id
+            _unknown_addresses.pop(resolved, None)
+        if resolved == address:
+            return account_id
+    with _lock:
+        _unknown_addresses[address] = time.monotonic()
+    return None
+
+
+def _is_stale(notified: str, last_synced: str) -> bool:
+    return notified.isdigit() and last_synced.isdigit() and int(notified) <= int(last_synced)
+
+
+def handle_push_notification(envelope: dict) -> dict:
+    """Parse a Pub/Sub envelope and queue a sync of its mailbox; raises SyncError if malformed."""
+    return queue_push_notification(parse_push_notification(envelope))
+
+
+@worker.command
+def queue_push_notification(note: dict) -> dict:
+    account_id = _account_for_address(note["email_address"])
+    if account_id is None:
+        logger.warning("[push] notification for unknown mailbox %s ignored", note["email_address"])
+        return {"accepted": False, "reason": "unknown mailbox"}
+
+    state = get_store().get_sync_state(account_id)
+    last_synced = (state or {}).get("last_history_id", "")
+    with _lock:
+        _push_state["received"] += 1
+        _push_state["last_received"] = datetime.now(UTC).isoformat()
+        if _is_stale(note["history_id"], last_synced):
+            _push_state["stale"] += 1
+            return {"accepted": True, "queued": False, "account": account_id}
+    _push_debouncer.trigger(account_id)
+    return {"accepted": True, "queued": True, "account": account_id}
+
+
+@router.get("/push")
+@worker.command
+def push_status():
+    with _lock:
+        state = dict(_push_state)
+        waiting = sorted(_push_pending)
+    return {
+        "enabled": bool(dashboard_settings.push_token),
+        "pending": _push_debouncer.pending(),
+        "waiting_for_sync": waiting,
+        "poll_interval_secs": _AUTO_SYNC_INTERVAL_SECS,
+        **state,
+    }
+
+
+@router.post("/watch")
+def start_watch(req: AccountRequest = AccountRequest()):
+    """Register (or renew — watches expire after 7 days) Gmail push for each account."""
+    if not dashboard_settings.push_topic:
+        raise HTTPException(status_code=400, detail="DASHBOARD_PUSH_TOPIC is not configured")
+    results = {}
+    for account_id in _resolve_accounts(req.account):
+        try:
+            resp = GmailClient(GmailAuth(account_id=account_id)).watch(dashboard_settings.push_topic)
+            results[account_id] = {"history_id": resp.get("historyId"), "expiration": resp.get("expiration")}
+        except Exception as e:
+            results[account_id] = {"error": str(e)}
+    logger.info("[push] watch registered: %s", results)
+    return results
+
+
 @router.get("/live-count")
 def live_count():
     """Real-time ChromaDB email count — works even during background script ingestion."""
-    return {"count": EmailStore().count()}
+    return {"count": get_store().count()}
 
 
 _llm_state = {"is_running": False, "processed": 0, "total": 0, "error": None}
@@ -257,19 +568,16 @@ _llm_logger = logging.getLogger("gmail_parser.llm_process")
 
 
 def _run_llm_process(force: bool = False):
-    from gmail_parser.llm_extractor import extract_batch, _BATCH_SIZE
+    from gmail_parser.llm_extractor import extract_batch, _BATCH_SIZE, _MAX_WORKERS
     import json
 
     _cancel_llm.clear()
-    store = EmailStore()
-    all_emails = store.get_all_emails(include=["metadatas", "documents"])
-    ids = all_emails["ids"]
-    metadatas = all_emails["metadatas"]
-    documents = all_emails.get("documents") or [""] * len(ids)
-
+    store = get_store()
+    # Only ids are held for the whole run; documents are read a page at a time below
     unprocessed = [
-        (gid, m, doc)
-        for gid, m, doc in zip(ids, metadatas, documents)
+        gid
+        for page in store.iter_emails(include=["metadatas"])
+        for gid, m in zip(page["ids"], page["metadatas"])
         if force or not m.get("actions_extracted")
     ]
     total = len(unprocessed)
@@ -288,64 +596,70 @@ def _run_llm_process(force: bool = False):
             _llm_state["is_running"] = False
         return
 
-    email_inputs = [
-        {
-            "id": gid,
-            "subject": m.get("subject", ""),
-            "sender": m.get("sender", ""),
-            "snippet": doc or m.get("snippet", ""),
-            "metadata": m,
-        }
-        for gid, m, doc in unprocessed
-    ]
+    processed = 0
 
     def _on_progress(done, _total):
         with _llm_lock:
-            _llm_state["processed"] = done
-        _llm_logger.info("LLM processing — %d / %d emails done", done, _total)
+            _llm_state["processed"] = processed + done
+        _llm_logger.info("LLM processing — %d / %d emails done", processed + done, total)
 
     try:
-        results = extract_batch(email_inputs, progress_callback=_on_progress, cancel_event=_cancel_llm)
-
-        update_ids, updates = [], []
         action_count = 0
         tx_count = 0
-        # Only update emails that were actually processed (results may be partial on cancel)
-        for gid, _, _ in unprocessed:
-            if gid not in results:
-                continue
-            result = results[gid]
-            action_items = result.get("action_items", [])
-            spending = result.get("spending", {"is_transaction": False, "transactions": []})
-            update: dict = {
-                "actions_extracted": True,
-                "action_items_json": json.dumps(action_items),
-                "has_action_items": bool(action_items),
-                "spending_json": json.dumps(spending),
-                "has_transactions": bool(spending.get("transactions")),
-            }
-            if result.get("category"):
-                update["category"] = result["category"]
-                update["llm_categorized"] = True
-            if action_items:
-                action_count += 1
-            if spending.get("transactions"):
-                tx_count += 1
-            update_ids.append(gid)
-            updates.append(update)
-
-        if update_ids:
-            store.update_metadatas_batch(update_ids, updates)
+        page_size = _BATCH_SIZE * _MAX_WORKERS * 4
+        for start in range(0, total, page_size):
+            page = store.get_emails(ids=unprocessed[start : start + page_size], include=["documents", "metadatas"])
+            email_inputs = [
+                {
+                    "id": gid,
+                    "subject": m.get("subject", ""),
+                    "sender": m.get("sender", ""),
+                    "snippet": doc or m.get("snippet", ""),
+                    "metadata": m,
+                }
+                for gid, m, doc in zip(page["ids"], page["metadatas"], page["documents"])
+            ]
+            results = extract_batch(email_inputs, progress_callback=_on_progress, cancel_event=_cancel_llm)
+
+            update_ids, updates = [], []
+            # Only update emails that were actually processed (results may be partial on cancel)
+            for gid in page["ids"]:
+                if gid not in results:
+                    continue
+                result = results[gid]
+                action_items = result.get("action_items", [])
+                spending = result.get("spending", {"is_transaction": False, "transactions": []})
+                update: dict = {
+                    "actions_extracted": True,
+                    "action_items_json": json.dumps(action_items),
+                    "has_action_items": bool(action_items),
+                    "spending_json": json.dumps(spending),
+                    "has_transactions": bool(spending.get("transactions")),
+                }
+                if result.get("category"):
+                    update["category"] = result["category"]
+                    update["llm_categorized"] = True
+                if action_items:
+                    action_count += 1
+                if spending.get("transactions"):
+                    tx_count += 1
+                update_ids.append(gid)
+                updates.append(update)
+
+            if update_ids:
+                store.update_metadatas_batch(update_ids, updates)
+            processed += len(update_ids)
+            if _cancel_llm.is_set():
+                break
 
         cancelled = _cancel_llm.is_set()
         with _llm_lock:
-            _llm_state["processed"] = len(update_ids)
+            _llm_state["processed"] = processed
             _llm_state["cancelled"] = cancelled
 
-        cache.invalidate("alerts", "overview", "categories", "expenses_overview", "expenses_tx")
         if cancelled:
             _llm_logger.info(
-                "LLM processing cancelled — %d / %d emails processed", len(update_ids), total
+                "LLM processing cancelled — %d / %d emails processed", processed, total
             )
         else:
             _llm_logger.info(
@@ -367,6 +681,7 @@ class LlmProcessRequest(BaseModel):
 
 
 @router.post("/llm-process")
+@worker.command
 def start_llm_process(req: LlmProcessRequest = LlmProcessRequest()):
     with _llm_lock:
         if _llm_state["is_running"]:
@@ -376,22 +691,104 @@ def start_llm_process(req: LlmProcessRequest = LlmProcessRequest()):
 
 
 @router.get("/llm-process")
+@worker.command
 def llm_process_status():
     with _llm_lock:
         return dict(_llm_state)
 
 
+# --- Store maintenance ---
+
+_maintenance_lock = threading.Lock()
+_maintenance: dict = {"is_running": False, "last_run": None, "last_result": None, "error": None, "next_run": None}
+
+
+def _run_maintenance(vacuum: bool, compact: bool, force: bool, rebuild_hnsw: bool):
+    try:
+        result = get_store().run_maintenance(vacuum=vacuum, compact=compact, force=force, rebuild_hnsw=rebuild_hnsw)
+        with _maintenance_lock:
+            _maintenance["last_result"] = {
+                key: result[key] for key in ("compacted", "vacuumed", "hnsw_rebuild_due")
+            }
+            _maintenance["error"] = None
+    except Exception as e:
+        logger.error("[maintenance] failed: %s", e)
+        with _maintenance_lock:
+            _maintenance["error"] = str(e)
+    finally:
+        with _maintenance_lock:
+            _maintenance["is_running"] = False
+            _maintenance["last_run"] = datetime.now(UTC).isoformat()
+
+
+def _start_maintenance(
+    vacuum: bool = True, compact: bool = True, force: bool = False, rebuild_hnsw: bool = False
+) -> bool:
+    with _maintenance_lock:
+        if _maintenance["is_running"]:
+            return False
+        _maintenance["is_running"] = True
+    threading.Thread(
+        target=_run_maintenance, args=(vacuum, compact, force, rebuild_hnsw), daemon=True, name="store-maintenance"
+    ).start()
+    return True
+
+
+def _maintenance_loop():
+    interval = parser_settings.maintenance_interval_hours * 3600
+    if interval <= 0:
+        return
+    while True:
+        with _maintenance_lock:
+            _maintenance["next_run"] = time.time() + interval
+        time.sleep(interval)
+        if _start_maintenance():
+            logger.info("[maintenance] starting scheduled store maintenance")
+
+
+class MaintenanceRequest(BaseModel):
+    vacuum: bool = True
+    compact: bool = True
+    force: bool = False  # True: also what is below the maintenance_* thresholds
+    # Rebuild the emails HNSW graph too. It swaps in a new collection: pause ingestion in
+    # every process first. Scheduled runs never do it
+    rebuild_hnsw: bool = False
+
+
+@router.get("/maintenance")
+@worker.command
+def maintenance_status():
+    """Store size and health (per collection and database), and the maintenance job's state."""
+    with _maintenance_lock:
+        state = dict(_maintenance)
+    if state["next_run"]:
+        state["next_run"] = datetime.fromtimestamp(state["next_run"], UTC).isoformat()
+    return {**state, "stats": get_store().maintenance_stats()}
+
+
+@router.post("/maintenance")
+@worker.command
+def start_maintenance(req: MaintenanceRequest = MaintenanceRequest()):
+    if not _start_maintenance(req.vacuum, req.compact, req.force, req.rebuild_hnsw):
+        return {"message": "Maintenance already in progress"}
+    return {"message": "Maintenance started"}
+
+
 @router.post("/cancel")
-def cancel_sync():
+@worker.command
+def cancel_sync(req: AccountRequest = AccountRequest()):
     with _lock:
-        if not _state["is_syncing"]:
-            return {"message": "No sync in progress"}
-    _cancel_sync.set()
-    _push_event("Cancellation requested…")
-    return {"message": "Cancellation requested"}
+        syncing = [a for a in _resolve_accounts(req.account) if _state_for(a)["is_syncing"]]
+    if not syncing:
+        return {"message": "No sync in progress"}
+    for account_id in syncing:
+        _cancel_event(account_id).set()
+        _push_event("Cancellation requested…", account_id)
+    return {"message": "Cancellation requested", "accounts": syncing}
 
 
 @router.post("/llm-cancel")
+@worker.command
 def cancel_llm_process():
     with _llm_lock:
         if not _llm_state["is_running"]:
@@ -400,26 +797,75 @@ def cancel_llm_process():
     return {"message": "Cancellation requested"}
 
 
+_categorize_state = {"is_running": False, "processed": 0, "total": 0, "updated": 0, "categories": {}, "error": None}
+_categorize_lock = threading.Lock()
+
+
+def _run_categorize():
+    store = get_store()
+    counts: Counter = Counter()
+    try:
+        for page in store.iter_emails(include=["metadatas"]):
+            updated = [{"category": do_categorize(m)} for m in page["metadatas"]]
+            store.update_metadatas_batch(page["ids"], updated)
+            counts.update(m["category"] for m in updated)
+            with _categorize_lock:
+                _categorize_state["processed"] += len(updated)
+        with _categorize_lock:
+            _categorize_state["updated"] = sum(counts.values())
+            _categorize_state["categories"] = dict(counts)
+        logger.info("[categorize_emails] categorized %d emails", sum(counts.values()))
+    except Exception as e:
+        with _categorize_lock:
+            _categorize_state["error"] = str(e)
+        logger.error("[categorize_emails] failed: %s", e)
+    finally:
+        with _categorize_lock:
+            _categorize_state["is_running"] = False
+
+
 @router.post("/categorize")
+@worker.command
 def categorize_emails():
-    store = EmailStore()
-    all_emails = store.get_all_emails(include=["metadatas"])
-    ids = all_emails["ids"]
-    metadatas = all_emails["metadatas"]
-    updated = [{"category": do_categorize(m)} for m in metadatas]
-    store.update_metadatas_batch(ids, updated)
-    counts = Counter(m["category"] for m in updated)
-    cache.invalidate(
-        "overview",
-        "categories",
-        "senders",
-        "alerts",
-        "eda",
-        "expenses_overview",
-        "expenses_tx",
-    )
-    logger.info("[categorize_emails] categorized %d emails", len(ids))
-    return {"updated": len(ids), "categories": dict(counts)}
+    with _categorize_lock:
+        if _categorize_state["is_running"]:
+            return {"message": "Categorization already in progress", **_categorize_state}
+        _categorize_state.update(
+            {"is_running": True, "processed": 0, "total": get_store().count(), "updated": 0, "categories": {}, "error": None}
+        )
+    threading.Thread(target=_run_categorize, daemon=True, name="categorize").start()
+    return {"message": "Categorization started"}
+
+
+@router.get("/categorize")
+@worker.command
+def categorize_status():
+    with _categorize_lock:
+        return dict(_categorize_state)
+
+
+@worker.command
+def _worker_logs(after: str | None = None) -> list[dict]:
+    return log_buffer.records(after)
+
+
+@worker.command
+def resume_after_login():
+    """Catch up accounts that have synced before, and re-enable auto sync if it was
+    paused because of an expired token."""
+    store = get_store()
+    accounts = [
+        a for a in parser_settings.account_list()
+        if (store.get_sync_state(a) or {}).get("last_history_id")
+    ]
+    if started := _start_threads(_run_incremental, accounts):
+        logger.info("[auth] triggering incremental sync on login (accounts=%s)", started)
+    elif not accounts:
+        logger.info("[auth] no history_id — skipping login sync (run full sync first)")
+    with _lock:
+        if not _auto_sync["enabled"]:
+            _auto_sync["enabled"] = True
+            logger.info("[auth] re-enabled auto sync after login")
 
 
 @router.get("/logs")
@@ -428,8 +874,10 @@ def get_logs(after: str | None = None):
     Combined log stream: in-process captured logs (API-triggered syncs) +
     the background ingest script log file if present.
     """
-    # In-process logs (API-triggered syncs)
+    # In-process logs (API-triggered syncs), plus the ingestion worker's when one is running
     api_logs = log_buffer.records(after)
+    if worker.client() is not None:
+        api_logs = sorted(api_logs + _worker_logs(after), key=lambda r: r["ts"])
 
     # Background script log file
     script_lines: list[dict] = []
@@ -471,6 +919,7 @@ def _auto_sync_response():
 
 
 @router.get("/auto")
+@worker.command
 def get_auto_sync():
     return _auto_sync_response()
 
@@ -480,6 +929,7 @@ class AutoSyncRequest(BaseModel):
 
 
 @router.post("/auto")
+@worker.command
 def set_auto_sync(req: AutoSyncRequest):
     with _lock:
         _auto_sync["enabled"] = req.enabled
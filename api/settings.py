@@ -22,6 +22,10 @@ class DashboardSettings(BaseSettings):
     llm_model: str = "claude-haiku-4-5-20251001"
     llm_api_key: str = ""
     llm_base_url: str = "http://localhost:11434"
+    push_token: str = ""  # shared secret for /api/push/gmail; enables push-driven sync
+    push_topic: str = ""  # projects/<project>/topics/<topic> registered via /api/sync/watch
+    ingest_worker: str = "off"  # "off" (threads in the API) | "spawn" | "external" (python -m api.worker)
+    worker_port: int = 8766
 
     def cors_origin_list(self) -> list[str]:
         return [o.strip() for o in self.cors_origins.split(",") if o.strip()]
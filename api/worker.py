@@ -0,0 +1,230 @@
+"""
+Ingestion worker process.
+
+Sync, backfill, LLM processing and categorization are CPU-heavy (embedding,
+HTML parsing) and hold the GIL, which stalls dashboard requests when they run
+as threads inside the API server. With DASHBOARD_INGEST_WORKER=spawn (or
+=external, for a worker started separately), they run here instead and the
+API forwards the sync router's commands over a local authenticated socket.
+The API's email and expense writes and Chroma queries are forwarded too, so
+the worker is the only process that opens Chroma's HNSW indexes for writing.
+
+Usage:
+    poetry run python -m api.worker
+    poetry run python -m api.worker --port 8766
+"""
+import argparse
+import functools
+import hashlib
+import hmac
+import logging
+import subprocess
+import sys
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+
+from fastapi import HTTPException
+
+from api import cache
+from api.log_buffer import log_buffer
+from api.settings import settings
+from gmail_parser.store import get_store
+
+logger = logging.getLogger(__name__)
+
+_CALL_TIMEOUT_SECS = 120
+_RECONNECT_SECS = 2
+
+# Commands the worker can run, registered by @command in the sync router (and "store" below)
+COMMANDS: dict = {}
+
+_client: "WorkerClient | None" = None
+_process: subprocess.Popen | None = None
+
+
+def _address() -> tuple[str, int]:
+    return ("127.0.0.1", settings.worker_port)
+
+
+def _authkey() -> bytes:
+    # Both processes read the same session secret file from the persist dir
+    return hmac.new(settings.ensure_session_secret().encode(), b"ingest-worker", hashlib.sha256).digest()
+
+
+def command(fn):
+    """Register `fn` as a worker command; calls are forwarded to the worker when one is configured."""
+    COMMANDS[fn.__name__] = fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _client is None:
+            return fn(*args, **kwargs)
+        return _client.call(fn.__name__, *args, **kwargs)
+
+    return wrapper
+
+
+def client() -> "WorkerClient | None":
+    return _client
+
+
+class WorkerClient:
+    """API-side handle on the worker: forwards commands and applies its cache invalidations."""
+
+    def __init__(self, address: tuple[str, int], authkey: bytes):
+        self._address = address
+        self._authkey = authkey
+        self._stopped = threading.Event()
+        threading.Thread(target=self._listen, daemon=True, name="worker-events").start()
+
+    def call(self, name: str, *args, **kwargs):
+        try:
+            with Client(self._address, authkey=self._authkey) as conn:
+                conn.send((name, args, kwargs))
+                if not conn.poll(_CALL_TIMEOUT_SECS):
+                    raise HTTPException(status_code=504, detail=f"Ingestion worker timed out on '{name}'")
+                status, payload = conn.recv()
+        except (ConnectionError, EOFError, OSError, AuthenticationError) as e:
+            raise HTTPException(status_code=503, detail=f"Ingestion worker unavailable: {e}") from e
+        if status == "ok":
+            return payload
+        if status == "http_error":
+            raise HTTPException(status_code=payload[0], detail=payload[1])
+        raise HTTPException(status_code=500, detail=payload)
+
+    def close(self):
+        self._stopped.set()
+
+    def _listen(self):
+        """Mirror the worker's cache invalidations (rules/overrides changes) into this process's cache."""
+        while not self._stopped.is_set():
+            try:
+                with Client(self._address, authkey=self._authkey) as conn:
+                    conn.send(("subscribe", (), {}))
+                    conn.recv()  # registered: every invalidation from here on reaches us
+                    # Invalidations may have been missed while disconnected; drop the cache once
+                    # per (re)connection, not on every retry while the worker is down
+                    cache.clear()
+                    logger.info("[WorkerClient] connected to ingestion worker at %s:%d", *self._address)
+                    while not self._stopped.is_set():
+                        if conn.poll(1):
+                            cache.invalidate(*conn.recv())
+            except (ConnectionError, EOFError, OSError, AuthenticationError):
+                pass
+            self._stopped.wait(_RECONNECT_SECS)
+
+
+def start(spawn: bool):
+    """API startup: optionally launch the worker, then route commands to it."""
+    global _client, _process
+    if spawn:
+        _process = subprocess.Popen(
+            [sys.executable, "-m", "api.worker", "--port", str(settings.worker_port)]
+        )
+        logger.info("[worker] spawned ingestion worker (pid=%d)", _process.pid)
+    _client = WorkerClient(_address(), _authkey())
+    # The worker owns Chroma's HNSW indexes; this process only reads the sidecars
+    get_store().forward_to(functools.partial(_client.call, "store"))
+
+
+def stop():
+    global _client, _process
+    if _client is not None:
+        get_store().forward_to(None)
+        _client.close()
+        _client = None
+    if _process is not None:
+        _process.terminate()
+        try:
+            _process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _process.kill()
+        _process = None
+
+
+# --- Worker side ---
+
+_subscribers: list[Connection] = []
+_subscribers_lock = threading.Lock()
+
+
+def _broadcast(keys: tuple[str, ...]):
+    with _subscribers_lock:
+        for conn in list(_subscribers):
+            try:
+                conn.send(keys)
+            except (ConnectionError, EOFError, OSError):
+                _subscribers.remove(conn)
+
+
+def _store(op: str, *args):
+    """Worker side of EmailStore.forward_to: the API's email/expense writes and Chroma queries."""
+    return get_store().serve_forwarded(op, *args)
+
+
+COMMANDS["store"] = _store
+
+
+def _handle(conn: Connection):
+    with conn:
+        while True:
+            try:
+                name, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                break
+            if name == "subscribe":
+                # Under the lock, so the ack never interleaves with a broadcast on this connection
+                with _subscribers_lock:
+                    conn.send(("ok", None))
+                    _subscribers.append(conn)
+                continue
+            try:
+                reply = ("ok", COMMANDS[name](*args, **kwargs))
+            except HTTPException as e:
+                reply = ("http_error", (e.status_code, e.detail))
+            except Exception as e:
+                logger.exception("[worker] command %s failed", name)
+                reply = ("error", str(e))
+            conn.send(reply)
+    with _subscribers_lock:
+        if conn in _subscribers:
+            _subscribers.remove(conn)
+
+
+def serve(port: int | None = None):
+    from api.routers import sync
+
+    logging.getLogger("gmail_parser").addHandler(log_buffer)
+    logging.getLogger("gmail_parser").setLevel(logging.INFO)
+    cache.add_listener(_broadcast)
+    sync.start_background()
+
+    address = ("127.0.0.1", port or settings.worker_port)
+    with Listener(address, authkey=_authkey()) as listener:
+        logger.info("[worker] ingestion worker listening on %s:%d", *address)
+        _accept(listener)
+
+
+def _accept(listener: Listener):
+    """Serve each authenticated connection on its own thread."""
+    while True:
+        try:
+            conn = listener.accept()
+        except AuthenticationError:
+            logger.warning("[worker] rejected connection with a bad auth key")
+            continue
+        except (ConnectionError, EOFError):
+            continue  # the client went away during the handshake
+        threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(name)s | %(message)s")
+    parser = argparse.ArgumentParser(description="Run the ingestion worker")
+    parser.add_argument("--port", type=int, default=None, help="Local port (default: DASHBOARD_WORKER_PORT)")
+    args = parser.parse_args()
+    # Run from the imported module so the sync router registers into the same COMMANDS table
+    from api.worker import serve as _serve
+
+    _serve(args.port)
@@ -0,0 +1,94 @@
+"""
+Embedding backends on synthetic emails: encode throughput, single-query latency, and how close
+each backend's embeddings are to torch's.
+
+Backends (see EMAIL_PARSER_EMBEDDING_BACKEND):
+    torch      SentenceTransformer on PyTorch (float32)
+    onnx       the model exported to ONNX, run by onnxruntime (float32)
+    onnx-int8  the ONNX export with dynamically quantized int8 weights
+
+Usage:
+    poetry run python benchmarks/embeddings.py                        # 2000 emails, batch 32
+    poetry run python benchmarks/embeddings.py --emails 10000 --batch-size 64
+    poetry run python benchmarks/embeddings.py --backends torch,onnx-int8
+
+The ONNX backends need the "onnx" extra (optimum[onnxruntime]). The first run exports the
+model, and quantizes it for onnx-int8, under <persist dir>/models; that time is reported
+as the load time and not counted in the throughput. Cosine is against torch's embedding of
+the same text, so it is only reported when torch is one of the backends.
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from gmail_parser.embeddings import EmbeddingModel
+
+logging.basicConfig(level=logging.WARNING, format="%(levelname)s | %(message)s")
+
+WORDS = (
+    "invoice payment due meeting project update schedule review budget report flight booking "
+    "confirmation order shipped delivery receipt account password reset security alert team "
+    "lunch friday weekend plans dentist appointment reminder newsletter subscription offer "
+    "contract signature quarterly results hiring interview feedback deadline release notes"
+).split()
+
+
+def make_texts(n: int, seed: int = 0) -> list[str]:
+    rng = np.random.default_rng(seed)
+    texts = []
+    for i in range(n):
+        subject = " ".join(rng.choice(WORDS, size=rng.integers(2, 7)))
+        body = " ".join(rng.choice(WORDS, size=rng.integers(20, 200)))
+        texts.append(EmbeddingModel.prepare_email_text(subject.capitalize(), body, f"user{i % 97}@example.com"))
+    return texts
+
+
+def run(backend: str, texts: list[str], queries: list[str], batch_size: int, reference: np.ndarray | None):
+    model = EmbeddingModel(backend=backend)
+    start = time.perf_counter()
+    model.load()
+    model.encode_batch(texts[:batch_size], batch_size=batch_size)  # warm up outside the timed runs
+    load_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = np.array(model.encode_batch(texts, batch_size=batch_size))
+    rate = len(texts) / (time.perf_counter() - start)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        model.encode_batch([query])  # encode_batch skips the query cache
+        latencies.append(time.perf_counter() - start)
+    ms = np.array(latencies) * 1000
+
+    line = (
+        f"{backend:>9}  load={load_secs:5.1f}s  {rate:7.1f} texts/s  "
+        f"query p50={np.percentile(ms, 50):6.2f} ms  p99={np.percentile(ms, 99):6.2f} ms"
+    )
+    if reference is not None:
+        cosine = (reference * vectors).sum(axis=1)  # rows are unit length
+        line += f"  cosine vs torch min={cosine.min():.4f} mean={cosine.mean():.4f}"
+    print(line)
+    return vectors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--emails", type=int, default=2000, help="Emails to encode (default: 2000)")
+    parser.add_argument("--queries", type=int, default=200, help="Single queries to time (default: 200)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Encode batch size (default: 32)")
+    parser.add_argument("--backends", type=str, default="torch,onnx,onnx-int8", help="Comma-separated backends")
+    args = parser.parse_args()
+
+    texts = make_texts(args.emails)
+    queries = [" ".join(text.split()[4:10]) for text in make_texts(args.queries, seed=1)]
+
+    backends = [b.strip() for b in args.backends.split(",")]
+    reference = None
+    if "torch" in backends:
+        backends.remove("torch")
+        reference = run("torch", texts, queries, args.batch_size, None)
+    for backend in backends:
+        run(backend, texts, queries, args.batch_size, reference)
@@ -0,0 +1,134 @@
+"""
+Semantic search backends on a synthetic corpus: recall@k against exact search, query latency
+and the memory each keeps resident for its vectors.
+
+Backends (see EMAIL_PARSER_VECTOR_INDEX):
+    hnsw     Chroma's HNSW index (float32)
+    exact    brute-force sidecar, float32 rows in a memory-mapped matrix: one matmul per query
+    float16  brute-force sidecar, float16 rows, top candidates rescored exactly
+    int8     brute-force sidecar, int8 rows + per-row scale, rescored exactly
+
+Usage:
+    poetry run python benchmarks/vector_search.py                     # 20k emails, k=10
+    poetry run python benchmarks/vector_search.py --emails 100000 --queries 500
+    poetry run python benchmarks/vector_search.py --backends int8 --rescore 2
+    poetry run python benchmarks/vector_search.py --store memory --backends hnsw,exact
+    poetry run python benchmarks/vector_search.py --backends hnsw \
+        --hnsw "m=16,search_ef=10; m=16,search_ef=100; m=32,construction_ef=200,search_ef=200"
+
+With `--store memory` the collections are held in memory (EMAIL_PARSER_STORE_BACKEND), so
+"hnsw" measures an exact brute-force scan instead of Chroma's graph.
+
+Each --hnsw configuration (EmailStore.rebuild_emails_collection arguments, `;`-separated)
+rebuilds the HNSW graph and is measured as its own row, with the rebuild time.
+
+The corpus is clustered Gaussian noise in 384 dimensions, which gives HNSW and the quantizers
+a harder time than uniform noise does. Queries are perturbed corpus vectors.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from gmail_parser.store import EmailStore
+from gmail_parser.vectors import normalize
+
+logging.basicConfig(level=logging.WARNING, format="%(levelname)s | %(message)s")
+
+
+def make_corpus(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(clusters, size=n)] + 0.6 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def make_queries(corpus: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.integers(len(corpus), size=count)]
+    return (picks + 0.3 * rng.normal(size=picks.shape)).astype(np.float32)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> list[set[int]]:
+    scores = normalize(queries) @ normalize(corpus).T
+    return [set(np.argpartition(-row, k - 1)[:k].tolist()) for row in scores]
+
+
+def ingest(store: EmailStore, corpus: np.ndarray, batch: int = 5000):
+    for start in range(0, len(corpus), batch):
+        rows = range(start, min(start + batch, len(corpus)))
+        store.upsert_emails_batch(
+            [f"e{i}" for i in rows],
+            ["" for _ in rows],
+            corpus[start : start + len(rows)],
+            [{"date_timestamp": i} for i in rows],
+        )
+
+
+def resident_bytes(store: EmailStore, backend: str, n: int, dim: int) -> int:
+    if backend == "hnsw":
+        return n * dim * 4  # hnswlib keeps every vector as float32, plus its graph links
+    row_bytes = np.dtype(store._vectors.dtype).itemsize * dim + 4  # row + scale
+    return n * row_bytes
+
+
+def parse_hnsw(spec: str) -> list[dict[str, int]]:
+    configs = []
+    for config in filter(None, (c.strip() for c in spec.split(";"))):
+        configs.append({key.strip(): int(value) for key, value in (item.split("=") for item in config.split(","))})
+    return configs
+
+
+def run(label: str, store: EmailStore, queries: np.ndarray, truth: list[set[int]], k: int, n: int, dim: int):
+    backend = store._vector_index
+    store.query(queries[0].tolist(), n_results=k)  # load indexes outside the timed loop
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = store.query(query.tolist(), n_results=k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(expected & {int(gid[1:]) for gid in result["ids"][0]})
+    ms = np.array(latencies) * 1000
+    print(
+        f"{label:>8}  recall@{k}={hits / (len(queries) * k):.3f}  "
+        f"p50={np.percentile(ms, 50):6.2f} ms  p99={np.percentile(ms, 99):6.2f} ms  "
+        f"vectors={resident_bytes(store, backend, n, dim) / 2**20:7.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark semantic search backends")
+    parser.add_argument("--emails", type=int, default=20000, help="Corpus size (default: 20000)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to time (default: 200)")
+    parser.add_argument("--k", type=int, default=10, help="Results per query (default: 10)")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (default: 384)")
+    parser.add_argument("--clusters", type=int, default=200, help="Topic clusters in the corpus (default: 200)")
+    parser.add_argument("--rescore", type=int, default=None, help="Sidecar candidates per result (default: setting)")
+    parser.add_argument("--backends", type=str, default="hnsw,exact,float16,int8", help="Comma-separated backends")
+    parser.add_argument("--hnsw", type=str, default="", help="HNSW configurations to rebuild and measure")
+    parser.add_argument("--store", type=str, default="chroma", help="Store backend: chroma or memory (default: chroma)")
+    args = parser.parse_args()
+
+    if args.rescore:
+        os.environ["EMAIL_PARSER_VECTOR_RESCORE_FACTOR"] = str(args.rescore)
+    corpus = make_corpus(args.emails, args.dim, args.clusters)
+    queries = make_queries(corpus, args.queries)
+    truth = exact_top_k(corpus, queries, args.k)
+
+    with tempfile.TemporaryDirectory() as persist_dir:
+        start = time.perf_counter()
+        ingest(EmailStore(persist_dir, backend=args.store), corpus)
+        print(f"ingested {args.emails:,} emails in {time.perf_counter() - start:.1f}s")
+        for backend in (b.strip() for b in args.backends.split(",")):
+            store = EmailStore(persist_dir, vector_index=backend, backend=args.store)
+            if backend != "hnsw" or not args.hnsw:
+                run(backend, store, queries, truth, args.k, args.emails, args.dim)
+                continue
+            for config in parse_hnsw(args.hnsw):
+                start = time.perf_counter()
+                store.rebuild_emails_collection(**config)
+                print(f"rebuilt HNSW with {config} in {time.perf_counter() - start:.1f}s")
+                label = " ".join(f"{key}={value}" for key, value in config.items())
+                run(label, store, queries, truth, args.k, args.emails, args.dim)
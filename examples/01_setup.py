@@ -3,10 +3,12 @@ First-time setup: authenticate with Gmail.
 
 Run this once before any other example:
     poetry run python examples/01_setup.py
+    poetry run python examples/01_setup.py --account shared   # extra mailbox (token_shared.json)
 
 Prerequisites:
     1. credentials.json in project root (from Google Cloud Console)
 """
+import argparse
 import logging
 
 from gmail_parser import GmailAuth
@@ -14,7 +16,11 @@ from gmail_parser import GmailAuth
 logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
 
 if __name__ == "__main__":
-    auth = GmailAuth()
+    parser = argparse.ArgumentParser(description="Authenticate with Gmail")
+    parser.add_argument("--account", type=str, default=None, help="Account id (see EMAIL_PARSER_ACCOUNTS)")
+    args = parser.parse_args()
+
+    auth = GmailAuth(account_id=args.account)
     auth.authenticate()
-    print("Authentication successful — token.json saved")
+    print(f"Authentication successful — {auth._token_path} saved")
     print("You can now run the other examples.")
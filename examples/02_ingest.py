@@ -10,6 +10,7 @@ Usage:
     poetry run python examples/02_ingest.py --newer 6m       # last 6 months (Gmail syntax)
     poetry run python examples/02_ingest.py --max 50         # limit to 50 emails
     poetry run python examples/02_ingest.py --query "from:boss@company.com" --days 60
+    poetry run python examples/02_ingest.py --account shared --days 30
 
 Requires: 01_setup.py to have been run first.
 """
@@ -27,9 +28,10 @@ if __name__ == "__main__":
     parser.add_argument("--newer", type=str, help="Gmail relative time, e.g. '30d', '2m', '1y'")
     parser.add_argument("--max", type=int, default=100000, help="Max emails to ingest (default: 100000)")
     parser.add_argument("--query", type=str, default="", help="Additional Gmail search query")
+    parser.add_argument("--account", type=str, default=None, help="Account id (see EMAIL_PARSER_ACCOUNTS)")
     args = parser.parse_args()
 
-    pipeline = IngestionPipeline()
+    pipeline = IngestionPipeline(account_id=args.account)
 
     print("Syncing labels...")
     pipeline.sync_labels()
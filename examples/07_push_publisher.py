@@ -0,0 +1,48 @@
+"""
+Local stand-in for Google Pub/Sub: post Gmail-style push notifications to the dashboard.
+
+Usage:
+    poetry run python examples/07_push_publisher.py --email you@gmail.com --history-id 123456
+    poetry run python examples/07_push_publisher.py --email you@gmail.com --history-id 123456 --burst 20
+
+Requires the API running with DASHBOARD_PUSH_TOKEN set; pass the same value via --token.
+A burst of notifications should produce a single incremental sync (see GET /api/sync/push).
+"""
+import argparse
+import base64
+import json
+import time
+import urllib.request
+import uuid
+
+
+def envelope(email: str, history_id: int) -> dict:
+    data = json.dumps({"emailAddress": email, "historyId": history_id}).encode()
+    return {
+        "message": {
+            "data": base64.b64encode(data).decode(),
+            "messageId": uuid.uuid4().hex,
+            "publishTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "subscription": "projects/local/subscriptions/gmail-push",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish fake Gmail push notifications")
+    parser.add_argument("--email", required=True, help="Mailbox address the notification is for")
+    parser.add_argument("--history-id", type=int, required=True, help="historyId to announce")
+    parser.add_argument("--burst", type=int, default=1, help="Number of notifications to send (default: 1)")
+    parser.add_argument("--interval", type=float, default=0.2, help="Seconds between notifications (default: 0.2)")
+    parser.add_argument("--url", default="http://localhost:8000/api/push/gmail", help="Webhook URL")
+    parser.add_argument("--token", required=True, help="Value of DASHBOARD_PUSH_TOKEN")
+    args = parser.parse_args()
+
+    for i in range(args.burst):
+        body = json.dumps(envelope(args.email, args.history_id + i)).encode()
+        req = urllib.request.Request(
+            f"{args.url}?token={args.token}", data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(req) as resp:
+            print(f"[{i + 1}/{args.burst}] {resp.status} {resp.read().decode()}")
+        time.sleep(args.interval)
@@ -0,0 +1,37 @@
+"""
+Bulk-import a Google Takeout mbox, then catch up the tail through the Gmail API.
+
+Usage:
+    poetry run python examples/08_import_mbox.py ~/Takeout/Mail/All\ mail\ Including\ Spam\ and\ Trash.mbox
+    poetry run python examples/08_import_mbox.py mail.mbox --workers 8 --no-catch-up
+    poetry run python examples/08_import_mbox.py mail.mbox --account shared
+
+Requires: 01_setup.py for the catch-up step (and labels, so user labels map to their ids).
+"""
+import argparse
+import logging
+
+from gmail_parser import IngestionPipeline
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a Takeout mbox archive")
+    parser.add_argument("path", help="Path to the .mbox file")
+    parser.add_argument("--workers", type=int, default=4, help="Parser processes (default: 4)")
+    parser.add_argument("--no-catch-up", action="store_true", help="Skip the final Gmail API sync")
+    parser.add_argument("--account", type=str, default=None, help="Account id (see EMAIL_PARSER_ACCOUNTS)")
+    args = parser.parse_args()
+
+    pipeline = IngestionPipeline(account_id=args.account)
+    if not args.no_catch_up:
+        print("Syncing labels...")
+        pipeline.sync_labels()
+
+    count = pipeline.import_mbox(
+        args.path,
+        workers=args.workers,
+        catch_up=not args.no_catch_up,
+        progress_callback=lambda done, skipped: print(f"\r{done:,} imported, {skipped:,} skipped", end=""),
+    )
+    print(f"\nDone — imported {count} emails")
@@ -27,6 +27,7 @@ export const api = {
     incremental: () => post('/sync/incremental', {}),
     cancel: () => post('/sync/cancel', {}),
     categorize: () => post('/sync/categorize', {}),
+    categorizeStatus: () => get('/sync/categorize'),
     llmProcess: (force = false) => post('/sync/llm-process', { force }),
     llmProcessStatus: () => get('/sync/llm-process'),
     llmCancel: () => post('/sync/llm-cancel', {}),
@@ -85,10 +85,10 @@ export default function EmailPanel({ emailId, onClose }) {
       })
       .catch(() => setError(true))
 
-    // Fetch the actual HTML body from Gmail
+    // Fetch the actual HTML body from Gmail (the stored text body when Gmail is unreachable)
     api.emails.body(emailId)
       .then((data) => setBody(data))
-      .catch(() => {})
+      .catch(() => setBody({}))
   }, [emailId])
 
   useEffect(() => {
@@ -193,13 +193,13 @@ export default function EmailPanel({ emailId, onClose }) {
         <div className="flex-1 overflow-y-auto">
           {error ? (
             <p className="px-5 py-4 text-[12px] text-base-400">Failed to load email.</p>
-          ) : !email ? (
+          ) : !email || !body ? (
             <p className="px-5 py-4 text-[12px] text-base-400">Loading<span className="blink">_</span></p>
-          ) : body?.html ? (
+          ) : body.html ? (
             <HtmlBody html={body.html} />
           ) : (
             <pre className="px-5 py-4 text-[12px] text-base-300 whitespace-pre-wrap leading-relaxed break-words">
-              {body?.text || email.document || '(no body)'}
+              {body.text || '(no body)'}
             </pre>
           )}
         </div>
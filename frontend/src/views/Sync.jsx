@@ -127,12 +127,22 @@ export default function SyncPage() {
     fetchLogs()
   }
 
+  const pollCategorize = () => {
+    const poll = setInterval(async () => {
+      const s = await api.sync.categorizeStatus()
+      if (!s.is_running) {
+        clearInterval(poll)
+        setCatResult(s)
+        setCategorizing(false)
+      }
+    }, 2000)
+  }
+
   const runCategorize = async () => {
     setCategorizing(true)
     setCatResult(null)
-    const res = await api.sync.categorize()
-    setCatResult(res)
-    setCategorizing(false)
+    await api.sync.categorize()
+    pollCategorize()
   }
 
   const startLlmProcess = async (force = false) => {
@@ -150,6 +160,12 @@ export default function SyncPage() {
 
   useEffect(() => {
     api.sync.llmProcessStatus().then(setLlmStatus)
+    api.sync.categorizeStatus().then((s) => {
+      if (s.is_running) {
+        setCategorizing(true)
+        pollCategorize()
+      }
+    })
   }, [])
 
   // Merge: show script lines then api logs (api logs are for API-triggered syncs)
@@ -13,7 +13,7 @@ from gmail_parser.exceptions import (
 )
 from gmail_parser.ingestion import IngestionPipeline
 from gmail_parser.search import EmailSearch, SearchFilters
-from gmail_parser.store import EmailStore
+from gmail_parser.store import EmailStore, get_store
 
 __all__ = [
     "GmailAuth",
@@ -21,6 +21,7 @@ __all__ = [
     "EmailParserSettings",
     "settings",
     "EmailStore",
+    "get_store",
     "EmbeddingModel",
     "IngestionPipeline",
     "EmailSearch",
@@ -22,9 +22,10 @@ class GmailAuth:
         credentials_path: str | None = None,
         token_path: str | None = None,
         scopes: list[str] | None = None,
+        account_id: str | None = None,
     ):
         self._credentials_path = credentials_path or settings.google_credentials_path
-        self._token_path = token_path or settings.google_token_path
+        self._token_path = token_path or settings.token_path_for(account_id)
         self._scopes = scopes or SCOPES
         self._creds: Credentials | None = None
 
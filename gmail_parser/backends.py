@@ -0,0 +1,415 @@
+import logging
+import threading
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Protocol
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings as ChromaSettings
+from chromadb.errors import InvalidCollectionException
+
+from gmail_parser.exceptions import StoreError
+
+logger = logging.getLogger(__name__)
+
+# EMAIL_PARSER_STORE_BACKEND values
+BACKENDS = ("chroma", "memory")
+
+_COMPARISONS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+_OPERATORS = ("$eq", "$ne", "$in", "$nin", *_COMPARISONS)
+
+_RESULT_KEYS = ("ids", "embeddings", "documents", "uris", "data", "metadatas")
+
+
+class Collection(Protocol):
+    """The part of Chroma's Collection API that EmailStore uses.
+
+    `where` filters follow Chroma: one key or operator per dict, `$and`/`$or`
+    over lists of at least two filters, and per-field `$eq`, `$ne`, `$gt`,
+    `$gte`, `$lt`, `$lte`, `$in` and `$nin`. Results are dicts keyed like
+    Chroma's, with None for fields not in `include`.
+    """
+
+    name: str
+    id: uuid.UUID
+    metadata: dict | None
+
+    def count(self) -> int: ...
+
+    def get(
+        self,
+        ids: list[str] | None = None,
+        where: dict | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        include: list[str] = ...,
+    ) -> dict: ...
+
+    def query(
+        self, query_embeddings, n_results: int = 10, where: dict | None = None, include: list[str] = ...
+    ) -> dict: ...
+
+    def upsert(self, ids: list[str], embeddings=None, metadatas=None, documents=None) -> None: ...
+
+    def update(self, ids: list[str], embeddings=None, metadatas=None, documents=None) -> None: ...
+
+    def delete(self, ids: list[str] | None = None, where: dict | None = None) -> None: ...
+
+    def modify(self, name: str | None = None, metadata: dict | None = None) -> None: ...
+
+
+class StoreClient(Protocol):
+    """The part of Chroma's client API that EmailStore uses."""
+
+    def get_or_create_collection(self, name: str, metadata: dict | None = None, embedding_function=None) -> Collection: ...
+
+    def create_collection(self, name: str, metadata: dict | None = None, embedding_function=None) -> Collection: ...
+
+    def get_collection(self, name: str) -> Collection: ...
+
+    def delete_collection(self, name: str) -> None: ...
+
+    def list_collections(self) -> list[str]: ...
+
+    def clear_system_cache(self) -> None: ...
+
+
+def open_client(backend: str, persist_dir: str) -> StoreClient:
+    if backend == "chroma":
+        return chromadb.PersistentClient(path=persist_dir, settings=ChromaSettings(anonymized_telemetry=False))
+    if backend == "memory":
+        return MemoryClient.at(persist_dir)
+    raise StoreError(f"Unknown store backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+
+# --- Where filters ---
+
+
+def compile_where(where: dict) -> Callable[[dict | None], bool]:
+    """A predicate on metadata dicts that matches like Chroma's SQLite `where` filtering.
+
+    Values only match stored values of the same type (numbers, strings or
+    bools; ints and floats compare with each other). `$ne` and `$nin` match
+    every record the positive form doesn't, including those without the key.
+    """
+    if not isinstance(where, dict) or len(where) != 1:
+        raise ValueError(f"Expected where to have exactly one operator, got {where}")
+    (key, value), = where.items()
+    if key in ("$and", "$or"):
+        if not isinstance(value, list) or len(value) < 2:
+            raise ValueError(f"Expected where value for {key} to be a list with at least two where expressions, got {value}")
+        parts = [compile_where(w) for w in value]
+        if key == "$and":
+            return lambda meta: all(p(meta) for p in parts)
+        return lambda meta: any(p(meta) for p in parts)
+    if not isinstance(value, dict):
+        value = {"$eq": value}
+    if len(value) != 1:
+        raise ValueError(f"Expected operator expression to have exactly one operator, got {value}")
+    (op, operand), = value.items()
+    return _compile_operator(key, op, operand)
+
+
+def _kind(value) -> str | None:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "str"
+    return None
+
+
+def _compile_operator(key: str, op: str, operand) -> Callable[[dict | None], bool]:
+    if op not in _OPERATORS:
+        raise ValueError(f"Expected where operator to be one of {', '.join(_OPERATORS)}, got {op}")
+    if op in _COMPARISONS and _kind(operand) != "number":
+        raise ValueError(f"Expected operand value to be an int or a float for operator {op}, got {operand}")
+    if op in ("$in", "$nin"):
+        if not isinstance(operand, list) or not operand or len({_kind(v) for v in operand}) != 1:
+            raise ValueError(f"Expected where operand value to be a non-empty list of one type, got {operand}")
+        kind = _kind(operand[0])
+        values = set(operand)
+    else:
+        kind = _kind(operand)
+    if kind is None:
+        raise ValueError(f"Expected where operand value to be a str, int, float, or list of those type, got {operand}")
+    compare = _COMPARISONS.get(op)
+
+    def positive(meta: dict | None) -> bool:
+        stored = (meta or {}).get(key)
+        if _kind(stored) != kind:
+            return False
+        if op in ("$in", "$nin"):
+            return stored in values
+        if compare is not None:
+            return compare(stored, operand)
+        return stored == operand
+
+    if op in ("$ne", "$nin"):
+        return lambda meta: not positive(meta)
+    return positive
+
+
+# --- In-memory backend ---
+
+
+def _check_metadata(metadata: dict | None):
+    if metadata is None:
+        return
+    if not isinstance(metadata, dict) or not metadata:
+        raise ValueError(f"Expected metadata to be a non-empty dict or None, got {metadata}")
+    for key, value in metadata.items():
+        if not isinstance(key, str) or _kind(value) is None:
+            raise ValueError(f"Expected metadata value to be a str, int, float or bool, got {key}={value!r}")
+
+
+def _check_ids(ids: list[str]):
+    if len(set(ids)) != len(ids):
+        duplicates = sorted({gid for gid in ids if ids.count(gid) > 1})
+        raise ValueError(f"Expected IDs to be unique, found duplicates of: {', '.join(duplicates[:5])}")
+
+
+def _column(values, n: int) -> list:
+    return [None] * n if values is None else list(values)
+
+
+class MemoryCollection:
+    """A Chroma collection's records held in a dict, with exact vector search.
+
+    Records keep their insertion position (an upsert of an existing id stays
+    where it was), which is the order `get()` returns them in, as Chroma
+    does. Upserts and updates merge metadata keys into the existing record's.
+    Queries are brute force over every matching record, in the collection's
+    `hnsw:space` ("l2" by default, "cosine" or "ip"). Once its client deletes
+    it, every call raises InvalidCollectionException, as Chroma's do.
+    """
+
+    def __init__(self, client: "MemoryClient", name: str, metadata: dict | None):
+        self._client = client
+        self.name = name
+        self.id = uuid.uuid4()
+        self.metadata = metadata
+        self._lock = threading.RLock()
+        # id -> [position, document, embedding, metadata]
+        self._rows: dict[str, list] = {}
+        self._next_position = 0
+        # Stacked embeddings for query(), rebuilt after a write
+        self._matrix: tuple[list[str], np.ndarray] | None = None
+        self.deleted = False
+
+    def count(self) -> int:
+        self._check_exists()
+        return len(self._rows)
+
+    def _check_exists(self):
+        if self.deleted:
+            raise InvalidCollectionException(f"Collection {self.id} does not exist.")
+
+    def modify(self, name: str | None = None, metadata: dict | None = None):
+        if name is not None and name != self.name:
+            self._client._rename(self, name)
+        if metadata is not None:
+            self.metadata = metadata
+
+    # --- Writes ---
+
+    def upsert(self, ids: list[str], embeddings=None, metadatas=None, documents=None):
+        self._write(ids, embeddings, metadatas, documents, insert=True)
+
+    def update(self, ids: list[str], embeddings=None, metadatas=None, documents=None):
+        self._write(ids, embeddings, metadatas, documents, insert=False)
+
+    def delete(self, ids: list[str] | None = None, where: dict | None = None):
+        with self._lock:
+            for gid in self._select(ids, where):
+                del self._rows[gid]
+            self._matrix = None
+
+    def _write(self, ids: list[str], embeddings, metadatas, documents, insert: bool):
+        self._check_exists()
+        ids = list(ids)
+        _check_ids(ids)
+        n = len(ids)
+        embeddings = None if embeddings is None else np.asarray(embeddings, dtype=np.float32).reshape(n, -1)
+        metadatas = _column(metadatas, n)
+        documents = _column(documents, n)
+        for meta in metadatas:
+            _check_metadata(meta)
+        missing = 0
+        with self._lock:
+            for i, gid in enumerate(ids):
+                row = self._rows.get(gid)
+                if row is None:
+                    if not insert:
+                        missing += 1
+                        continue
+                    row = self._rows[gid] = [self._next_position, None, None, None]
+                    self._next_position += 1
+                if documents[i] is not None:
+                    row[1] = documents[i]
+                if embeddings is not None:
+                    row[2] = embeddings[i].copy()
+                if metadatas[i] is not None:
+                    row[3] = {**(row[3] or {}), **metadatas[i]}
+            self._matrix = None
+        if missing:
+            logger.warning("[MemoryCollection] %s: update of %d nonexisting ids", self.name, missing)
+
+    # --- Reads ---
+
+    def get(
+        self,
+        ids: list[str] | None = None,
+        where: dict | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        include: list[str] = ("metadatas", "documents"),
+    ) -> dict:
+        with self._lock:
+            selected = self._select(ids, where)[offset or 0 :]
+            if limit is not None:
+                selected = selected[:limit]
+            return {"ids": selected, **self._fields(selected, include), "included": list(include)}
+
+    def query(
+        self,
+        query_embeddings,
+        n_results: int = 10,
+        where: dict | None = None,
+        include: list[str] = ("metadatas", "documents", "distances"),
+    ) -> dict:
+        self._check_exists()
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        with self._lock:
+            ids, matrix = self._stacked()
+            if where is not None:
+                match = compile_where(where)
+                keep = np.array([match(self._rows[gid][3]) for gid in ids], dtype=bool)
+                ids, matrix = [gid for gid, k in zip(ids, keep) if k], matrix[keep]
+            pages = []
+            for row in self._distances(queries, matrix):
+                top = np.argsort(row, kind="stable")[:n_results]
+                chosen = [ids[i] for i in top]
+                pages.append({"ids": chosen, **self._fields(chosen, include), "distances": row[top].tolist()})
+        result = {key: [page[key] for page in pages] for key in (*_RESULT_KEYS, "distances")}
+        for key in ("embeddings", "documents", "metadatas", "distances"):
+            if key not in include:
+                result[key] = None
+        return {**result, "uris": None, "data": None, "included": list(include)}
+
+    def _fields(self, ids: list[str], include) -> dict:
+        """Included fields of the given records, keyed like a get() result (caller holds the lock)."""
+        rows = [self._rows[gid] for gid in ids]
+        return {
+            "embeddings": np.array([row[2] for row in rows], dtype=np.float32) if "embeddings" in include else None,
+            "documents": [row[1] for row in rows] if "documents" in include else None,
+            "uris": None,
+            "data": None,
+            "metadatas": [dict(row[3]) if row[3] else None for row in rows] if "metadatas" in include else None,
+        }
+
+    def _select(self, ids: list[str] | None, where: dict | None) -> list[str]:
+        """Ids of the records matching both filters, in storage order (caller holds the lock)."""
+        self._check_exists()
+        if ids is None:
+            selected = list(self._rows)
+        else:
+            selected = sorted((gid for gid in dict.fromkeys(ids) if gid in self._rows), key=lambda g: self._rows[g][0])
+        if where is not None:
+            match = compile_where(where)
+            selected = [gid for gid in selected if match(self._rows[gid][3])]
+        return selected
+
+    def _stacked(self) -> tuple[list[str], np.ndarray]:
+        if self._matrix is None:
+            ids = [gid for gid, row in self._rows.items() if row[2] is not None]
+            vectors = [self._rows[gid][2] for gid in ids]
+            self._matrix = ids, np.array(vectors, dtype=np.float32) if vectors else np.zeros((0, 0), np.float32)
+        return self._matrix
+
+    def _distances(self, queries: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        if not len(matrix):
+            return np.zeros((len(queries), 0), dtype=np.float32)
+        space = (self.metadata or {}).get("hnsw:space", "l2")
+        if space == "cosine":
+            def unit(v):
+                norms = np.linalg.norm(v, axis=1, keepdims=True)
+                return v / np.where(norms == 0, 1, norms)
+            return 1 - unit(queries) @ unit(matrix).T
+        if space == "ip":
+            return 1 - queries @ matrix.T
+        return (queries**2).sum(1)[:, None] - 2 * queries @ matrix.T + (matrix**2).sum(1)[None, :]
+
+
+class MemoryClient:
+    """Chroma client stand-in whose collections live in memory.
+
+    One client per persist dir for the life of the process (or until
+    `clear_system_cache()`), so stores reopened on the same directory, like
+    two processes sharing a Chroma directory, see the same records. Nothing
+    is written to disk; the store's sidecars still are.
+    """
+
+    _clients: dict[str, "MemoryClient"] = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections: dict[str, MemoryCollection] = {}
+
+    @classmethod
+    def at(cls, persist_dir: str | Path) -> "MemoryClient":
+        key = str(Path(persist_dir).resolve())
+        with cls._clients_lock:
+            return cls._clients.setdefault(key, cls())
+
+    @classmethod
+    def clear_system_cache(cls):
+        with cls._clients_lock:
+            cls._clients.clear()
+
+    def get_or_create_collection(self, name: str, metadata: dict | None = None, embedding_function=None) -> MemoryCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(self, name, metadata)
+            return self._collections[name]
+
+    def create_collection(self, name: str, metadata: dict | None = None, embedding_function=None) -> MemoryCollection:
+        with self._lock:
+            if name in self._collections:
+                raise ValueError(f"Collection {name} already exists")
+            collection = self._collections[name] = MemoryCollection(self, name, metadata)
+            return collection
+
+    def get_collection(self, name: str) -> MemoryCollection:
+        with self._lock:
+            if name not in self._collections:
+                raise ValueError(f"Collection {name} does not exist")
+            return self._collections[name]
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            collection = self._collections.pop(name, None)
+            if collection is None:
+                raise ValueError(f"Collection {name} does not exist")
+            collection.deleted = True
+
+    def list_collections(self) -> list[str]:
+        with self._lock:
+            return list(self._collections)
+
+    def _rename(self, collection: MemoryCollection, name: str):
+        with self._lock:
+            if name in self._collections:
+                raise ValueError(f"Collection {name} already exists")
+            del self._collections[collection.name]
+            collection.name = name
+            self._collections[name] = collection
@@ -0,0 +1,132 @@
+import logging
+from datetime import UTC, datetime, timedelta
+
+from gmail_parser.config import settings
+from gmail_parser.ingestion import IngestionPipeline
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillScheduler:
+    """Recency-first historical sync for one account.
+
+    The last `recent_days` are synced first at the normal rate, so the dashboard
+    is useful within minutes. Older mail is then walked back in `window_days`
+    windows, newest first, with a slower Gmail rate budget. Progress is stored
+    after every window, so a restarted backfill resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline | None = None,
+        recent_days: int | None = None,
+        window_days: int | None = None,
+        inter_batch_delay: float | None = None,
+        floor: datetime | None = None,
+    ):
+        self._pipeline = pipeline or IngestionPipeline()
+        self._store = self._pipeline.store
+        self._recent_days = recent_days or settings.backfill_recent_days
+        self._window_days = window_days or settings.backfill_window_days
+        self._delay = (
+            inter_batch_delay
+            if inter_batch_delay is not None
+            else settings.backfill_inter_batch_delay
+        )
+        self._floor = floor or datetime.fromisoformat(settings.backfill_floor).replace(tzinfo=UTC)
+
+    @property
+    def account_id(self) -> str:
+        return self._pipeline.account_id
+
+    def state(self) -> dict | None:
+        return self._store.get_backfill_state(self.account_id)
+
+    def reset(self):
+        self._store.delete_backfill_state(self.account_id)
+
+    def run(self, progress_callback=None, cancel_check=None) -> dict:
+        """Run (or resume) the backfill until complete or cancelled. Returns the stored state.
+
+        `progress_callback(state, synced, total)` is called per batch, where
+        synced/total are counts within the current window.
+        """
+        state = self.state() or self._initial_state()
+        if state["status"] == "complete":
+            return state
+
+        def on_batch(synced: int, total: int):
+            if progress_callback:
+                progress_callback(state, synced, total)
+
+        if state["status"] == "recent":
+            logger.info(
+                "[BackfillScheduler] syncing last %d days (account=%s)",
+                state["recent_days"],
+                self.account_id,
+            )
+            count = self._pipeline.full_sync(
+                days_ago=state["recent_days"],
+                progress_callback=on_batch,
+                cancel_check=cancel_check,
+            )
+            if cancel_check and cancel_check():
+                return state
+            state = self._save(state, status="history", emails_synced=state["emails_synced"] + count)
+
+        window = timedelta(days=state["window_days"])
+        floor = datetime.fromisoformat(state["floor"])
+        while (cursor := datetime.fromisoformat(state["cursor"])) > floor:
+            if cancel_check and cancel_check():
+                break
+            start = max(cursor - window, floor)
+            logger.info(
+                "[BackfillScheduler] window %s → %s (account=%s)",
+                start.date(),
+                cursor.date(),
+                self.account_id,
+            )
+            with self._pipeline.client.throttled(self._delay):
+                count = self._pipeline.full_sync(
+                    after=start,
+                    before=cursor,
+                    progress_callback=on_batch,
+                    cancel_check=cancel_check,
+                    update_history=False,
+                )
+            # A cancelled window is redone on resume; already stored ids are skipped cheaply
+            if cancel_check and cancel_check():
+                break
+            state = self._save(
+                state,
+                cursor=start.isoformat(),
+                windows_done=state["windows_done"] + 1,
+                emails_synced=state["emails_synced"] + count,
+            )
+        else:
+            state = self._save(state, status="complete")
+            logger.info(
+                "[BackfillScheduler] backfill complete (account=%s, %d emails)",
+                self.account_id,
+                state["emails_synced"],
+            )
+        return state
+
+    def _initial_state(self) -> dict:
+        now = datetime.now(UTC)
+        return {
+            "status": "recent",
+            "recent_days": self._recent_days,
+            "window_days": self._window_days,
+            "cursor": (now - timedelta(days=self._recent_days)).isoformat(),
+            "floor": self._floor.isoformat(),
+            "windows_done": 0,
+            "emails_synced": 0,
+            "started_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+        }
+
+    def _save(self, state: dict, **changes) -> dict:
+        state = {**state, **changes, "updated_at": datetime.now(UTC).isoformat()}
+        self._store.update_backfill_state(state, self.account_id)
+        return state
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Blob codecs. Bodies that zlib doesn't shrink (short or already dense) are kept as-is.
+_RAW, _ZLIB = 0, 1
+_ZLIB_LEVEL = 6
+
+# Ids per SQLite statement; stays under SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _encode(data: bytes) -> tuple[int, bytes]:
+    packed = zlib.compress(data, _ZLIB_LEVEL)
+    return (_ZLIB, packed) if len(packed) < len(data) else (_RAW, data)
+
+
+def _decode(codec: int, data: bytes) -> str:
+    return (zlib.decompress(data) if codec == _ZLIB else data).decode("utf-8")
+
+
+class BodyStore:
+    """Email bodies, compressed and deduplicated by content, stored beside Chroma.
+
+    Chroma keeps an empty document for each email, so metadata reads don't
+    pull bodies through SQLite; readers that render a body fetch it here by
+    gmail_id. Identical bodies (mailing-list copies, re-sent notifications)
+    share one blob, which is dropped when nothing refers to it any more.
+    EmailStore writes a body before its Chroma row, and `reconcile()` moves
+    the documents of stores written before this existed.
+    """
+
+    FILENAME = "bodies.sqlite3"
+
+    def __init__(self, persist_dir: str | Path):
+        self._path = Path(persist_dir) / self.FILENAME
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "hash BLOB PRIMARY KEY, codec INTEGER NOT NULL, size INTEGER NOT NULL, data BLOB NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bodies (gmail_id TEXT PRIMARY KEY, hash BLOB NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bodies_hash ON bodies (hash)")
+        self._conn.commit()
+
+    def put(self, ids: list[str], bodies: list[str]):
+        rows = []
+        blobs: dict[bytes, bytes] = {}
+        for gid, body in zip(ids, bodies):
+            data = (body or "").encode("utf-8")
+            digest = _digest(data)
+            blobs[digest] = data
+            rows.append((gid, digest))
+        with self._lock, self._conn:
+            # Take the write lock up front: another process must not drop a blob we found to exist
+            self._conn.execute("BEGIN IMMEDIATE")
+            known = self._existing_hashes(list(blobs))
+            new = []
+            for digest, data in blobs.items():
+                if digest not in known:
+                    codec, packed = _encode(data)
+                    new.append((digest, codec, len(data), packed))
+            self._conn.executemany("INSERT INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)", new)
+            replaced = self._hashes_of(ids)
+            self._conn.executemany("INSERT OR REPLACE INTO bodies (gmail_id, hash) VALUES (?, ?)", rows)
+            self._drop_orphans(replaced - set(blobs))
+
+    def get(self, ids: list[str]) -> dict[str, str]:
+        """Bodies by gmail_id; ids without one are omitted."""
+        found: dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(ids), _CHUNK):
+                chunk = ids[i : i + _CHUNK]
+                found.update(
+                    (gid, _decode(codec, data))
+                    for gid, codec, data in self._conn.execute(
+                        "SELECT b.gmail_id, x.codec, x.data FROM bodies b JOIN blobs x ON x.hash = b.hash "
+                        f"WHERE b.gmail_id IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        return found
+
+    def delete(self, ids: list[str]):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            hashes = self._hashes_of(ids)
+            for i in range(0, len(ids), _CHUNK):
+                chunk = ids[i : i + _CHUNK]
+                self._conn.execute(f"DELETE FROM bodies WHERE gmail_id IN ({','.join('?' * len(chunk))})", chunk)
+            self._drop_orphans(hashes)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM bodies").fetchone()[0]
+
+    def ids(self) -> set[str]:
+        with self._lock:
+            return {gid for (gid,) in self._conn.execute("SELECT gmail_id FROM bodies")}
+
+    def stats(self) -> dict:
+        """Body and blob counts, with the bodies' total size before and after dedup and compression."""
+        with self._lock:
+            bodies, raw = self._conn.execute(
+                "SELECT count(*), coalesce(sum(x.size), 0) FROM bodies b JOIN blobs x ON x.hash = b.hash"
+            ).fetchone()
+            blobs, stored = self._conn.execute("SELECT count(*), coalesce(sum(length(data)), 0) FROM blobs").fetchone()
+        return {"bodies": bodies, "blobs": blobs, "raw_bytes": raw, "stored_bytes": stored}
+
+    def reconcile(self, store_ids: list[str], fetch, batch_size: int = 1000) -> list[str]:
+        """Bring the store in line with `store_ids`; returns the ids whose bodies were copied in.
+
+        `fetch(ids)` returns bodies for ids the store is missing (their Chroma documents).
+        """
+        held = self.ids()
+        stale = list(held - set(store_ids))
+        missing = [gid for gid in store_ids if gid not in held]
+        if stale:
+            self.delete(stale)
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i : i + batch_size]
+            self.put(batch, fetch(batch))
+        if stale or missing:
+            logger.info("[BodyStore] moved %d bodies in, dropped %d", len(missing), len(stale))
+        return missing
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Internals (callers hold the lock) ---
+
+    def _existing_hashes(self, hashes: list[bytes]) -> set[bytes]:
+        found: set[bytes] = set()
+        for i in range(0, len(hashes), _CHUNK):
+            chunk = hashes[i : i + _CHUNK]
+            found.update(
+                h for (h,) in self._conn.execute(
+                    f"SELECT hash FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                )
+            )
+        return found
+
+    def _hashes_of(self, ids: list[str]) -> set[bytes]:
+        found: set[bytes] = set()
+        for i in range(0, len(ids), _CHUNK):
+            chunk = ids[i : i + _CHUNK]
+            found.update(
+                h for (h,) in self._conn.execute(
+                    f"SELECT hash FROM bodies WHERE gmail_id IN ({','.join('?' * len(chunk))})", chunk
+                )
+            )
+        return found
+
+    def _drop_orphans(self, hashes: set[bytes]):
+        self._conn.executemany(
+            "DELETE FROM blobs WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM bodies WHERE hash = ?)",
+            [(h, h) for h in hashes],
+        )
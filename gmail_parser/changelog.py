@@ -0,0 +1,101 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Changes kept after compaction; consumers further behind than this rebuild instead
+_RETAIN = 100_000
+
+
+@dataclass(frozen=True)
+class Change:
+    version: int
+    collection: str  # "emails" or "expenses"
+    op: str  # "upsert", "update", "delete", or "swap" (a rebuilt emails collection replaced the old one)
+    ids: list[str]
+    fields: list[str]  # metadata keys written; upserts also list "document" and "embedding"
+    ts: float
+
+
+class ChangeLog:
+    """Append-only log of store mutations, stored beside Chroma.
+
+    Every EmailStore write appends one entry after the Chroma write succeeds.
+    The entry's version is the store version: it is monotonic, survives
+    restarts and is shared by every process using the same persist dir.
+    Consumers remember the last version they applied and read `since()` it.
+    """
+
+    FILENAME = "changes.sqlite3"
+
+    def __init__(self, persist_dir: str | Path):
+        self._path = Path(persist_dir) / self.FILENAME
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # AUTOINCREMENT never reuses a version, even after old entries are compacted away
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "version INTEGER PRIMARY KEY AUTOINCREMENT, collection TEXT NOT NULL, op TEXT NOT NULL, "
+            "ids TEXT NOT NULL, fields TEXT NOT NULL, ts REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def record(self, collection: str, op: str, ids: list[str], fields: list[str]) -> int:
+        """Append a change and return its version."""
+        with self._lock, self._conn:
+            version = self._conn.execute(
+                "INSERT INTO changes (collection, op, ids, fields, ts) VALUES (?, ?, ?, ?, ?)",
+                (collection, op, json.dumps(ids), json.dumps(sorted(fields)), time.time()),
+            ).lastrowid
+        if version % 1000 == 0:
+            self.compact()
+        return version
+
+    def version(self) -> int:
+        """The latest version; 0 for a store that has never been written."""
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def since(self, version: int, collection: str | None = None, limit: int | None = None) -> list[Change] | None:
+        """Changes after `version`, oldest first.
+
+        Returns None if entries after `version` have been compacted away; the
+        caller must then rebuild from the store rather than catch up.
+        """
+        with self._lock:
+            oldest = self._conn.execute("SELECT min(version) FROM changes").fetchone()[0]
+            if oldest is not None and oldest > version + 1:
+                return None
+            sql = "SELECT version, collection, op, ids, fields, ts FROM changes WHERE version > ?"
+            params: list = [version]
+            if collection:
+                sql += " AND collection = ?"
+                params.append(collection)
+            sql += " ORDER BY version"
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+            rows = self._conn.execute(sql, params).fetchall()
+        if oldest is None and version < self.version():
+            return None
+        return [Change(v, c, op, json.loads(ids), json.loads(fields), ts) for v, c, op, ids, fields, ts in rows]
+
+    def compact(self, retain: int = _RETAIN):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM changes WHERE version <= (SELECT seq FROM sqlite_sequence WHERE name = 'changes') - ?",
+                (retain,),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -2,6 +2,7 @@ import base64
 import logging
 import random
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from email.utils import parsedate_to_datetime
 
@@ -15,9 +16,20 @@ logger = logging.getLogger(__name__)
 
 
 class GmailClient:
-    def __init__(self, auth: GmailAuth | None = None):
+    def __init__(self, auth: GmailAuth | None = None, inter_batch_delay: float = 2.0):
         self._auth = auth or GmailAuth()
         self._service = None
+        self.inter_batch_delay = inter_batch_delay
+
+    @contextmanager
+    def throttled(self, inter_batch_delay: float):
+        """Temporarily space out batch fetches, e.g. so a background backfill leaves quota for live syncs."""
+        previous = self.inter_batch_delay
+        self.inter_batch_delay = inter_batch_delay
+        try:
+            yield self
+        finally:
+            self.inter_batch_delay = previous
 
     @property
     def service(self):
@@ -59,7 +71,6 @@ class GmailClient:
         non_retryable_failures = set()
         pending_ids = list(message_ids)
         batch_size = 10
-        inter_batch_delay = 2.0
 
         for attempt in range(max_retries + 1):
             if not pending_ids:
@@ -89,7 +100,7 @@ class GmailClient:
                 batch.execute()
 
                 if i + batch_size < len(pending_ids):
-                    time.sleep(inter_batch_delay)
+                    time.sleep(self.inter_batch_delay)
 
             if not rate_limited_ids:
                 break
@@ -111,7 +122,22 @@ class GmailClient:
         return [results[mid] for mid in message_ids if mid in results], failed
 
     def get_history_id(self) -> str:
-        return self.service.users().getProfile(userId="me").execute().get("historyId", "")
+        return self.get_profile().get("historyId", "")
+
+    def get_profile(self) -> dict:
+        return self.service.users().getProfile(userId="me").execute()
+
+    # --- Push notifications ---
+
+    def watch(self, topic_name: str, label_ids: list[str] | None = None) -> dict:
+        """Start Gmail push notifications to a Pub/Sub topic. Returns {historyId, expiration}."""
+        body: dict = {"topicName": topic_name}
+        if label_ids:
+            body.update({"labelIds": label_ids, "labelFilterBehavior": "include"})
+        return self.service.users().watch(userId="me", body=body).execute()
+
+    def stop_watch(self):
+        self.service.users().stop(userId="me").execute()
 
     @staticmethod
     def parse_message_metadata(raw: dict) -> dict:
@@ -0,0 +1,298 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from gmail_parser.sidecar import VersionedSidecar, save_npz
+
+FLAG_READ = 1
+FLAG_STARRED = 2
+FLAG_ATTACHMENTS = 4
+FLAG_UNSUBSCRIBE = 8
+FLAG_HAS_DATE = 16
+FLAG_ACTION_ITEMS = 32
+FLAG_TRANSACTIONS = 64
+
+# metadata key -> (flag, value when the key is missing); mirrors the defaults analytics always used
+_FLAG_FIELDS = {
+    "is_read": (FLAG_READ, True),
+    "is_starred": (FLAG_STARRED, False),
+    "has_attachments": (FLAG_ATTACHMENTS, False),
+    "list_unsubscribe": (FLAG_UNSUBSCRIBE, ""),
+    "date_iso": (FLAG_HAS_DATE, ""),
+    "has_action_items": (FLAG_ACTION_ITEMS, False),
+    "has_transactions": (FLAG_TRANSACTIONS, False),
+}
+
+
+class _Dictionary:
+    """Interns strings to dense integer codes."""
+
+    def __init__(self, values: list[str] | None = None):
+        self.values: list[str] = list(values or [])
+        self._codes = {v: i for i, v in enumerate(self.values)}
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def get(self, value: str) -> int | None:
+        return self._codes.get(value)
+
+
+@dataclass(frozen=True)
+class ColumnView:
+    """An immutable copy of the columns, optionally restricted to one account.
+
+    Row i describes email `ids[i]`. `sender`, `category` and the bits of
+    `labels` are codes into `senders`, `categories` and `label_names`.
+    """
+
+    ids: list[str]
+    ts: np.ndarray  # int64 unix seconds, 0 when the email has no date
+    tz_offset: np.ndarray  # int16 minutes east of UTC, from the Date header
+    sender: np.ndarray  # int32
+    category: np.ndarray  # int32
+    flags: np.ndarray  # uint8 FLAG_* bits
+    labels: np.ndarray  # uint64 (rows, words) bitset
+    senders: list[str]
+    categories: list[str]
+    label_names: list[str]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def has(self, flag: int) -> np.ndarray:
+        return (self.flags & flag) != 0
+
+    def local_seconds(self) -> np.ndarray:
+        """Timestamps shifted to the sender's wall clock, as `date_iso` shows them."""
+        return self.ts + self.tz_offset.astype(np.int64) * 60
+
+    def iso(self, row: int) -> str:
+        if not self.flags[row] & FLAG_HAS_DATE:
+            return ""
+        tz = timezone(timedelta(minutes=int(self.tz_offset[row])))
+        return datetime.fromtimestamp(int(self.ts[row]), tz).isoformat()
+
+    def category_code(self, name: str) -> int:
+        return self.categories.index(name) if name in self.categories else -1
+
+    def label_mask(self, names) -> np.ndarray:
+        """Rows carrying any of the given labels."""
+        mask = np.zeros(len(self), dtype=bool)
+        for name in names:
+            if name in self.label_names:
+                bit = self.label_names.index(name)
+                mask |= (self.labels[:, bit // 64] >> np.uint64(bit % 64)) & np.uint64(1) != 0
+        return mask
+
+    def ids_where(self, mask: np.ndarray) -> list[str]:
+        return [self.ids[i] for i in np.flatnonzero(mask)]
+
+
+class MetadataColumns(VersionedSidecar):
+    """Columnar mirror of the hot email metadata fields, persisted as .npz beside Chroma.
+
+    Kept in step with Chroma through the store change log (see VersionedSidecar).
+    """
+
+    FILENAME = "metadata_columns.npz"
+    SAVE_DELAY_SECS = 2.0
+
+    def __init__(self, persist_dir: str | Path):
+        super().__init__(Path(persist_dir) / self.FILENAME)
+        self._reset()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # --- Mutations ---
+
+    def upsert(self, ids: list[str], metadatas: list[dict]):
+        """Add emails; like Chroma's upsert, an existing row only changes in the keys given."""
+        with self._lock:
+            known = [gid in self._index for gid in ids]
+            self.update([g for g, k in zip(ids, known) if k], [m for m, k in zip(metadatas, known) if k])
+            self.replace([g for g, k in zip(ids, known) if not k], [m for m, k in zip(metadatas, known) if not k])
+
+    def replace(self, ids: list[str], metadatas: list[dict]):
+        """Set rows to whole metadata records read back from Chroma."""
+        with self._lock:
+            rows = []
+            for gid in ids:
+                row = self._index.get(gid)
+                if row is None:
+                    row = self._index[gid] = len(self._ids)
+                    self._ids.append(gid)
+                rows.append(row)
+            self._reserve(len(self._ids))
+            for row, meta in zip(rows, metadatas):
+                self._ts[row] = 0
+                self._tz[row] = 0
+                self._flags[row] = 0
+                self._labels[row] = 0
+                self._sender[row] = self._senders.code(meta.get("sender", ""))
+                self._category[row] = self._categories.code(meta.get("category", "Other"))
+                self._account[row] = self._accounts.code(meta.get("account_id", ""))
+                self._apply(row, {**{k: d for k, (_, d) in _FLAG_FIELDS.items()}, **meta})
+            self._mark_dirty()
+
+    def update(self, ids: list[str], metadatas: list[dict]):
+        """Apply partial metadata updates (only the keys present change)."""
+        with self._lock:
+            for gid, meta in zip(ids, metadatas):
+                row = self._index.get(gid)
+                if row is None:
+                    continue
+                if "sender" in meta:
+                    self._sender[row] = self._senders.code(meta["sender"])
+                if "category" in meta:
+                    self._category[row] = self._categories.code(meta["category"])
+                if "account_id" in meta:
+                    self._account[row] = self._accounts.code(meta["account_id"])
+                if "labels" in meta:
+                    self._labels[row] = 0
+                self._apply(row, meta)
+            self._mark_dirty()
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            drop = [self._index[gid] for gid in ids if gid in self._index]
+            if not drop:
+                return
+            n = len(self._ids)
+            keep = np.ones(n, dtype=bool)
+            keep[drop] = False
+            self._ids = [gid for gid, k in zip(self._ids, keep) if k]
+            self._index = {gid: i for i, gid in enumerate(self._ids)}
+            for name in ("_ts", "_tz", "_sender", "_category", "_account", "_flags", "_labels"):
+                setattr(self, name, getattr(self, name)[:n][keep])
+            self._mark_dirty()
+
+    # --- Reading ---
+
+    def view(self, account_id: str | None = None) -> ColumnView:
+        with self._lock:
+            n = len(self._ids)
+            if account_id is None:
+                rows = slice(0, n)
+                ids = list(self._ids)
+            else:
+                code = self._accounts.get(account_id)
+                rows = np.flatnonzero(self._account[:n] == code) if code is not None else np.array([], dtype=np.int64)
+                ids = [self._ids[i] for i in rows]
+            return ColumnView(
+                ids=ids,
+                ts=self._ts[:n][rows].copy(),
+                tz_offset=self._tz[:n][rows].copy(),
+                sender=self._sender[:n][rows].copy(),
+                category=self._category[:n][rows].copy(),
+                flags=self._flags[:n][rows].copy(),
+                labels=self._labels[:n][rows].copy(),
+                senders=list(self._senders.values),
+                categories=list(self._categories.values),
+                label_names=list(self._label_names.values),
+            )
+
+    # --- Persistence ---
+
+    def _save(self):
+        n = len(self._ids)
+        save_npz(
+            self._path,
+            ids=np.array(self._ids, dtype=str),
+            ts=self._ts[:n],
+            tz=self._tz[:n],
+            sender=self._sender[:n],
+            category=self._category[:n],
+            account=self._account[:n],
+            flags=self._flags[:n],
+            labels=self._labels[:n],
+            senders=np.array(self._senders.values, dtype=str),
+            categories=np.array(self._categories.values, dtype=str),
+            accounts=np.array(self._accounts.values, dtype=str),
+            label_names=np.array(self._label_names.values, dtype=str),
+            version=np.int64(self.version),
+        )
+
+    def _read(self):
+        with np.load(self._path) as data:
+            self._ids = data["ids"].tolist()
+            self._index = {gid: i for i, gid in enumerate(self._ids)}
+            self._ts = data["ts"].copy()
+            self._tz = data["tz"].copy()
+            self._sender = data["sender"].copy()
+            self._category = data["category"].copy()
+            self._account = data["account"].copy()
+            self._flags = data["flags"].copy()
+            self._labels = data["labels"].copy()
+            self._senders = _Dictionary(data["senders"].tolist())
+            self._categories = _Dictionary(data["categories"].tolist())
+            self._accounts = _Dictionary(data["accounts"].tolist())
+            self._label_names = _Dictionary(data["label_names"].tolist())
+            self.version = int(data["version"]) if "version" in data else 0
+
+    # --- Internals ---
+
+    def _reset(self):
+        self._ids: list[str] = []
+        self._index: dict[str, int] = {}
+        self._ts = np.zeros(0, dtype=np.int64)
+        self._tz = np.zeros(0, dtype=np.int16)
+        self._sender = np.zeros(0, dtype=np.int32)
+        self._category = np.zeros(0, dtype=np.int32)
+        self._account = np.zeros(0, dtype=np.int32)
+        self._flags = np.zeros(0, dtype=np.uint8)
+        self._labels = np.zeros((0, 1), dtype=np.uint64)
+        self._senders = _Dictionary()
+        self._categories = _Dictionary()
+        self._accounts = _Dictionary()
+        self._label_names = _Dictionary()
+
+    def _reserve(self, n: int):
+        """Grow arrays geometrically so appends during a sync stay amortized O(1)."""
+        capacity = len(self._ts)
+        if n <= capacity:
+            return
+        capacity = max(n, capacity * 2, 1024)
+        for name in ("_ts", "_tz", "_sender", "_category", "_account", "_flags"):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[: len(old)] = old
+            setattr(self, name, grown)
+        grown = np.zeros((capacity, self._labels.shape[1]), dtype=np.uint64)
+        grown[: len(self._labels)] = self._labels
+        self._labels = grown
+
+    def _apply(self, row: int, meta: dict):
+        for key, (flag, _) in _FLAG_FIELDS.items():
+            if key in meta:
+                if meta[key]:
+                    self._flags[row] |= flag
+                else:
+                    self._flags[row] &= ~np.uint8(flag)
+        if "date_timestamp" in meta:
+            self._ts[row] = int(meta["date_timestamp"] or 0)
+        if meta.get("date_iso"):
+            try:
+                offset = datetime.fromisoformat(meta["date_iso"]).utcoffset()
+                self._tz[row] = int(offset.total_seconds() // 60) if offset else 0
+            except ValueError:
+                self._flags[row] &= ~np.uint8(FLAG_HAS_DATE)
+        if meta.get("labels"):
+            for name in meta["labels"].strip("|").split("|"):
+                if name:
+                    self._set_label(row, self._label_names.code(name))
+
+    def _set_label(self, row: int, bit: int):
+        word = bit // 64
+        if word >= self._labels.shape[1]:
+            wider = np.zeros((len(self._labels), word + 1), dtype=np.uint64)
+            wider[:, : self._labels.shape[1]] = self._labels
+            self._labels = wider
+        self._labels[row, word] |= np.uint64(1) << np.uint64(bit % 64)
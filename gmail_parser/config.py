@@ -1,5 +1,9 @@
+from pathlib import Path
+
 from pydantic_settings import BaseSettings
 
+DEFAULT_ACCOUNT = "default"
+
 
 class EmailParserSettings(BaseSettings):
     model_config = {"env_prefix": "EMAIL_PARSER_"}
@@ -9,7 +13,47 @@ class EmailParserSettings(BaseSettings):
     google_token_path: str = "token.json"
     embedding_model: str = "all-MiniLM-L6-v2"
     embedding_dimension: int = 384
+    # How embedding_model runs: "torch" (SentenceTransformer's default), or exported to ONNX and
+    # run by onnxruntime, "onnx" (float32) or "onnx-int8" (dynamically quantized weights: faster
+    # on CPU, with embeddings close to, but not the same as, the float ones already stored)
+    embedding_backend: str = "torch"
+    query_cache_size: int = 1024  # recent query embeddings kept per model (0 disables)
+    # Where the collections live: "chroma" (on disk), or "memory" (this process only; for
+    # tests and benchmarks). The sidecar indexes are kept in chroma_persist_dir either way
+    store_backend: str = "chroma"
+    # Semantic search backend: "hnsw" (Chroma), or a brute-force sidecar of the embeddings,
+    # either "exact" (float32) or "float16"/"int8" with the top candidates rescored exactly
+    vector_index: str = "hnsw"
+    vector_rescore_factor: int = 4  # sidecar candidates per requested result
+    # HNSW graph of the emails collection (Chroma's defaults). They are fixed when the graph
+    # is built: after changing them, run EmailStore.rebuild_emails_collection()
+    hnsw_m: int = 16
+    hnsw_construction_ef: int = 100
+    hnsw_search_ef: int = 100
+    write_batch_max: int = 2000  # ids per merged write on the store's writer thread
+    mirror_refresh_secs: float = 1.0  # how often the metadata mirror picks up other processes' writes
+    # Store maintenance (EmailStore.run_maintenance): scheduled runs only vacuum a SQLite file
+    # once this share of its pages is free, and only rebuild an HNSW graph (emails) or vector
+    # sidecar once this share of its slots is deleted
+    maintenance_interval_hours: float = 24.0  # 0 disables the scheduled run
+    maintenance_vacuum_ratio: float = 0.2
+    maintenance_rebuild_ratio: float = 0.3
     sync_batch_size: int = 100
+    accounts: str = DEFAULT_ACCOUNT  # comma-separated account ids
+    backfill_recent_days: int = 30  # synced first, at the normal rate
+    backfill_window_days: int = 90  # older history is walked back in windows of this size
+    backfill_inter_batch_delay: float = 6.0  # seconds between Gmail batch fetches for older windows
+    backfill_floor: str = "2004-04-01"  # oldest date the backfill walks back to
+
+    def account_list(self) -> list[str]:
+        return [a.strip() for a in self.accounts.split(",") if a.strip()] or [DEFAULT_ACCOUNT]
+
+    def token_path_for(self, account_id: str | None = None) -> str:
+        """The default account keeps `google_token_path`; others get token_<id>.json beside it."""
+        if not account_id or account_id == DEFAULT_ACCOUNT:
+            return self.google_token_path
+        path = Path(self.google_token_path)
+        return str(path.with_name(f"{path.stem}_{account_id}{path.suffix}"))
 
 
 def get_settings() -> EmailParserSettings:
@@ -1,5 +1,12 @@
 import logging
+import os
+import platform
 import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
 
 from gmail_parser.config import settings
 from gmail_parser.exceptions import EmbeddingError
@@ -8,35 +15,253 @@ logger = logging.getLogger(__name__)
 
 MAX_BODY_CHARS = 1000
 
+# Inference backends: SentenceTransformer's own (torch), or the model exported to ONNX and run
+# by onnxruntime, as float32 or with its weights dynamically quantized to int8
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
 
 class EmbeddingModel:
-    def __init__(self, model_name: str | None = None):
+    """Encodes text with a SentenceTransformer shared by every instance for the same model and backend.
+
+    Instances are cheap: the weights are loaded once per process, on the
+    first encode by any instance (see `shared_model`). Single texts go
+    through an LRU cache of recent queries, also shared per model and backend.
+    """
+
+    def __init__(self, model_name: str | None = None, backend: str | None = None):
         self._model_name = model_name or settings.embedding_model
-        self._model = None
+        self._backend = backend or settings.embedding_backend
+        if self._backend not in BACKENDS:
+            raise ValueError(f"Unsupported embedding backend {self._backend!r}")
+        self._model: SharedModel | None = None
+        self._queries = query_cache(model_key(self._model_name, self._backend))
 
     def load(self):
         if self._model:
             return
-        try:
-            from sentence_transformers import SentenceTransformer
-            logger.info("[EmbeddingModel] loading %s", self._model_name)
-            self._model = SentenceTransformer(self._model_name)
-        except Exception as e:
-            raise EmbeddingError(f"Failed to load model {self._model_name}: {e}") from e
+        self._model = shared_model(self._model_name, self._backend)
 
     def _ensure_loaded(self):
         if not self._model:
             self.load()
 
     def encode(self, text: str) -> list[float]:
-        self._ensure_loaded()
-        return self._model.encode(text, normalize_embeddings=True).tolist()
+        """Embedding of one text (a search query), from the query cache when it was seen recently."""
+        key = QueryCache.key(text)
+        vector = self._queries.get(key)
+        if vector is None:
+            self._ensure_loaded()
+            with self._model.lock:
+                vector = self._model.model.encode(key, normalize_embeddings=True).tolist()
+            self._queries.put(key, vector)
+        return vector
+
+    def cache_stats(self) -> dict:
+        """Query cache size, capacity, hits and misses for this model (shared by every instance)."""
+        return self._queries.stats()
 
     def encode_batch(self, texts: list[str], batch_size: int = 32) -> list[list[float]]:
         self._ensure_loaded()
-        return self._model.encode(texts, batch_size=batch_size, normalize_embeddings=True).tolist()
+        with self._model.lock:
+            return self._model.model.encode(texts, batch_size=batch_size, normalize_embeddings=True).tolist()
 
     @staticmethod
     def prepare_email_text(subject: str, body: str, sender: str) -> str:
         body = re.sub(r"\s+", " ", (body or "")).strip()[:MAX_BODY_CHARS]
         return f"From: {sender or ''}\nSubject: {subject or ''}\n{body}"
+
+
+# --- Query cache ---
+
+
+class QueryCache:
+    """LRU of query text to embedding, with hit and miss counters.
+
+    Keys are the text with runs of whitespace collapsed, which the tokenizer
+    ignores anyway, so retyped queries that differ only in spacing share an
+    entry. A size of 0 disables it.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str) -> str:
+        return " ".join((text or "").split())
+
+    def get(self, key: str) -> list[float] | None:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return list(vector)
+
+    def put(self, key: str, vector: list[float]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = tuple(vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+_query_caches: dict[str, QueryCache] = {}
+_query_caches_lock = threading.Lock()
+
+
+def query_cache(key: str) -> QueryCache:
+    """The process-wide query cache for a `model_key`."""
+    with _query_caches_lock:
+        if key not in _query_caches:
+            _query_caches[key] = QueryCache(settings.query_cache_size)
+        return _query_caches[key]
+
+
+# --- Shared models ---
+
+
+class SharedModel:
+    """A loaded SentenceTransformer and the lock its encode calls take.
+
+    Calls are serialized: Hugging Face fast tokenizers fail when two threads
+    use one at once, and torch or onnxruntime already spreads a single call
+    over the cores.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+
+
+_models: dict[str, SharedModel] = {}
+_models_lock = threading.Lock()
+# One lock per model, so a slow load doesn't hold up callers of other models
+_load_locks: dict[str, threading.Lock] = {}
+
+
+def model_key(model_name: str, backend: str = "torch") -> str:
+    """Registry key of a model on a backend; the torch model keeps its bare name."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def shared_model(model_name: str, backend: str = "torch") -> SharedModel:
+    """Process-wide model for `model_name` on `backend`, loaded from disk on first use.
+
+    Concurrent first callers wait for a single load. A failed load is not
+    remembered, so the next call tries again.
+    """
+    key = model_key(model_name, backend)
+    with _models_lock:
+        if key in _models:
+            return _models[key]
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+    with load_lock:
+        with _models_lock:
+            if key in _models:
+                return _models[key]
+        try:
+            logger.info("[EmbeddingModel] loading %s (%s)", model_name, backend)
+            model = SharedModel(_load(model_name, backend))
+        except Exception as e:
+            raise EmbeddingError(f"Failed to load model {model_name} ({backend}): {e}") from e
+        with _models_lock:
+            _models[key] = model
+        return model
+
+
+def _load(model_name: str, backend: str):
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    path, file_name = export_onnx(model_name, quantize=backend == "onnx-int8")
+    return SentenceTransformer(str(path), backend="onnx", model_kwargs={"file_name": file_name})
+
+
+# --- ONNX export ---
+
+
+def onnx_dir(model_name: str) -> Path:
+    """Where `export_onnx` keeps a model's ONNX files: under models/ in the persist directory."""
+    return Path(settings.chroma_persist_dir) / "models" / model_name.replace("/", "--")
+
+
+def quantization_config() -> str:
+    """The int8 preset for this CPU: arm64 on ARM, else avx2, which any recent x86-64 CPU runs."""
+    return "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2"
+
+
+def export_onnx(model_name: str, quantize: bool = False) -> tuple[Path, str]:
+    """Export `model_name` to ONNX once; returns its directory and the model file to load from it.
+
+    The float32 graph is saved as model.onnx with the tokenizer and pooling
+    config beside it. Quantizing adds onnx/model_qint8_<preset>.onnx: int8
+    weights, with activations quantized per batch at run time, so no
+    calibration data is needed. Each file is written to a temporary
+    directory beside the model and moved into place, so an interrupted
+    export is redone rather than loaded half-written. Later calls reuse the files.
+    Needs `optimum[onnxruntime]` (the "onnx" extra).
+    """
+    from sentence_transformers import SentenceTransformer
+
+    path = onnx_dir(model_name)
+    if not (path / "model.onnx").exists():
+        logger.info("[EmbeddingModel] exporting %s to ONNX in %s", model_name, path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+        try:
+            SentenceTransformer(model_name, backend="onnx").save_pretrained(str(tmp))
+            _replace_dir(tmp, path)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    if not quantize:
+        return path, "model.onnx"
+    preset = quantization_config()
+    file_name = f"onnx/model_qint8_{preset}.onnx"
+    if not (path / file_name).exists():
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info("[EmbeddingModel] quantizing %s to int8 (%s)", model_name, preset)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+        try:
+            export_dynamic_quantized_onnx_model(SentenceTransformer(str(path), backend="onnx"), preset, str(tmp))
+            (path / "onnx").mkdir(exist_ok=True)
+            os.replace(tmp / file_name, path / file_name)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return path, file_name
+
+
+def _replace_dir(tmp: Path, path: Path):
+    """Move a finished export into place, so readers never see a half-written model directory.
+
+    If another process got there first its export is kept; a leftover without
+    model.onnx (an export interrupted before exports were atomic) is replaced.
+    """
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        if (path / "model.onnx").exists():
+            return
+        shutil.rmtree(path)
+        os.replace(tmp, path)
+
+
+def clear_models():
+    """Drop the shared models and their query caches; the next encode reloads them."""
+    with _models_lock:
+        _models.clear()
+    with _query_caches_lock:
+        _query_caches.clear()
@@ -0,0 +1,136 @@
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+from gmail_parser.exceptions import SearchError
+
+logger = logging.getLogger(__name__)
+
+# bm25() weights for (subject, body): a hit in the subject counts double
+_BM25_WEIGHTS = (2.0, 1.0)
+
+_TERM_RE = re.compile(r'"([^"]*)"?|(\S+)')
+_WORD_RE = re.compile(r"\w+")
+
+
+def to_match_query(query: str) -> str | None:
+    """Translate a user query into an FTS5 MATCH expression.
+
+    Supported syntax: `"exact phrase"`, `prefix*`, and bare words, all of which
+    must match (implicit AND). Punctuation is treated as a word separator, so
+    arbitrary input never produces an FTS5 syntax error. Returns None if the
+    query has no searchable words.
+    """
+    parts = []
+    for phrase, term in _TERM_RE.findall(query):
+        words = _WORD_RE.findall(phrase or term)
+        if not words:
+            continue
+        part = '"' + " ".join(words) + '"'
+        if term.endswith("*"):
+            part += "*"
+        parts.append(part)
+    return " ".join(parts) or None
+
+
+class FullTextIndex:
+    """SQLite FTS5 index over email subjects and bodies, stored beside Chroma.
+
+    EmailStore applies every upsert/delete here. Chroma stays the source of
+    truth: `reconcile()` indexes emails the index is missing and drops ones
+    Chroma no longer has (first use on an existing store, or after a crash
+    between the two writes).
+    """
+
+    FILENAME = "fulltext.sqlite3"
+
+    def __init__(self, persist_dir: str | Path):
+        self._path = Path(persist_dir) / self.FILENAME
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # The API server and the ingestion worker may both write; WAL lets readers proceed meanwhile
+        self._conn = sqlite3.connect(self._path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, gmail_id TEXT UNIQUE NOT NULL)")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts USING fts5("
+            "subject, body, prefix='2 3 4', tokenize='porter unicode61 remove_diacritics 2')"
+        )
+        self._conn.commit()
+
+    def upsert(self, ids: list[str], subjects: list[str | None], bodies: list[str]):
+        """Index emails; a None subject keeps an indexed email's subject, as Chroma's metadata merge does."""
+        with self._lock, self._conn:
+            for gid, subject, body in zip(ids, subjects, bodies):
+                row = self._conn.execute("SELECT id FROM docs WHERE gmail_id = ?", (gid,)).fetchone()
+                if row:
+                    rowid = row[0]
+                    if subject is None:
+                        subject = self._conn.execute(
+                            "SELECT subject FROM emails_fts WHERE rowid = ?", (rowid,)
+                        ).fetchone()[0]
+                    self._conn.execute("DELETE FROM emails_fts WHERE rowid = ?", (rowid,))
+                else:
+                    rowid = self._conn.execute("INSERT INTO docs (gmail_id) VALUES (?)", (gid,)).lastrowid
+                self._conn.execute(
+                    "INSERT INTO emails_fts (rowid, subject, body) VALUES (?, ?, ?)",
+                    (rowid, subject or "", body or ""),
+                )
+
+    def delete(self, ids: list[str]):
+        with self._lock, self._conn:
+            for gid in ids:
+                row = self._conn.execute("SELECT id FROM docs WHERE gmail_id = ?", (gid,)).fetchone()
+                if row:
+                    self._conn.execute("DELETE FROM emails_fts WHERE rowid = ?", row)
+                    self._conn.execute("DELETE FROM docs WHERE id = ?", row)
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[str, float]]:
+        """Best BM25 matches as (gmail_id, score), highest score first."""
+        match = to_match_query(query)
+        if match is None:
+            return []
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT d.gmail_id, bm25(emails_fts, ?, ?) AS rank FROM emails_fts "
+                    "JOIN docs d ON d.id = emails_fts.rowid "
+                    "WHERE emails_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (*_BM25_WEIGHTS, match, limit),
+                ).fetchall()
+        except sqlite3.OperationalError as e:
+            raise SearchError(f"Full-text query failed for {query!r}: {e}") from e
+        # SQLite's bm25() is negated so that better matches sort first
+        return [(gid, -rank) for gid, rank in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM docs").fetchone()[0]
+
+    def ids(self) -> set[str]:
+        with self._lock:
+            return {gid for (gid,) in self._conn.execute("SELECT gmail_id FROM docs")}
+
+    def reconcile(self, store_ids: list[str], fetch, batch_size: int = 1000):
+        """Bring the index in line with `store_ids`.
+
+        `fetch(ids)` returns (subjects, bodies) for ids the index is missing.
+        """
+        indexed = self.ids()
+        wanted = set(store_ids)
+        stale = list(indexed - wanted)
+        missing = [gid for gid in store_ids if gid not in indexed]
+        if stale:
+            self.delete(stale)
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i : i + batch_size]
+            self.upsert(batch, *fetch(batch))
+        if stale or missing:
+            logger.info("[FullTextIndex] indexed %d emails, dropped %d", len(missing), len(stale))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,13 +1,19 @@
 import json
 import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import UTC, datetime, timedelta
+from itertools import islice
 
+from gmail_parser.auth import GmailAuth
 from gmail_parser.categorizer import categorize
 from gmail_parser.client import GmailClient
-from gmail_parser.config import settings
+from gmail_parser.config import DEFAULT_ACCOUNT, settings
 from gmail_parser.embeddings import EmbeddingModel
 from gmail_parser.exceptions import SyncError
-from gmail_parser.store import EmailStore
+from gmail_parser.journal import BatchJournal
+from gmail_parser.mbox import iter_mbox, parse_mbox_batch
+from gmail_parser.store import EmailStore, get_store
 
 logger = logging.getLogger(__name__)
 
@@ -18,13 +24,29 @@ class IngestionPipeline:
         client: GmailClient | None = None,
         store: EmailStore | None = None,
         embedding_model: EmbeddingModel | None = None,
+        account_id: str | None = None,
+        journal: BatchJournal | None = None,
     ):
-        self._client = client or GmailClient()
-        self._store = store or EmailStore()
+        self._account_id = account_id or DEFAULT_ACCOUNT
+        self._client = client or GmailClient(GmailAuth(account_id=self._account_id))
+        self._store = store or get_store()
         self._embedding = embedding_model or EmbeddingModel()
+        self._journal = journal or BatchJournal()
+
+    @property
+    def account_id(self) -> str:
+        return self._account_id
+
+    @property
+    def client(self) -> GmailClient:
+        return self._client
+
+    @property
+    def store(self) -> EmailStore:
+        return self._store
 
     def sync_labels(self):
-        logger.info("[IngestionPipeline] syncing labels")
+        logger.info("[IngestionPipeline] syncing labels (account=%s)", self._account_id)
         raw_labels = self._client.list_labels()
         for rl in raw_labels:
             detail = self._client.get_label(rl["id"])
@@ -39,6 +61,7 @@ class IngestionPipeline:
                     "text_color": color.get("textColor", ""),
                     "background_color": color.get("backgroundColor", ""),
                 },
+                account_id=self._account_id,
             )
         logger.info("[IngestionPipeline] synced %d labels", len(raw_labels))
 
@@ -76,19 +99,42 @@ class IngestionPipeline:
         days_ago: int | None = None,
         progress_callback=None,
         cancel_check=None,
+        update_history: bool = True,
     ) -> int:
+        """Sync every message matching the filters.
+
+        Pass `update_history=False` for windows in the past (backfill): the stored
+        history id then stays put, so incremental syncs don't skip mail that
+        arrived while the window was being fetched.
+        """
+        # Only a listing bounded purely by time can prove that unlisted local emails were deleted
+        listing_is_exhaustive = not (query or label_ids or newer_than or older_than)
+        if days_ago is not None:
+            after = datetime.now(UTC) - timedelta(days=days_ago)
+            days_ago = None
         # Always exclude trash and spam — we only want inbox/archive mail
         base = "-in:trash -in:spam"
         query = self.build_time_query(
             f"{base} {query}".strip(), after, before, newer_than, older_than, days_ago
         )
         logger.info(
-            "[IngestionPipeline] starting full sync (max=%d, query='%s')",
+            "[IngestionPipeline] starting full sync (account=%s, max=%d, query='%s')",
+            self._account_id,
             max_emails,
             query,
         )
         batch_size = settings.sync_batch_size
 
+        # Read the history id before listing: anything newer is then replayed by
+        # incremental_sync rather than lost between the listing and the end of the run
+        current_history_id = None
+        if update_history:
+            try:
+                current_history_id = self._client.get_history_id()
+            except Exception:
+                current_history_id = ""
+        run = self._journal.begin_run(self._account_id, current_history_id)
+
         message_stubs = self._client.list_messages(
             query=query, label_ids=label_ids, max_results=max_emails
         )
@@ -98,7 +144,7 @@ class IngestionPipeline:
             progress_callback(0, total_messages)
 
         # Build label gmail_id -> name mapping for pipe-delimited labels
-        label_map = {l["gmail_id"]: l["name"] for l in self._store.get_labels()}
+        label_map = self._label_map()
 
         total_synced = 0
         total_failed = 0
@@ -106,6 +152,7 @@ class IngestionPipeline:
         for i in range(0, total_messages, batch_size):
             if cancel_check and cancel_check():
                 logger.info("[IngestionPipeline] sync cancelled at batch %d", i)
+                self._journal.end_run(run)
                 return total_synced
             chunk_ids = [m["id"] for m in message_stubs[i : i + batch_size]]
             existing = self._store.get_existing_ids(chunk_ids)
@@ -136,21 +183,7 @@ class IngestionPipeline:
                 )
 
             parsed = [GmailClient.parse_message(m) for m in raw_messages]
-
-            texts = [
-                EmbeddingModel.prepare_email_text(
-                    p["subject"], p["body_text"], p["sender"]
-                )
-                for p in parsed
-            ]
-            embeddings = self._embedding.encode_batch(texts)
-
-            built_metadatas = [self._build_metadata(p, label_map) for p in parsed]
-            ids = [p["gmail_id"] for p in parsed]
-            documents = [p["body_text"] or "" for p in parsed]
-
-            self._store.upsert_emails_batch(ids, documents, embeddings, built_metadatas)
-            self._llm_post_process(parsed, built_metadatas)
+            self._store_parsed(parsed, label_map, journal_batch=(run, i))
             total_synced += len(parsed) + len(existing)
             logger.info(
                 "[IngestionPipeline] synced batch %d-%d (%d new, %d skipped, %d failed)",
@@ -163,30 +196,15 @@ class IngestionPipeline:
             if progress_callback:
                 progress_callback(total_synced, total_messages)
 
-        # Deletion detection: remove emails that were deleted in Gmail within this sync's date range
-        gmail_ids_set = {m["id"] for m in message_stubs}
-        time_where: dict | None = None
-        if days_ago is not None:
-            after_ts = int((datetime.now(UTC) - timedelta(days=days_ago)).timestamp())
-            time_where = {"date_timestamp": {"$gte": after_ts}}
-        local_ids_in_range = set(self._store.get_all_ids(time_where))
-        deleted_ids = local_ids_in_range - gmail_ids_set
-        if deleted_ids:
-            delete_list = list(deleted_ids)
-            self._store.delete_emails(delete_list)
-            self._store.delete_expenses(delete_list)
-            logger.info(
-                "[IngestionPipeline] removed %d emails deleted in Gmail",
-                len(deleted_ids),
-            )
+        self._journal.mark_synced(run)
 
-        # Store current historyId so incremental_sync can pick up from here
-        try:
-            current_history_id = self._client.get_history_id()
-        except Exception:
-            current_history_id = ""
+        # Deletion detection: remove emails that were deleted in Gmail within this sync's date range.
+        # Skipped when the listing was filtered or truncated, since unlisted emails may still exist.
+        if listing_is_exhaustive and total_messages < max_emails:
+            self._remove_deleted({m["id"] for m in message_stubs}, after, before)
 
         self._update_sync_state(total_synced, current_history_id)
+        self._journal.end_run(run)
         if total_failed:
             logger.warning(
                 "[IngestionPipeline] full sync complete: %d emails synced, %d FAILED (ids: %s)",
@@ -202,12 +220,15 @@ class IngestionPipeline:
         return total_synced
 
     def incremental_sync(self) -> dict:
-        state = self._store.get_sync_state()
+        state = self._store.get_sync_state(self._account_id)
         if not state or not state.get("last_history_id"):
-            raise SyncError("No previous sync state found. Run full_sync first.")
+            raise SyncError(
+                f"No previous sync state found for account '{self._account_id}'. Run full_sync first."
+            )
 
         logger.info(
-            "[IngestionPipeline] incremental sync from history_id=%s",
+            "[IngestionPipeline] incremental sync (account=%s) from history_id=%s",
+            self._account_id,
             state["last_history_id"],
         )
         try:
@@ -219,6 +240,12 @@ class IngestionPipeline:
             count = self.full_sync(max_emails=500, days_ago=7)
             return {"added": count, "deleted": 0, "refreshed": 0, "fallback": True}
 
+        try:
+            new_history_id = self._client.get_history_id()
+        except Exception:
+            new_history_id = state["last_history_id"]
+        run = self._journal.begin_run(self._account_id, new_history_id)
+
         added_ids: set[str] = set()
         deleted_ids: set[str] = set()
         label_changed_ids: set[str] = set()
@@ -247,7 +274,7 @@ class IngestionPipeline:
         refresh_ids = list(label_changed_ids - added_ids - deleted_ids)
         refreshed = 0
         if refresh_ids:
-            label_map = {l["gmail_id"]: l["name"] for l in self._store.get_labels()}
+            label_map = self._label_map()
             meta_messages, _ = self._client.batch_get_messages(
                 refresh_ids, format="metadata"
             )
@@ -288,7 +315,7 @@ class IngestionPipeline:
         # Fetch and store new emails
         added = 0
         if added_ids:
-            label_map = {l["gmail_id"]: l["name"] for l in self._store.get_labels()}
+            label_map = self._label_map()
             raw_messages, failed_ids = self._client.batch_get_messages(list(added_ids))
             if failed_ids:
                 logger.warning(
@@ -296,29 +323,12 @@ class IngestionPipeline:
                     len(failed_ids),
                 )
             parsed = [GmailClient.parse_message(m) for m in raw_messages]
-            texts = [
-                EmbeddingModel.prepare_email_text(
-                    p["subject"], p["body_text"], p["sender"]
-                )
-                for p in parsed
-            ]
-            embeddings = self._embedding.encode_batch(texts)
-            built_metadatas = [self._build_metadata(p, label_map) for p in parsed]
-            self._store.upsert_emails_batch(
-                [p["gmail_id"] for p in parsed],
-                [p["body_text"] or "" for p in parsed],
-                embeddings,
-                built_metadatas,
-            )
-            self._llm_post_process(parsed, built_metadatas)
+            self._store_parsed(parsed, label_map, journal_batch=(run, 0))
             added = len(parsed)
 
-        try:
-            new_history_id = self._client.get_history_id()
-        except Exception:
-            new_history_id = state["last_history_id"]
-
+        self._journal.mark_synced(run)
         self._update_sync_state(added, new_history_id)
+        self._journal.end_run(run)
         logger.info(
             "[IngestionPipeline] incremental sync complete: +%d added, -%d deleted, %d metadata refreshed",
             added,
@@ -327,29 +337,244 @@ class IngestionPipeline:
         )
         return {"added": added, "deleted": len(to_delete), "refreshed": refreshed}
 
+    def import_mbox(
+        self,
+        path: str,
+        workers: int = 4,
+        batch_size: int | None = None,
+        catch_up: bool = True,
+        progress_callback=None,
+        cancel_check=None,
+    ) -> int:
+        """Bulk-load a Google Takeout mbox without touching the Gmail API.
+
+        Messages are parsed in a process pool while the main process embeds
+        earlier batches, and each batch is embedded while the store's writer
+        thread is still upserting the one before. Emails already in the store
+        are skipped, and LLM extraction is left to /api/sync/llm-process. With
+        `catch_up`, the tail since the newest imported email is fetched from
+        Gmail afterwards.
+        """
+        batch_size = batch_size or settings.sync_batch_size
+        label_map = self._label_map()
+        name_to_id = {name: lid for lid, name in label_map.items()}
+        logger.info("[IngestionPipeline] importing mbox %s (%d workers)", path, workers)
+
+        imported = skipped = 0
+        newest: datetime | None = None
+        writing: Future | None = None  # the previous batch's upsert
+        writing_ids: set[str] = set()
+
+        def _store_batch(parsed: list[dict]):
+            nonlocal imported, skipped, newest, writing, writing_ids
+            existing = self._store.get_existing_ids([p["gmail_id"] for p in parsed]) if parsed else set()
+            # Ids still being written by the previous batch aren't visible to get_existing_ids yet
+            fresh = [p for p in parsed if p["gmail_id"] not in existing and p["gmail_id"] not in writing_ids]
+            if fresh:
+                embeddings, metadatas = self._embed_parsed(fresh, label_map)
+                if writing:
+                    writing.result()
+                writing = self._store.upsert_emails_batch(
+                    [p["gmail_id"] for p in fresh],
+                    [p["body_text"] or "" for p in fresh],
+                    embeddings,
+                    metadatas,
+                    wait=False,
+                )
+                writing_ids = {p["gmail_id"] for p in fresh}
+            imported += len(fresh)
+            skipped += len(parsed) - len(fresh)
+            dates = [p["date"] for p in fresh if p.get("date")]
+            if dates and (newest is None or max(dates) > newest):
+                newest = max(dates)
+            if progress_callback:
+                progress_callback(imported, skipped)
+
+        messages = iter_mbox(path)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight: deque = deque()
+            while batch := list(islice(messages, batch_size)):
+                if cancel_check and cancel_check():
+                    logger.info("[IngestionPipeline] mbox import cancelled")
+                    break
+                in_flight.append(pool.submit(parse_mbox_batch, batch, name_to_id))
+                # Bound read-ahead so memory stays proportional to workers, not mailbox size
+                if len(in_flight) >= workers * 2:
+                    _store_batch(in_flight.popleft().result())
+            while in_flight:
+                _store_batch(in_flight.popleft().result())
+        if writing:
+            writing.result()
+
+        logger.info(
+            "[IngestionPipeline] mbox import complete: %d imported, %d already stored",
+            imported,
+            skipped,
+        )
+        if catch_up and not (cancel_check and cancel_check()):
+            self._catch_up_after_import(newest)
+        return imported
+
+    def _catch_up_after_import(self, newest: datetime | None):
+        state = self._store.get_sync_state(self._account_id)
+        if state and state.get("last_history_id"):
+            self.incremental_sync()
+        elif newest:
+            # No history id yet: list everything since the export (with a day of overlap)
+            self.full_sync(after=newest - timedelta(days=1))
+
+    def recover(self) -> dict:
+        """Finish the journaled stages of runs interrupted by a crash.
+
+        Batches that were never stored are re-fetched, stored batches missing
+        LLM fields are post-processed, and runs that got through every batch
+        commit their history id. Runs that fail again stay in the journal.
+        """
+        result = {"runs": 0, "stored": 0, "llm": 0}
+        for run in self._journal.pending(self._account_id):
+            try:
+                stored, llm = self._recover_run(run)
+            except Exception as e:
+                logger.warning("[IngestionPipeline] recovery of run %s failed: %s", run["run"], e)
+                continue
+            result["runs"] += 1
+            result["stored"] += stored
+            result["llm"] += llm
+        if result["runs"]:
+            logger.info(
+                "[IngestionPipeline] recovered %d interrupted runs (%d emails re-stored, %d LLM-processed)",
+                result["runs"],
+                result["stored"],
+                result["llm"],
+            )
+        return result
+
+    def _recover_run(self, run: dict) -> tuple[int, int]:
+        stored = llm = 0
+        label_map = self._label_map()
+        for b in run["batches"]:
+            journal_batch = (run["run"], b["batch"])
+            if "stored" not in b["stages"]:
+                raw_messages, _ = self._client.batch_get_messages(b["ids"])
+                parsed = [GmailClient.parse_message(m) for m in raw_messages]
+                self._store_parsed(parsed, label_map, llm=b["llm"], journal_batch=journal_batch)
+                stored += len(parsed)
+                llm += len(parsed) if b["llm"] else 0
+            elif b["llm"] and "llm" not in b["stages"]:
+                metadatas = self._store.get_metadatas(b["ids"])
+                parsed = [
+                    {"gmail_id": gid, "subject": m.get("subject", ""), "sender": m.get("sender", ""), "snippet": m.get("snippet", "")}
+                    for gid, m in metadatas.items()
+                ]
+                self._llm_post_process(parsed, list(metadatas.values()))
+                self._journal.mark(*journal_batch, "llm")
+                llm += len(parsed)
+        if run["synced"] and run["history_id"]:
+            state = self._store.get_sync_state(self._account_id) or {}
+            # Never move the history id backwards past a newer sync that did finish
+            if not _history_id_newer(state.get("last_history_id", ""), run["history_id"]):
+                self._update_sync_state(0, run["history_id"])
+        self._journal.end_run(run["run"])
+        return stored, llm
+
     def reindex_embeddings(self, batch_size: int = 100) -> int:
         logger.info("[IngestionPipeline] reindexing all embeddings")
-        all_emails = self._store.get_emails(limit=None)
-        ids = all_emails["ids"]
-        documents = all_emails["documents"]
-        metadatas = all_emails["metadatas"]
+        count = 0
+        # Upserting rows already read keeps their position, so offset paging stays aligned
+        for page in self._store.iter_emails(include=["documents", "metadatas"]):
+            documents = [doc or "" for doc in page["documents"]]
+            texts = [
+                EmbeddingModel.prepare_email_text(
+                    m.get("subject", ""),
+                    doc,
+                    m.get("sender", ""),
+                )
+                for doc, m in zip(documents, page["metadatas"])
+            ]
+            embeddings = self._embedding.encode_batch(texts, batch_size=batch_size)
+            self._store.upsert_emails_batch(page["ids"], documents, embeddings, page["metadatas"])
+            count += len(page["ids"])
+        logger.info("[IngestionPipeline] reindexed %d emails", count)
+        return count
+
+    def _remove_deleted(
+        self, gmail_ids: set[str], after: datetime | None, before: datetime | None
+    ):
+        conditions = []
+        if after:
+            conditions.append({"date_timestamp": {"$gte": int(after.timestamp())}})
+        if before:
+            conditions.append({"date_timestamp": {"$lt": int(before.timestamp())}})
+        if account_where := self._account_where():
+            conditions.append(account_where)
+        where: dict | None = None
+        if len(conditions) == 1:
+            where = conditions[0]
+        elif conditions:
+            where = {"$and": conditions}
+        deleted_ids = set(self._store.iter_ids(where)) - gmail_ids
+        if deleted_ids:
+            delete_list = list(deleted_ids)
+            self._store.delete_emails(delete_list)
+            self._store.delete_expenses(delete_list)
+            logger.info(
+                "[IngestionPipeline] removed %d emails deleted in Gmail",
+                len(deleted_ids),
+            )
 
+    def _store_parsed(
+        self,
+        parsed: list[dict],
+        label_map: dict,
+        llm: bool = True,
+        journal_batch: tuple[str, int] | None = None,
+    ) -> list[dict]:
+        """Embed, build metadata for and upsert parsed messages (GmailClient.parse_message shape).
+
+        With `journal_batch=(run, batch)`, each stage is recorded in the journal.
+        """
+        if not parsed:
+            return []
+        if journal_batch:
+            self._journal.begin_batch(*journal_batch, [p["gmail_id"] for p in parsed], llm)
+        embeddings, built_metadatas = self._embed_parsed(parsed, label_map)
+        self._store.upsert_emails_batch(
+            [p["gmail_id"] for p in parsed],
+            [p["body_text"] or "" for p in parsed],
+            embeddings,
+            built_metadatas,
+        )
+        if journal_batch:
+            self._journal.mark(*journal_batch, "stored")
+        if llm:
+            self._llm_post_process(parsed, built_metadatas)
+            if journal_batch:
+                self._journal.mark(*journal_batch, "llm")
+        return built_metadatas
+
+    def _embed_parsed(self, parsed: list[dict], label_map: dict) -> tuple[list, list[dict]]:
+        """Embeddings and metadata for parsed messages, ready for upsert_emails_batch."""
         texts = [
-            EmbeddingModel.prepare_email_text(
-                m.get("subject", ""),
-                doc,
-                m.get("sender", ""),
-            )
-            for doc, m in zip(documents, metadatas)
+            EmbeddingModel.prepare_email_text(p["subject"], p["body_text"], p["sender"])
+            for p in parsed
         ]
+        embeddings = self._embedding.encode_batch(texts)
+        return embeddings, [self._build_metadata(p, label_map, self._account_id) for p in parsed]
+
+    def _label_map(self) -> dict:
+        return {l["gmail_id"]: l["name"] for l in self._store.get_labels(self._account_id)}
 
-        embeddings = self._embedding.encode_batch(texts, batch_size=batch_size)
-        self._store.upsert_emails_batch(ids, documents, embeddings, metadatas)
-        logger.info("[IngestionPipeline] reindexed %d emails", len(ids))
-        return len(ids)
+    def _account_where(self) -> dict | None:
+        # Single-account deployments scan the whole collection. With more accounts, get_store()
+        # has stamped emails stored before multi-account support with the default account
+        if len(settings.account_list()) <= 1:
+            return None
+        return {"account_id": self._account_id}
 
     @staticmethod
-    def _build_metadata(parsed: dict, label_map: dict) -> dict:
+    def _build_metadata(
+        parsed: dict, label_map: dict, account_id: str = DEFAULT_ACCOUNT
+    ) -> dict:
         label_names = [label_map.get(lid, lid) for lid in parsed.get("label_ids", [])]
         labels_str = "|" + "|".join(label_names) + "|" if label_names else ""
 
@@ -357,6 +582,7 @@ class IngestionPipeline:
         date = parsed.get("date")
 
         metadata = {
+            "account_id": account_id,
             "thread_id": parsed.get("thread_id", ""),
             "subject": parsed.get("subject", ""),
             "sender": parsed.get("sender", ""),
@@ -430,13 +656,21 @@ class IngestionPipeline:
             action_count,
         )
 
-    def _update_sync_state(self, count: int, history_id: str = ""):
-        state = self._store.get_sync_state()
+    def _update_sync_state(self, count: int, history_id: str | None = ""):
+        """Record a sync; `history_id=None` keeps the stored history id."""
+        state = self._store.get_sync_state(self._account_id)
         prev_count = state.get("total_emails_synced", 0) if state else 0
+        if history_id is None:
+            history_id = state.get("last_history_id", "") if state else ""
         self._store.update_sync_state(
             {
                 "last_history_id": history_id,
                 "last_full_sync": datetime.now(UTC).isoformat(),
                 "total_emails_synced": prev_count + count,
-            }
+            },
+            account_id=self._account_id,
         )
+
+
+def _history_id_newer(a: str, b: str) -> bool:
+    return a.isdigit() and b.isdigit() and int(a) > int(b)
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import UTC, datetime
+from pathlib import Path
+
+from gmail_parser.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sync threads for different accounts share one journal file
+_file_locks: dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+def _lock_for(path: Path) -> threading.Lock:
+    with _file_locks_guard:
+        return _file_locks.setdefault(str(path.resolve()), threading.Lock())
+
+
+class BatchJournal:
+    """Append-only write-ahead log of ingestion stages.
+
+    A sync run is recorded as:
+
+        run      account, history id the run will commit (None = keep stored id)
+        batch    ids about to be stored, and whether LLM extraction follows
+        stored   the batch's emails were upserted
+        llm      the batch's LLM fields were written
+        synced   every listed batch was processed
+        done     sync state was updated; the run's records can be dropped
+
+    Each record is fsynced before the step it guards runs. After a crash,
+    `pending()` returns the runs without `done`, and
+    `IngestionPipeline.recover()` finishes only their missing stages.
+    """
+
+    FILENAME = "ingest_journal.jsonl"
+
+    def __init__(self, path: str | Path | None = None):
+        self._path = Path(path) if path else Path(settings.chroma_persist_dir) / self.FILENAME
+        self._lock = _lock_for(self._path)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def begin_run(self, account_id: str, history_id: str | None) -> str:
+        run = uuid.uuid4().hex[:12]
+        self._append({"op": "run", "run": run, "account": account_id, "history_id": history_id})
+        return run
+
+    def begin_batch(self, run: str, batch: int, ids: list[str], llm: bool = True):
+        self._append({"op": "batch", "run": run, "batch": batch, "ids": ids, "llm": llm})
+
+    def mark(self, run: str, batch: int, stage: str):
+        self._append({"op": stage, "run": run, "batch": batch})
+
+    def mark_synced(self, run: str):
+        self._append({"op": "synced", "run": run})
+
+    def end_run(self, run: str):
+        self._append({"op": "done", "run": run})
+        self.compact()
+
+    def pending(self, account_id: str | None = None) -> list[dict]:
+        """Unfinished runs, oldest first.
+
+        Each run is {"run", "account", "history_id", "synced", "batches"}, with
+        batches as {"batch", "ids", "llm", "stages"}.
+        """
+        runs: dict[str, dict] = {}
+        for record in self._read():
+            run = record["run"]
+            op = record["op"]
+            if op == "run":
+                runs[run] = {
+                    "run": run,
+                    "account": record["account"],
+                    "history_id": record["history_id"],
+                    "synced": False,
+                    "batches": {},
+                }
+            elif run not in runs:
+                continue
+            elif op == "batch":
+                runs[run]["batches"][record["batch"]] = {
+                    "batch": record["batch"],
+                    "ids": record["ids"],
+                    "llm": record["llm"],
+                    "stages": set(),
+                }
+            elif op == "synced":
+                runs[run]["synced"] = True
+            elif op == "done":
+                del runs[run]
+            elif record.get("batch") in runs[run]["batches"]:
+                runs[run]["batches"][record["batch"]]["stages"].add(op)
+        result = []
+        for r in runs.values():
+            if account_id is None or r["account"] == account_id:
+                result.append({**r, "batches": list(r["batches"].values())})
+        return result
+
+    def compact(self):
+        """Rewrite the journal without the records of finished runs."""
+        with self._lock:
+            records = self._read_unlocked()
+            finished = {r["run"] for r in records if r["op"] == "done"}
+            if not finished:
+                return
+            keep = [r for r in records if r["run"] not in finished]
+            tmp = self._path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                f.writelines(json.dumps(r) + "\n" for r in keep)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._path)
+
+    def _append(self, record: dict):
+        record["ts"] = datetime.now(UTC).isoformat()
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _read(self) -> list[dict]:
+        with self._lock:
+            return self._read_unlocked()
+
+    def _read_unlocked(self) -> list[dict]:
+        if not self._path.exists():
+            return []
+        records = []
+        with open(self._path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; the step it guarded never ran
+                    logger.warning("[BatchJournal] skipping unreadable record in %s", self._path)
+        return records
@@ -0,0 +1,104 @@
+import pickle
+import sqlite3
+from pathlib import Path
+
+# Chroma's vector segments, one directory per segment beside chroma.sqlite3
+_HNSW_SEGMENT = "urn:chroma:segment/vector/hnsw-local-persisted"
+
+
+def file_bytes(path: Path) -> int:
+    """Size of a file, or of everything under a directory; 0 if it doesn't exist."""
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size if path.exists() else 0
+
+
+def sqlite_stats(path: Path) -> dict | None:
+    """Size of a SQLite database and its WAL, and the share of its pages that are free.
+
+    Free pages are left by deletes and only given back to the file system by
+    VACUUM. None if the database doesn't exist.
+    """
+    if not path.exists():
+        return None
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    try:
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "bytes": file_bytes(path),
+        "wal_bytes": file_bytes(path.with_name(path.name + "-wal")),
+        "pages": pages,
+        "free_pages": free,
+        "free_ratio": free / pages if pages else 0.0,
+    }
+
+
+def vacuum_sqlite(path: Path, statements: tuple[str, ...] = (), timeout: float = 30) -> int:
+    """Run `statements` (e.g. an FTS5 optimize), VACUUM and truncate the WAL; returns the bytes freed.
+
+    Uses its own connection, so other connections to the database may stay
+    open; it waits up to `timeout` seconds for their writes to finish.
+    """
+    if not path.exists():
+        return 0
+    before = file_bytes(path) + file_bytes(path.with_name(path.name + "-wal"))
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    try:
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return before - file_bytes(path) - file_bytes(path.with_name(path.name + "-wal"))
+
+
+def hnsw_segment_dirs(persist_dir: Path) -> dict[str, Path]:
+    """Chroma's HNSW segment directory of each collection, by collection id."""
+    path = persist_dir / "chroma.sqlite3"
+    if not path.exists():
+        return {}
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    try:
+        rows = conn.execute("SELECT id, collection FROM segments WHERE type = ?", (_HNSW_SEGMENT,)).fetchall()
+    finally:
+        conn.close()
+    return {collection: persist_dir / segment for segment, collection in rows}
+
+
+def hnsw_stats(segment_dir: Path, m: int, segment=None) -> dict:
+    """Health of a Chroma HNSW index.
+
+    hnswlib never reuses the slot of a deleted element: it stays in the graph
+    as a tombstone until the index is rebuilt. `tombstone_ratio` is the share
+    of elements ever added that are deleted; `fragmentation` is the share of
+    the allocated slots (tombstones and spare capacity) not holding a live
+    vector. Counts come from `segment`, Chroma's loaded segment, when this
+    process has one, else from the index's last save, which can trail
+    recent writes.
+    """
+    if segment is not None and segment._index is not None:
+        added, live = segment._total_elements_added, len(segment._id_to_label)
+        capacity = segment._index.get_max_elements()
+    elif (segment_dir / "index_metadata.pickle").exists():
+        with open(segment_dir / "index_metadata.pickle", "rb") as f:
+            meta = pickle.load(f)
+        added, live = meta.total_elements_added, len(meta.id_to_label)
+        # Level-0 record: 2*M neighbour ids and a count, the float32 vector, and a 64-bit label
+        record = (2 * m) * 4 + 4 + (meta.dimensionality or 0) * 4 + 8
+        capacity = file_bytes(segment_dir / "data_level0.bin") // record if meta.dimensionality else 0
+    else:
+        # Nothing written yet
+        added = live = capacity = 0
+    return {
+        "bytes": file_bytes(segment_dir),
+        "elements_added": added,
+        "live": live,
+        "capacity": capacity,
+        "tombstones": added - live,
+        "tombstone_ratio": (added - live) / added if added else 0.0,
+        "fragmentation": 1 - live / capacity if capacity else 0.0,
+    }
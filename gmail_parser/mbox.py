@@ -0,0 +1,181 @@
+import csv
+import email
+import email.policy
+import logging
+import re
+from datetime import datetime
+from email.message import EmailMessage
+from email.utils import parsedate_to_datetime
+from typing import Iterator
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Takeout writes Gmail's system labels by display name
+SYSTEM_LABELS = {
+    "inbox": "INBOX",
+    "sent": "SENT",
+    "important": "IMPORTANT",
+    "starred": "STARRED",
+    "unread": "UNREAD",
+    "draft": "DRAFT",
+    "drafts": "DRAFT",
+    "spam": "SPAM",
+    "trash": "TRASH",
+    "chat": "CHAT",
+    "category personal": "CATEGORY_PERSONAL",
+    "category social": "CATEGORY_SOCIAL",
+    "category promotions": "CATEGORY_PROMOTIONS",
+    "category updates": "CATEGORY_UPDATES",
+    "category forums": "CATEGORY_FORUMS",
+}
+# Takeout-only markers with no Gmail label equivalent ("Opened" just means read)
+_IGNORED_LABELS = {"opened", "archived"}
+# Mirrors full_sync's "-in:trash -in:spam"; chats aren't email
+SKIPPED_LABELS = {"SPAM", "TRASH", "CHAT"}
+
+_FROM_LINE_ID_RE = re.compile(rb"^From (\d+)@")
+_SNIPPET_CHARS = 200
+
+
+def iter_mbox(path: str) -> Iterator[tuple[bytes, bytes]]:
+    """Stream (from_line, raw_message) pairs from an mbox file without loading it into memory."""
+    from_line = b""
+    lines: list[bytes] = []
+    prev_blank = True
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b"From ") and prev_blank:
+                if from_line:
+                    yield from_line, b"".join(lines)
+                from_line, lines = line, []
+            elif from_line:
+                # mboxrd quoting: ">From " in a body is stored as ">>From "
+                if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+                    line = line[1:]
+                lines.append(line)
+            prev_blank = line in (b"\n", b"\r\n")
+    if from_line:
+        yield from_line, b"".join(lines)
+
+
+def _hex_id(value: str | bytes | None) -> str | None:
+    """Takeout stores Gmail's 64-bit ids in decimal; the API uses lowercase hex."""
+    if not value:
+        return None
+    try:
+        return format(int(value), "x")
+    except ValueError:
+        return None
+
+
+def parse_label_header(value: str, name_to_id: dict[str, str]) -> list[str]:
+    label_ids = []
+    for name in next(csv.reader([value], skipinitialspace=True), []):
+        name = name.strip()
+        key = name.lower()
+        if not name or key in _IGNORED_LABELS:
+            continue
+        label_ids.append(SYSTEM_LABELS.get(key) or name_to_id.get(name, name))
+    return label_ids
+
+
+def _part_text(part) -> str:
+    try:
+        return part.get_content()
+    except (LookupError, UnicodeDecodeError):
+        payload = part.get_payload(decode=True) or b""
+        return payload.decode("utf-8", errors="replace")
+
+
+def _extract(msg: EmailMessage) -> tuple[str, str, list[dict]]:
+    text_body = html_body = ""
+    attachments = []
+    for part in msg.walk():
+        if part.is_multipart():
+            continue
+        filename = part.get_filename()
+        if filename:
+            payload = part.get_payload(decode=True) or b""
+            attachments.append({
+                "gmail_attachment_id": None,
+                "filename": filename,
+                "mime_type": part.get_content_type(),
+                "size": len(payload),
+            })
+            continue
+        mime = part.get_content_type()
+        if mime == "text/plain" and not text_body:
+            text_body = _part_text(part)
+        elif mime == "text/html" and not html_body:
+            html_body = _part_text(part)
+    if not text_body and html_body:
+        text_body = BeautifulSoup(html_body, "html.parser").get_text(separator="\n").strip()
+    return text_body, html_body, attachments
+
+
+def parse_mbox_message(from_line: bytes, raw: bytes, name_to_id: dict[str, str]) -> dict | None:
+    """Parse one Takeout message into the GmailClient.parse_message shape.
+
+    Returns None for messages without a resolvable Gmail id and for spam, trash and chats.
+    """
+    msg = email.message_from_bytes(raw, policy=email.policy.default)
+    id_match = _FROM_LINE_ID_RE.match(from_line)
+    gmail_id = _hex_id(msg.get("X-GM-MSGID")) or _hex_id(id_match.group(1) if id_match else None)
+    if not gmail_id:
+        return None
+
+    label_ids = parse_label_header(str(msg.get("X-Gmail-Labels", "")), name_to_id)
+    if SKIPPED_LABELS.intersection(label_ids):
+        return None
+
+    headers = {k: str(v) for k, v in msg.items()}
+    date = None
+    if date_str := headers.get("Date"):
+        try:
+            date = parsedate_to_datetime(date_str)
+        except Exception:
+            pass
+
+    body_text, body_html, attachments = _extract(msg)
+    thread_id = _hex_id(msg.get("X-GM-THRID")) or gmail_id
+    return {
+        "gmail_id": gmail_id,
+        "thread_id": thread_id,
+        "subject": headers.get("Subject", ""),
+        "sender": headers.get("From", ""),
+        "recipients": {
+            "to": headers.get("To", ""),
+            "cc": headers.get("Cc", ""),
+            "bcc": headers.get("Bcc", ""),
+        },
+        "date": date,
+        "internal_date": str(int(date.timestamp() * 1000)) if isinstance(date, datetime) else None,
+        "snippet": re.sub(r"\s+", " ", body_text).strip()[:_SNIPPET_CHARS],
+        "body_text": body_text,
+        "body_html": body_html,
+        "raw_headers": headers,
+        "size_estimate": len(raw),
+        "is_read": "UNREAD" not in label_ids,
+        "is_starred": "STARRED" in label_ids,
+        "is_draft": "DRAFT" in label_ids,
+        "has_attachments": len(attachments) > 0,
+        "history_id": "",
+        "label_ids": label_ids,
+        "attachments": attachments,
+    }
+
+
+def parse_mbox_batch(items: list[tuple[bytes, bytes]], name_to_id: dict[str, str]) -> list[dict]:
+    """Process-pool entry point: parse a batch, dropping unparseable or skipped messages."""
+    parsed = []
+    for from_line, raw in items:
+        try:
+            p = parse_mbox_message(from_line, raw, name_to_id)
+        except Exception as e:
+            logger.warning("[mbox] failed to parse message %r: %s", from_line[:60], e)
+            continue
+        if p:
+            parsed.append(p)
+    return parsed
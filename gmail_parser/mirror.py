@@ -0,0 +1,133 @@
+from collections.abc import Callable, Iterator, Mapping
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from gmail_parser.sidecar import VersionedSidecar, save_npz
+from gmail_parser.snapshot import decode_metadatas, encode_metadatas
+
+
+class MirrorView(Mapping):
+    """Every email's metadata, by gmail_id, as of one moment.
+
+    Views never change: writes publish a new mapping instead of modifying
+    the one a view holds, so a scan sees one consistent state however long
+    it runs. The metadata dicts are shared with the mirror; treat them as
+    read-only. Iteration is in insertion order, like Chroma's.
+    """
+
+    def __init__(self, rows: dict[str, dict], version: int):
+        self._rows = rows
+        self.version = version
+
+    def __getitem__(self, gmail_id: str) -> dict:
+        return self._rows[gmail_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def select(
+        self, predicate: Callable[[dict], bool] | None = None, account_id: str | None = None
+    ) -> Iterator[tuple[str, dict]]:
+        """(gmail_id, metadata) pairs of one account (default: all) that satisfy `predicate`."""
+        for gid, meta in self._rows.items():
+            if account_id and meta.get("account_id") != account_id:
+                continue
+            if predicate is None or predicate(meta):
+                yield gid, meta
+
+
+class MetadataMirror(VersionedSidecar):
+    """In-memory copy of all email metadata, for read paths that must not touch Chroma.
+
+    Kept in step like the other sidecars (see VersionedSidecar). Each write
+    batch copies the id map and swaps it in, so `view()` is O(1) and readers
+    never block writers or see half a batch. Saved as .npz in the snapshot
+    metadata encoding.
+    """
+
+    FILENAME = "metadata_mirror.npz"
+
+    def __init__(self, persist_dir: str | Path):
+        super().__init__(Path(persist_dir) / self.FILENAME)
+        self._rows: dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # --- Mutations ---
+
+    def upsert(self, ids: list[str], metadatas: list[dict]):
+        """Add emails; like Chroma's upsert, metadata is merged into an existing row's."""
+        with self._lock:
+            rows = dict(self._rows)
+            for gid, meta in zip(ids, metadatas):
+                rows[gid] = {**rows.get(gid, {}), **(meta or {})}
+            self._publish(rows)
+
+    def replace(self, ids: list[str], metadatas: list[dict]):
+        """Set rows to whole metadata records read back from Chroma, dropping keys they lack."""
+        with self._lock:
+            rows = dict(self._rows)
+            rows.update(zip(ids, (dict(m or {}) for m in metadatas)))
+            self._publish(rows)
+
+    def update(self, ids: list[str], metadatas: list[dict]):
+        """Apply partial metadata updates (only the keys present change)."""
+        with self._lock:
+            rows = dict(self._rows)
+            for gid, meta in zip(ids, metadatas):
+                if gid in rows:
+                    rows[gid] = {**rows[gid], **meta}
+            self._publish(rows)
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            if not any(gid in self._rows for gid in ids):
+                return
+            rows = dict(self._rows)
+            for gid in ids:
+                rows.pop(gid, None)
+            self._publish(rows)
+
+    # --- Reading ---
+
+    def view(self) -> MirrorView:
+        with self._lock:
+            return MirrorView(self._rows, self.version)
+
+    # --- Persistence ---
+
+    def _read(self):
+        with np.load(self._path) as data:
+            ids = data["ids"].tolist()
+            self._rows = dict(zip(ids, decode_metadatas(data, len(ids))))
+            self.version = int(data["version"])
+
+    def _reset(self):
+        self._rows = {}
+
+    def _save(self) -> Callable[[], None]:
+        rows, version = self._rows, self.version
+        # `rows` is never modified once published, so it can be encoded without the lock
+        return lambda: save_npz(
+            self._path,
+            ids=np.array(list(rows), dtype=str),
+            version=np.int64(version),
+            **encode_metadatas(list(rows.values())),
+        )
+
+    def _fill(self, pages: Iterable[tuple[list[str], list[dict]]]):
+        # One map for the whole rebuild rather than a copy per page
+        rows: dict[str, dict] = {}
+        for ids, metadatas in pages:
+            rows.update(zip(ids, (dict(m or {}) for m in metadatas)))
+        self._rows = rows
+
+    def _publish(self, rows: dict[str, dict]):
+        self._rows = rows
+        self._mark_dirty()
@@ -0,0 +1,218 @@
+import logging
+import sqlite3
+import threading
+from email.utils import parseaddr
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+LABEL = "label"
+SENDER = "sender"
+DOMAIN = "domain"
+NAME = "name"  # the whole From value, lowercased, for substring filters on display names
+
+
+def normalize_address(sender: str) -> str:
+    """Lowercased address from a From value such as `"Name" <a@b.com>`."""
+    address = parseaddr(sender or "")[1] or (sender or "").strip()
+    local, _, host = address.rpartition("@")
+    return address.lower() if local and host else ""
+
+
+def domain_keys(address: str) -> list[str]:
+    """The address's host and its parent domains, e.g. mail.shop.com -> [mail.shop.com, shop.com]."""
+    host = address.rpartition("@")[2]
+    parts = host.split(".")
+    return [".".join(parts[i:]) for i in range(max(len(parts) - 1, 1))] if host else []
+
+
+def posting_keys(metadata: dict) -> dict[str, list[str]]:
+    """Posting keys by kind for the label/sender fields present in `metadata`."""
+    keys: dict[str, list[str]] = {}
+    if "labels" in metadata:
+        keys[LABEL] = [name for name in (metadata["labels"] or "").strip("|").split("|") if name]
+    if "sender" in metadata:
+        address = normalize_address(metadata["sender"])
+        keys[SENDER] = [address] if address else []
+        keys[DOMAIN] = domain_keys(address)
+        name = (metadata["sender"] or "").strip().lower()
+        keys[NAME] = [name] if name else []
+    return keys
+
+
+def parse_sender_filter(query: str) -> tuple[str, str]:
+    """Classify a sender filter as (SENDER, address), (DOMAIN, domain) or ("", substring).
+
+    An address matches exactly, a domain (`shop.com` or `@shop.com`) matches
+    that domain and its subdomains, and anything else is a case-insensitive
+    substring of the whole From value, display name included.
+    """
+    query = query.strip().lower()
+    address = normalize_address(query)
+    if address and not query.startswith("@"):
+        return SENDER, address
+    domain = query.lstrip("@")
+    if "." in domain and " " not in domain:
+        return DOMAIN, domain
+    return "", query
+
+
+def sender_matches(query: str, sender: str) -> bool:
+    """Whether a sender filter matches a From value such as `"Name" <a@b.com>`."""
+    kind, value = parse_sender_filter(query)
+    if kind == SENDER:
+        return normalize_address(sender) == value
+    if kind == DOMAIN:
+        return value in domain_keys(normalize_address(sender))
+    return bool(value) and value in (sender or "").lower()
+
+
+class PostingIndex:
+    """Label, sender-address, sender-domain and From-value posting lists, stored beside Chroma.
+
+    Each posting carries the email's date_timestamp so a list can be read
+    newest first straight off the index. EmailStore applies upserts, metadata
+    updates and deletes here; `reconcile()` repairs the index from Chroma the
+    same way FullTextIndex does.
+    """
+
+    FILENAME = "postings.sqlite3"
+    # Bumped when the posting kinds change; an older index is emptied and rebuilt from Chroma
+    SCHEMA_VERSION = 2
+
+    def __init__(self, persist_dir: str | Path):
+        self._path = Path(persist_dir) / self.FILENAME
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (gmail_id TEXT PRIMARY KEY, ts INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS postings (
+                kind TEXT NOT NULL, key TEXT NOT NULL, ts INTEGER NOT NULL, gmail_id TEXT NOT NULL,
+                PRIMARY KEY (kind, key, gmail_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_by_date ON postings (kind, key, ts DESC, gmail_id DESC);
+            CREATE INDEX IF NOT EXISTS postings_by_id ON postings (gmail_id);
+            """
+        )
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < self.SCHEMA_VERSION:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._conn.commit()
+
+    # --- Mutations ---
+
+    def upsert(self, ids: list[str], metadatas: list[dict]):
+        """Add emails; like Chroma's upsert, an indexed email only changes for the fields given."""
+        with self._lock, self._conn:
+            for gid, meta in zip(ids, metadatas):
+                if self._update(gid, meta):
+                    continue
+                ts = int(meta.get("date_timestamp") or 0)
+                self._conn.execute("INSERT INTO docs VALUES (?, ?)", (gid, ts))
+                self._insert(gid, ts, posting_keys({"labels": "", "sender": "", **meta}))
+
+    def update(self, ids: list[str], metadatas: list[dict]):
+        """Apply partial metadata updates; only kinds whose source field is present change."""
+        with self._lock, self._conn:
+            for gid, meta in zip(ids, metadatas):
+                self._update(gid, meta)
+
+    def _update(self, gid: str, meta: dict) -> bool:
+        row = self._conn.execute("SELECT ts FROM docs WHERE gmail_id = ?", (gid,)).fetchone()
+        if row is None:
+            return False
+        ts = row[0]
+        if "date_timestamp" in meta:
+            ts = int(meta["date_timestamp"] or 0)
+            self._conn.execute("UPDATE docs SET ts = ? WHERE gmail_id = ?", (ts, gid))
+            self._conn.execute("UPDATE postings SET ts = ? WHERE gmail_id = ?", (ts, gid))
+        keys = posting_keys(meta)
+        for kind in keys:
+            self._conn.execute("DELETE FROM postings WHERE gmail_id = ? AND kind = ?", (gid, kind))
+        self._insert(gid, ts, keys)
+        return True
+
+    def delete(self, ids: list[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM postings WHERE gmail_id = ?", ((gid,) for gid in ids))
+            self._conn.executemany("DELETE FROM docs WHERE gmail_id = ?", ((gid,) for gid in ids))
+
+    def _insert(self, gid: str, ts: int, keys: dict[str, list[str]]):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO postings VALUES (?, ?, ?, ?)",
+            ((kind, key, ts, gid) for kind, values in keys.items() for key in values),
+        )
+
+    # --- Queries ---
+
+    def keys(self, kind: str) -> list[str]:
+        with self._lock:
+            return [k for (k,) in self._conn.execute("SELECT DISTINCT key FROM postings WHERE kind = ?", (kind,))]
+
+    def lookup(
+        self, label: str | None = None, sender: str | None = None, limit: int | None = None
+    ) -> list[str]:
+        """Ids carrying `label` and sent by a `sender` match, newest first.
+
+        The conditions given are intersected; with neither, every id is returned.
+        """
+        selects, params = [], []
+        if label is not None:
+            selects.append("SELECT gmail_id, ts FROM postings WHERE kind = ? AND key = ?")
+            params += [LABEL, label]
+        if sender is not None:
+            kind, value = parse_sender_filter(sender)
+            if kind:
+                keys = [value]
+            else:
+                kind, keys = NAME, [name for name in self.keys(NAME) if value and value in name]
+            if not keys:
+                return []
+            selects.append(
+                f"SELECT gmail_id, ts FROM postings WHERE kind = ? AND key IN ({','.join('?' * len(keys))})"
+            )
+            params += [kind, *keys]
+        if not selects:
+            selects.append("SELECT gmail_id, ts FROM docs")
+        sql = " INTERSECT ".join(selects) + " ORDER BY ts DESC, gmail_id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [gid for gid, _ in self._conn.execute(sql, params)]
+
+    # --- Maintenance ---
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM docs").fetchone()[0]
+
+    def ids(self) -> set[str]:
+        with self._lock:
+            return {gid for (gid,) in self._conn.execute("SELECT gmail_id FROM docs")}
+
+    def reconcile(self, pages):
+        """Bring the index in line with Chroma, given its (ids, metadatas) pages."""
+        indexed = self.ids()
+        seen: set[str] = set()
+        added = 0
+        for ids, metadatas in pages:
+            seen.update(ids)
+            missing = [(gid, meta) for gid, meta in zip(ids, metadatas) if gid not in indexed]
+            if missing:
+                self.upsert([gid for gid, _ in missing], [meta for _, meta in missing])
+                added += len(missing)
+        stale = list(indexed - seen)
+        if stale:
+            self.delete(stale)
+        if added or stale:
+            logger.info("[PostingIndex] indexed %d emails, dropped %d", added, len(stale))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
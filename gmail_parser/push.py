@@ -0,0 +1,85 @@
+import base64
+import binascii
+import json
+import logging
+import threading
+import time
+from typing import Callable
+
+from gmail_parser.exceptions import SyncError
+
+logger = logging.getLogger(__name__)
+
+
+def parse_push_notification(envelope: dict) -> dict:
+    """Decode a Pub/Sub push envelope carrying a Gmail watch notification.
+
+    Gmail publishes {"emailAddress": ..., "historyId": ...} as the base64 `data`
+    of the Pub/Sub message. Returns {"email_address", "history_id", "message_id"}.
+    """
+    message = envelope.get("message") or {}
+    data = message.get("data")
+    if not data:
+        raise SyncError("Push notification has no message data")
+    try:
+        payload = json.loads(base64.b64decode(data + "=" * (-len(data) % 4)))
+    except (binascii.Error, ValueError) as e:
+        raise SyncError(f"Malformed push notification data: {e}") from e
+    if not payload.get("emailAddress") or not payload.get("historyId"):
+        raise SyncError("Push notification is missing emailAddress or historyId")
+    return {
+        "email_address": payload["emailAddress"].lower(),
+        "history_id": str(payload["historyId"]),
+        "message_id": message.get("messageId") or message.get("message_id", ""),
+    }
+
+
+class Debouncer:
+    """Coalesces bursts of triggers per key into a single callback.
+
+    Each trigger pushes the callback back by `delay` seconds, but never past
+    `max_delay` seconds after the first trigger of the burst, so a steady
+    stream of notifications still syncs periodically.
+    """
+
+    def __init__(self, callback: Callable[[str], None], delay: float = 5.0, max_delay: float = 30.0):
+        self._callback = callback
+        self._delay = delay
+        self._max_delay = max_delay
+        self._lock = threading.Lock()
+        self._timers: dict[str, threading.Timer] = {}
+        self._first_seen: dict[str, float] = {}
+
+    def trigger(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            first = self._first_seen.setdefault(key, now)
+            if timer := self._timers.get(key):
+                timer.cancel()
+            wait = max(0.0, min(self._delay, first + self._max_delay - now))
+            timer = threading.Timer(wait, self._fire, args=(key,))
+            timer.daemon = True
+            self._timers[key] = timer
+            timer.start()
+
+    def _fire(self, key: str):
+        with self._lock:
+            if self._timers.get(key) is not threading.current_thread():
+                return  # superseded by a later trigger
+            self._timers.pop(key, None)
+            self._first_seen.pop(key, None)
+        try:
+            self._callback(key)
+        except Exception as e:
+            logger.warning("[Debouncer] callback for %s failed: %s", key, e)
+
+    def pending(self) -> list[str]:
+        with self._lock:
+            return list(self._timers)
+
+    def cancel_all(self):
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            self._first_seen.clear()
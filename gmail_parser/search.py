@@ -4,20 +4,64 @@ import re
 from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 
+import numpy as np
+
 _SUBSCRIPTION_RE = re.compile(
     r"noreply|no-reply|newsletter|notifications?|updates?|donotreply|marketing|digest|news@",
     re.IGNORECASE,
 )
 _SUBSCRIPTION_LABELS = frozenset({"CATEGORY_PROMOTIONS", "CATEGORY_SOCIAL", "CATEGORY_UPDATES"})
 
+from gmail_parser.columns import (
+    FLAG_ATTACHMENTS,
+    FLAG_HAS_DATE,
+    FLAG_READ,
+    FLAG_STARRED,
+    FLAG_UNSUBSCRIBE,
+    ColumnView,
+)
 from gmail_parser.embeddings import EmbeddingModel
-from gmail_parser.store import EmailStore
+from gmail_parser.exceptions import SearchError
+from gmail_parser.postings import sender_matches
+from gmail_parser.store import EmailStore, get_store
 
 logger = logging.getLogger(__name__)
 
 
+def sender_summary(view: ColumnView) -> dict[str, np.ndarray]:
+    """Per-sender aggregates over a column view, indexed by sender code.
+
+    Returns arrays `count`, `unread`, `last_row` (row of the newest email, -1
+    if none), `has_unsubscribe` and `is_subscription`. The empty sender has count 0.
+    """
+    n = len(view.senders)
+    count = np.bincount(view.sender, minlength=n)
+    unread = np.bincount(view.sender, weights=~view.has(FLAG_READ), minlength=n).astype(np.int64)
+    has_unsubscribe = np.bincount(view.sender, weights=view.has(FLAG_UNSUBSCRIBE), minlength=n) > 0
+    has_sub_label = np.bincount(view.sender, weights=view.label_mask(_SUBSCRIPTION_LABELS), minlength=n) > 0
+    name_matches = np.fromiter((bool(_SUBSCRIPTION_RE.search(s)) for s in view.senders), dtype=bool, count=n)
+
+    # Sort by (sender, ts); the last row of each sender group is its newest email
+    order = np.lexsort((view.ts, view.sender))
+    grouped = view.sender[order]
+    ends = np.flatnonzero(np.r_[grouped[1:] != grouped[:-1], True]) if len(order) else order
+    last_row = np.full(n, -1, dtype=np.int64)
+    last_row[grouped[ends]] = order[ends]
+
+    if "" in view.senders:
+        count[view.senders.index("")] = 0
+    return {
+        "count": count,
+        "unread": unread,
+        "last_row": last_row,
+        "has_unsubscribe": has_unsubscribe,
+        "is_subscription": (count > 0) & (has_unsubscribe | name_matches | has_sub_label | (count >= 5)),
+    }
+
+
 @dataclass
 class SearchFilters:
     sender: str | None = None
@@ -30,11 +74,84 @@ class SearchFilters:
     is_read: bool | None = None
     is_starred: bool | None = None
     subject_contains: str | None = None
+    account_id: str | None = None
+
+
+def make_cursor(email: dict) -> str:
+    """Keyset cursor for the page after `email` in `filter_emails` order."""
+    return f"{int(email['metadata'].get('date_timestamp') or 0)}:{email['id']}"
+
+
+def parse_cursor(cursor: str) -> tuple[int, str]:
+    ts, sep, gmail_id = cursor.partition(":")
+    try:
+        if not sep or not gmail_id:
+            raise ValueError
+        return int(ts), gmail_id
+    except ValueError:
+        raise SearchError(f"Invalid cursor: {cursor!r}") from None
+
+
+def _before_cursor(view: ColumnView, ts: int, gmail_id: str) -> np.ndarray:
+    """Rows strictly after (ts, gmail_id) in newest-first order."""
+    mask = view.ts < ts
+    for row in np.flatnonzero(view.ts == ts):
+        mask[row] = view.ids[row] < gmail_id
+    return mask
+
+
+def _top_rows(view: ColumnView, mask: np.ndarray, k: int) -> list[int]:
+    """The first `k` masked rows by (ts, id) descending, without sorting every row."""
+    rows = np.flatnonzero(mask)
+    if len(rows) > k:
+        ts = view.ts[rows]
+        kth = np.partition(ts, len(ts) - k)[len(ts) - k]
+        rows = rows[ts >= kth]
+    return sorted(rows.tolist(), key=lambda r: (view.ts[r], view.ids[r]), reverse=True)[:k]
+
+
+def _filter_mask(view: ColumnView, filters: SearchFilters) -> np.ndarray:
+    """Rows matching the column-backed SearchFilters fields."""
+    mask = np.ones(len(view), dtype=bool)
+    if filters.sender:
+        codes = [i for i, s in enumerate(view.senders) if sender_matches(filters.sender, s)]
+        mask &= np.isin(view.sender, codes)
+    if filters.label:
+        mask &= view.label_mask([filters.label])
+    if filters.category:
+        mask &= view.category == view.category_code(filters.category)
+    if filters.date_from:
+        mask &= view.has(FLAG_HAS_DATE) & (view.ts >= int(filters.date_from.timestamp()))
+    if filters.date_to:
+        mask &= view.has(FLAG_HAS_DATE) & (view.ts <= int(filters.date_to.timestamp()))
+    for value, flag in (
+        (filters.is_read, FLAG_READ),
+        (filters.is_starred, FLAG_STARRED),
+        (filters.has_attachments, FLAG_ATTACHMENTS),
+    ):
+        if value is not None:
+            mask &= view.has(flag) == value
+    return mask
+
+
+def _metadata_check(filters: SearchFilters):
+    """Predicate for the SearchFilters fields the column sidecar doesn't hold, or None."""
+    if not (filters.subject_contains or filters.recipients):
+        return None
+
+    def check(meta: dict) -> bool:
+        if filters.subject_contains and filters.subject_contains not in meta.get("subject", ""):
+            return False
+        if filters.recipients and filters.recipients not in meta.get("recipients_to", ""):
+            return False
+        return True
+
+    return check
 
 
 class EmailSearch:
     def __init__(self, store: EmailStore | None = None, embedding_model: EmbeddingModel | None = None):
-        self._store = store or EmailStore()
+        self._store = store or get_store()
         self._embedding = embedding_model or EmbeddingModel()
 
     # --- Core search methods ---
@@ -44,25 +161,22 @@ class EmailSearch:
         result = self._store.query(query_embedding, n_results=limit)
 
         results = []
-        for id_, doc, meta, dist in zip(result["ids"][0], result["documents"][0], result["metadatas"][0], result["distances"][0]):
+        for id_, meta, dist in zip(result["ids"][0], result["metadatas"][0], result["distances"][0]):
             score = 1 - dist  # cosine distance -> similarity
             if threshold is not None and score < threshold:
                 continue
-            results.append({"id": id_, "document": doc, "metadata": meta, "score": score})
+            results.append({"id": id_, "metadata": meta, "score": score})
         results.sort(key=lambda x: x["metadata"].get("date_timestamp", 0), reverse=True)
         return results
 
     def fulltext_search(self, query: str, limit: int = 20) -> list[dict]:
-        result = self._store.get_emails()  # fetch all — must scan full corpus
-        query_lower = query.lower()
+        """Keyword search over subject and body, best BM25 match first.
 
-        matches = []
-        for id_, doc, meta in zip(result["ids"], result["documents"], result["metadatas"]):
-            text = f"{meta.get('subject', '')} {doc}".lower()
-            if query_lower in text:
-                matches.append({"id": id_, "document": doc, "metadata": meta, "score": 1.0})
-        matches.sort(key=lambda x: x["metadata"].get("date_timestamp", 0), reverse=True)
-        return matches[:limit]
+        Supports `"exact phrases"` and `prefix*` terms; all terms must match.
+        """
+        hits = self._store.search_text(query, limit=limit)
+        scores = dict(hits)
+        return [{**email, "score": scores[email["id"]]} for email in self._get_in_order([gid for gid, _ in hits])]
 
     def hybrid_search(
         self,
@@ -108,21 +222,45 @@ class EmailSearch:
 
     # --- Filtered queries ---
 
-    def filter_emails(self, filters: SearchFilters, limit: int = 50, offset: int = 0) -> list[dict]:
-        where = self._build_where(filters)
-        # Fetch all matching so we can sort globally by date before paginating.
-        # ChromaDB's .get() has no ORDER BY support and applies a default page limit,
-        # so we must pass the full count to get all results then sort ourselves.
-        result = self._store.get_emails(where=where or None, limit=self._store.count())
-        combined = sorted(
-            zip(result["ids"], result["documents"], result["metadatas"]),
-            key=lambda x: x[2].get("date_timestamp", 0),
-            reverse=True,
-        )
-        return [
-            {"id": id_, "document": doc, "metadata": meta}
-            for id_, doc, meta in combined[offset : offset + limit]
-        ]
+    def filter_emails(
+        self,
+        filters: SearchFilters,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: str | None = None,
+    ) -> list[dict]:
+        """Matching emails, newest first.
+
+        Pass `make_cursor(results[-1])` as `cursor` to get the next page. Rows are
+        picked from the column sidecar ordered by (date_timestamp, id), and their
+        metadata comes from the metadata mirror, so nothing is read from Chroma.
+        """
+        view = self._store.metadata_columns(filters.account_id)
+        mask = _filter_mask(view, filters)
+        if cursor:
+            mask &= _before_cursor(view, *parse_cursor(cursor))
+
+        # subject/recipient substrings aren't columns: test them on batches of metadata, doubling
+        # the batch each round so a rare match costs a few scans of the mask rather than n / 200
+        check = _metadata_check(filters)
+        wanted = offset + limit
+        rows: list[int] = []
+        batch_size = max(wanted, 200)
+        while len(rows) < wanted:
+            batch = _top_rows(view, mask, wanted - len(rows) if check is None else batch_size)
+            if not batch:
+                break
+            if check is None:
+                rows.extend(batch)
+                break
+            ids = [view.ids[r] for r in batch]
+            metadatas = self._metadatas(ids)
+            # Rows deleted since the column view was taken have no metadata left: skip them
+            rows.extend(r for r, gid in zip(batch, ids) if gid in metadatas and check(metadatas[gid]))
+            mask &= _before_cursor(view, int(view.ts[batch[-1]]), ids[-1])
+            batch_size *= 2
+
+        return self._get_in_order([view.ids[r] for r in rows[offset:wanted]])
 
     # --- Convenience queries ---
 
@@ -130,58 +268,41 @@ class EmailSearch:
         return self._store.get_email(gmail_id)
 
     def get_thread_emails(self, thread_id: str) -> list[dict]:
-        result = self._store.get_emails(where={"thread_id": thread_id})
+        """Every email in a thread, with its body."""
+        result = self._store.get_emails(where={"thread_id": thread_id}, include=["documents", "metadatas"])
         return [
             {"id": id_, "document": doc, "metadata": meta}
             for id_, doc, meta in zip(result["ids"], result["documents"], result["metadatas"])
         ]
 
     def get_emails_by_sender(self, sender: str, limit: int = 50) -> list[dict]:
-        result = self._store.get_emails(where={"sender": {"$contains": sender}}, limit=limit)
-        return [
-            {"id": id_, "document": doc, "metadata": meta}
-            for id_, doc, meta in zip(result["ids"], result["documents"], result["metadatas"])
-        ]
+        """Newest emails from an address, a domain (and its subdomains), or senders whose From value contains `sender`."""
+        return self._get_in_order(self._store.lookup_ids(sender=sender, limit=limit))
 
     def get_emails_by_label(self, label_name: str, limit: int = 50) -> list[dict]:
-        result = self._store.get_emails(where={"labels": {"$contains": f"|{label_name}|"}}, limit=limit)
-        return [
-            {"id": id_, "document": doc, "metadata": meta}
-            for id_, doc, meta in zip(result["ids"], result["documents"], result["metadatas"])
-        ]
+        return self._get_in_order(self._store.lookup_ids(label=label_name, limit=limit))
 
     def get_emails_by_date_range(self, date_from: datetime, date_to: datetime, limit: int = 50) -> list[dict]:
-        where = {"$and": [
-            {"date_timestamp": {"$gte": int(date_from.timestamp())}},
-            {"date_timestamp": {"$lte": int(date_to.timestamp())}},
-        ]}
-        result = self._store.get_emails(where=where, limit=limit)
-        return [
-            {"id": id_, "document": doc, "metadata": meta}
-            for id_, doc, meta in zip(result["ids"], result["documents"], result["metadatas"])
-        ]
+        start, end = int(date_from.timestamp()), int(date_to.timestamp())
+        matches = self._store.metadata_mirror().select(lambda m: start <= m.get("date_timestamp", 0) <= end)
+        return [{"id": id_, "metadata": dict(meta)} for id_, meta in islice(matches, limit)]
 
     # --- Analytics ---
 
-    def count_by_sender(self, limit: int = 20) -> list[dict]:
-        all_emails = self._store.get_all_emails(include=["metadatas"])
-        counter = Counter(m.get("sender", "") for m in all_emails["metadatas"])
-        return [{"sender": sender, "count": count} for sender, count in counter.most_common(limit)]
+    def count_by_sender(self, limit: int = 20, account_id: str | None = None) -> list[dict]:
+        view = self._store.metadata_columns(account_id)
+        counts = np.bincount(view.sender, minlength=len(view.senders))
+        top = np.argsort(-counts, kind="stable")[:limit]
+        return [{"sender": view.senders[c], "count": int(counts[c])} for c in top if counts[c]]
 
-    def count_by_label(self) -> list[dict]:
-        all_emails = self._store.get_all_emails(include=["metadatas"])
-        counter: Counter = Counter()
-        for m in all_emails["metadatas"]:
-            labels_str = m.get("labels", "")
-            for label in labels_str.strip("|").split("|"):
-                if label:
-                    counter[label] += 1
-        return [{"label": label, "count": count} for label, count in counter.most_common()]
-
-    def count_by_date(self, granularity: str = "day") -> list[dict]:
-        all_emails = self._store.get_all_emails(include=["metadatas"])
+    def count_by_label(self, account_id: str | None = None) -> list[dict]:
+        view = self._store.metadata_columns(account_id)
+        counts = Counter({name: int(view.label_mask([name]).sum()) for name in view.label_names})
+        return [{"label": label, "count": count} for label, count in counts.most_common() if count]
+
+    def count_by_date(self, granularity: str = "day", account_id: str | None = None) -> list[dict]:
         counter: Counter = Counter()
-        for m in all_emails["metadatas"]:
+        for _, m in self._store.metadata_mirror().select(account_id=account_id):
             date_iso = m.get("date_iso", "")
             if not date_iso:
                 continue
@@ -200,53 +321,34 @@ class EmailSearch:
             counter[key] += 1
         return [{"period": period, "count": count} for period, count in sorted(counter.items())]
 
-    def email_count(self) -> int:
-        return self._store.count()
-
-    def get_sender_analytics(self, limit: int = 200) -> list[dict]:
-        all_emails = self._store.get_all_emails(include=["metadatas"])
-        senders: dict[str, dict] = {}
-
-        for meta in all_emails["metadatas"]:
-            sender = meta.get("sender", "")
-            if not sender:
-                continue
-            if sender not in senders:
-                senders[sender] = {"count": 0, "unread_count": 0, "last_date": "", "has_unsubscribe": False, "labels": set(), "cat_counter": Counter()}
-            s = senders[sender]
-            s["count"] += 1
-            if not meta.get("is_read", True):
-                s["unread_count"] += 1
-            date_iso = meta.get("date_iso", "")
-            if date_iso > s["last_date"]:
-                s["last_date"] = date_iso
-            if meta.get("list_unsubscribe", ""):
-                s["has_unsubscribe"] = True
-            for lbl in meta.get("labels", "").strip("|").split("|"):
-                if lbl:
-                    s["labels"].add(lbl)
-            s["cat_counter"][meta.get("category", "Other")] += 1
-
-        results = []
-        for sender, s in senders.items():
-            is_subscription = (
-                s["has_unsubscribe"]
-                or bool(_SUBSCRIPTION_RE.search(sender))
-                or bool(s["labels"] & _SUBSCRIPTION_LABELS)
-                or s["count"] >= 5
-            )
-            results.append({
-                "sender": sender,
-                "count": s["count"],
-                "unread_count": s["unread_count"],
-                "last_date": s["last_date"],
-                "has_list_unsubscribe": s["has_unsubscribe"],
-                "is_subscription": is_subscription,
-                "category": s["cat_counter"].most_common(1)[0][0] if s["cat_counter"] else "Other",
-            })
-
-        results.sort(key=lambda x: x["count"], reverse=True)
-        return results[:limit]
+    def email_count(self, account_id: str | None = None) -> int:
+        mirror = self._store.metadata_mirror()
+        return sum(1 for _ in mirror.select(account_id=account_id)) if account_id else len(mirror)
+
+    def get_sender_analytics(self, limit: int | None = 200, account_id: str | None = None) -> list[dict]:
+        view = self._store.metadata_columns(account_id)
+        stats = sender_summary(view)
+        # Most common category per sender, from a (sender, category) histogram
+        n_cat = max(len(view.categories), 1)
+        pairs = np.bincount(
+            view.sender.astype(np.int64) * n_cat + view.category, minlength=len(view.senders) * n_cat
+        ).reshape(len(view.senders), n_cat)
+        top_category = pairs.argmax(axis=1)
+
+        codes = np.flatnonzero(stats["count"])
+        codes = codes[np.argsort(-stats["count"][codes], kind="stable")][:limit]
+        return [
+            {
+                "sender": view.senders[c],
+                "count": int(stats["count"][c]),
+                "unread_count": int(stats["unread"][c]),
+                "last_date": view.iso(stats["last_row"][c]),
+                "has_list_unsubscribe": bool(stats["has_unsubscribe"][c]),
+                "is_subscription": bool(stats["is_subscription"][c]),
+                "category": view.categories[top_category[c]] if view.categories else "Other",
+            }
+            for c in codes
+        ]
 
     # --- Export ---
 
@@ -258,8 +360,10 @@ class EmailSearch:
         filters: SearchFilters | None = None,
         columns: list[str] | None = None,
     ) -> int:
-        where = self._build_where(filters) if filters else None
-        result = self._store.get_emails(where=where)
+        check = _metadata_check(filters) if filters else None
+        rows = self._store.metadata_mirror().select(
+            lambda m: filters is None or (self._matches_filters(m, filters) and (check is None or check(m)))
+        )
         cols = columns or self.CSV_COLUMNS
 
         col_to_meta_key = {
@@ -270,7 +374,8 @@ class EmailSearch:
         with open(path, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
             writer.writerow(cols)
-            for id_, meta in zip(result["ids"], result["metadatas"]):
+            count = 0
+            for id_, meta in rows:
                 row = []
                 for col in cols:
                     if col == "gmail_id":
@@ -279,46 +384,35 @@ class EmailSearch:
                         key = col_to_meta_key.get(col, col)
                         row.append(meta.get(key, ""))
                 writer.writerow(row)
+                count += 1
 
-        count = len(result["ids"])
         logger.info("[EmailSearch] exported %d emails to %s", count, path)
         return count
 
     # --- Internal helpers ---
 
-    @staticmethod
-    def _build_where(filters: SearchFilters) -> dict | None:
-        conditions = []
-        if filters.sender:
-            conditions.append({"sender": {"$contains": filters.sender}})
-        if filters.date_from:
-            conditions.append({"date_timestamp": {"$gte": int(filters.date_from.timestamp())}})
-        if filters.date_to:
-            conditions.append({"date_timestamp": {"$lte": int(filters.date_to.timestamp())}})
-        if filters.has_attachments is not None:
-            conditions.append({"has_attachments": filters.has_attachments})
-        if filters.is_read is not None:
-            conditions.append({"is_read": filters.is_read})
-        if filters.is_starred is not None:
-            conditions.append({"is_starred": filters.is_starred})
-        if filters.subject_contains:
-            conditions.append({"subject": {"$contains": filters.subject_contains}})
-        if filters.label:
-            conditions.append({"labels": {"$contains": f"|{filters.label}|"}})
-        if filters.category:
-            conditions.append({"category": filters.category})
-        if filters.recipients:
-            conditions.append({"recipients_to": {"$contains": filters.recipients}})
-
-        if not conditions:
-            return None
-        if len(conditions) == 1:
-            return conditions[0]
-        return {"$and": conditions}
+    def _get_in_order(self, ids: list[str]) -> list[dict]:
+        """Emails for `ids` in that order (Chroma returns them in insertion order); missing ids are skipped.
+
+        Metadata comes from the metadata mirror. Bodies are left out: list views
+        show the snippet, and `get_email` reads the body.
+        """
+        by_id = self._metadatas(ids)
+        return [{"id": id_, "metadata": by_id[id_]} for id_ in ids if id_ in by_id]
+
+    def _metadatas(self, ids: list[str]) -> dict[str, dict]:
+        """Metadata by id from the mirror, re-read from Chroma for rows the mirror hasn't caught up on."""
+        by_id = self._store.get_metadatas(ids)
+        if missing := [gid for gid in ids if gid not in by_id]:
+            result = self._store.get_emails(ids=missing, include=["metadatas"])
+            by_id.update(zip(result["ids"], result["metadatas"]))
+        return by_id
 
     @staticmethod
     def _matches_filters(metadata: dict, filters: SearchFilters) -> bool:
-        if filters.sender and filters.sender.lower() not in metadata.get("sender", "").lower():
+        if filters.sender and not sender_matches(filters.sender, metadata.get("sender", "")):
+            return False
+        if filters.label and f"|{filters.label}|" not in metadata.get("labels", ""):
             return False
         if filters.date_from:
             ts = metadata.get("date_timestamp", 0)
@@ -338,4 +432,6 @@ class EmailSearch:
             return False
         if filters.category and metadata.get("category") != filters.category:
             return False
+        if filters.account_id and metadata.get("account_id") != filters.account_id:
+            return False
         return True
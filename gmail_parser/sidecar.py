@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def save_npz(path: Path, **arrays):
+    """Write `arrays` to a temporary .npz beside `path`, then swap it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+class VersionedSidecar(ABC):
+    """In-process copy of one Chroma field, saved with the change-log `version` it reflects."""
+
+    SAVE_DELAY_SECS = 30.0
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = threading.RLock()
+        self._save_timer: threading.Timer | None = None
+        self._dirty = False
+        self.version = 0
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    # --- Loading ---
+
+    def load(self) -> bool:
+        """Read the saved sidecar; False if there is none or it is unreadable."""
+        with self._lock:
+            if not self._path.exists():
+                return False
+            try:
+                self._read()
+                self._dirty = False
+                return True
+            except Exception as e:
+                logger.warning("[%s] unreadable %s (%s) — rebuilding", type(self).__name__, self._path, e)
+                self._reset()
+                return False
+
+    def rebuild(self, pages: Iterable[tuple[list[str], list]], version: int):
+        """Replace the contents with the given (ids, values) pages, read at change-log `version`."""
+        with self._lock:
+            self._reset()
+            self._fill(pages)
+            self.version = version
+            self._mark_dirty()
+        self.flush()
+        logger.info("[%s] rebuilt %d rows", type(self).__name__, len(self))
+
+    # --- Mutations ---
+
+    @abstractmethod
+    def replace(self, ids: list[str], values: list):
+        """Set rows to whole records read back from Chroma."""
+
+    @abstractmethod
+    def delete(self, ids: list[str]): ...
+
+    def advance(self, version: int):
+        """Record that the sidecar now reflects the change log up to `version`."""
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._mark_dirty()
+
+    # --- Persistence ---
+
+    def flush(self):
+        """Save now if anything changed since the last save."""
+        with self._lock:
+            if self._save_timer:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            try:
+                write = self._save()
+            except Exception:
+                self._dirty = True
+                raise
+        if write is None:
+            return
+        try:
+            write()
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+
+    @abstractmethod
+    def _read(self):
+        """Load the saved data and its version from `self._path`."""
+
+    @abstractmethod
+    def _reset(self):
+        """Empty the sidecar."""
+
+    @abstractmethod
+    def _save(self) -> Callable[[], None] | None:
+        """Write the sidecar under the lock, or return a function that writes it once the lock is released."""
+
+    def _fill(self, pages: Iterable[tuple[list[str], list]]):
+        for ids, values in pages:
+            self.replace(ids, values)
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.SAVE_DELAY_SECS, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
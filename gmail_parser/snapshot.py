@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from gmail_parser.exceptions import StoreError
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 1
+
+MANIFEST = "manifest.json"
+
+# Metadata column type codes, per row
+_MISSING, _BOOL, _INT, _FLOAT, _STR = range(5)
+
+
+# --- Strings ---
+
+
+def encode_strings(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Pack strings into (offsets, utf-8 bytes); string i is data[offsets[i]:offsets[i + 1]]."""
+    encoded = [v.encode() for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def decode_strings(offsets: np.ndarray, data: np.ndarray) -> list[str]:
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[bounds[i] : bounds[i + 1]].decode() for i in range(len(bounds) - 1)]
+
+
+# --- Metadata columns ---
+
+
+def encode_metadatas(metadatas: list[dict]) -> dict[str, np.ndarray]:
+    """One set of arrays per metadata key, losslessly keeping bool/int/float/str apart.
+
+    For key k: `k/type` is a per-row type code, and `k/bool`, `k/int`,
+    `k/float`, `k/str_offsets` + `k/str_data` hold the values of the rows of
+    that type, in row order.
+    """
+    keys = sorted({key for meta in metadatas for key in meta})
+    arrays: dict[str, np.ndarray] = {"keys": np.array(keys, dtype=str)}
+    for key in keys:
+        types = np.zeros(len(metadatas), dtype=np.uint8)
+        values: dict[int, list] = {_BOOL: [], _INT: [], _FLOAT: [], _STR: []}
+        for i, meta in enumerate(metadatas):
+            if key not in meta:
+                continue
+            value = meta[key]
+            if isinstance(value, bool):
+                code = _BOOL
+            elif isinstance(value, int):
+                code = _INT
+            elif isinstance(value, float):
+                code = _FLOAT
+            else:
+                code, value = _STR, str(value)
+            types[i] = code
+            values[code].append(value)
+        arrays[f"{key}/type"] = types
+        arrays[f"{key}/bool"] = np.array(values[_BOOL], dtype=bool)
+        arrays[f"{key}/int"] = np.array(values[_INT], dtype=np.int64)
+        arrays[f"{key}/float"] = np.array(values[_FLOAT], dtype=np.float64)
+        arrays[f"{key}/str_offsets"], arrays[f"{key}/str_data"] = encode_strings(values[_STR])
+    return arrays
+
+
+def decode_metadatas(arrays, count: int) -> list[dict]:
+    metadatas: list[dict] = [{} for _ in range(count)]
+    for key in arrays["keys"].tolist():
+        types = arrays[f"{key}/type"]
+        columns = {
+            _BOOL: iter(arrays[f"{key}/bool"].tolist()),
+            _INT: iter(arrays[f"{key}/int"].tolist()),
+            _FLOAT: iter(arrays[f"{key}/float"].tolist()),
+            _STR: iter(decode_strings(arrays[f"{key}/str_offsets"], arrays[f"{key}/str_data"])),
+        }
+        for i in np.flatnonzero(types).tolist():
+            metadatas[i][key] = next(columns[int(types[i])])
+    return metadatas
+
+
+# --- Collections ---
+
+
+class CollectionRows:
+    """Rows of one collection gathered for a snapshot, updatable as changes are replayed."""
+
+    def __init__(self, ids: list[str]):
+        self.index = {gid: i for i, gid in enumerate(ids)}
+        self.ids = list(ids)
+        self.documents: list[str] = [""] * len(ids)
+        self.metadatas: list[dict] = [{} for _ in ids]
+        self.embeddings: list[np.ndarray | None] = [None] * len(ids)
+        self.alive = [True] * len(ids)
+
+    def put(self, page: dict):
+        for gid, doc, meta, emb in zip(page["ids"], page["documents"], page["metadatas"], page["embeddings"]):
+            i = self.index.get(gid)
+            if i is None:
+                i = self.index[gid] = len(self.ids)
+                self.ids.append(gid)
+                self.documents.append("")
+                self.metadatas.append({})
+                self.embeddings.append(None)
+                self.alive.append(True)
+            self.documents[i] = doc or ""
+            self.metadatas[i] = meta or {}
+            self.embeddings[i] = np.asarray(emb, dtype=np.float32)
+            self.alive[i] = True
+
+    def drop(self, ids):
+        for gid in ids:
+            i = self.index.get(gid)
+            if i is not None:
+                self.alive[i] = False
+
+    def write(self, directory: Path, name: str) -> dict:
+        rows = [i for i, alive in enumerate(self.alive) if alive and self.embeddings[i] is not None]
+        ids = [self.ids[i] for i in rows]
+        dim = len(self.embeddings[rows[0]]) if rows else 0
+        matrix = np.lib.format.open_memmap(
+            directory / f"{name}.embeddings.npy", mode="w+", dtype=np.float32, shape=(len(rows), dim)
+        )
+        for j, i in enumerate(rows):
+            matrix[j] = self.embeddings[i]
+        matrix.flush()
+        del matrix
+        id_offsets, id_data = encode_strings(ids)
+        np.savez_compressed(
+            directory / f"{name}.metadata.npz",
+            id_offsets=id_offsets,
+            id_data=id_data,
+            **encode_metadatas([self.metadatas[i] for i in rows]),
+        )
+        doc_offsets, doc_data = encode_strings([self.documents[i] for i in rows])
+        np.savez_compressed(directory / f"{name}.documents.npz", offsets=doc_offsets, data=doc_data)
+        return {"count": len(rows), "dim": dim}
+
+
+def read_collection(directory: str | Path, name: str, mmap: bool = True) -> dict:
+    """A snapshot collection as a get()-shaped dict; embeddings are memory-mapped by default."""
+    directory = Path(directory)
+    with np.load(directory / f"{name}.metadata.npz") as arrays:
+        ids = decode_strings(arrays["id_offsets"], arrays["id_data"])
+        metadatas = decode_metadatas(arrays, len(ids))
+    with np.load(directory / f"{name}.documents.npz") as arrays:
+        documents = decode_strings(arrays["offsets"], arrays["data"])
+    embeddings = np.load(directory / f"{name}.embeddings.npy", mmap_mode="r" if mmap else None)
+    return {"ids": ids, "documents": documents, "metadatas": metadatas, "embeddings": embeddings}
+
+
+# --- Manifest ---
+
+
+def write_snapshot(path: str | Path, version: int, collections: dict[str, CollectionRows], state: dict) -> dict:
+    """Write the snapshot files to a temporary directory, then move it into place at `path`."""
+    path = Path(path)
+    if path.exists():
+        raise StoreError(f"Snapshot path {path} already exists")
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    manifest = {
+        "format": FORMAT,
+        "version": version,
+        "created_at": time.time(),
+        "collections": {name: rows.write(tmp, name) for name, rows in collections.items()},
+        "state": state,
+    }
+    (tmp / MANIFEST).write_text(json.dumps(manifest))
+    os.replace(tmp, path)
+    return manifest
+
+
+def read_manifest(path: str | Path) -> dict:
+    manifest_path = Path(path) / MANIFEST
+    if not manifest_path.exists():
+        raise StoreError(f"No snapshot at {path}")
+    manifest = json.loads(manifest_path.read_text())
+    if manifest.get("format") != FORMAT:
+        raise StoreError(f"Unsupported snapshot format {manifest.get('format')!r} at {path}")
+    return manifest
@@ -1,44 +1,162 @@
 import logging
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+import numpy as np
+from chromadb.db.impl.sqlite import SqliteDB
+from chromadb.errors import InvalidCollectionException
+from chromadb.segment import SegmentManager
 
-from gmail_parser.config import settings
+from gmail_parser import maintenance, writer
+from gmail_parser.backends import open_client
+from gmail_parser.bodies import BodyStore
+from gmail_parser.changelog import Change, ChangeLog
+from gmail_parser.columns import ColumnView, MetadataColumns
+from gmail_parser.config import DEFAULT_ACCOUNT, settings
+from gmail_parser.exceptions import StoreError
+from gmail_parser.fulltext import FullTextIndex
+from gmail_parser.mirror import MetadataMirror, MirrorView
+from gmail_parser.postings import PostingIndex
+from gmail_parser.sidecar import VersionedSidecar
+from gmail_parser.snapshot import CollectionRows, read_collection, read_manifest, write_snapshot
+from gmail_parser.vectors import VectorIndex, normalize
+from gmail_parser.writer import StoreWriter
 
 logger = logging.getLogger(__name__)
 
+# Labels and sync state are only ever looked up by id. Writing a fixed vector keeps
+# Chroma from loading its default embedding model on the first write. 384 matches the
+# dimension that model gave the records of existing stores.
+_PLACEHOLDER_EMBEDDING = [0.0] * 384
+
+# Rounds of change replay a snapshot export or collection rebuild makes before giving up on a quiet moment
+_CATCH_UP_ROUNDS = 20
+
+# Chroma's HNSW defaults, for collections created without explicit parameters
+_HNSW_DEFAULTS = {"hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 100}
+
+# sync_state record of the one-time data migrations a store has run
+_MIGRATIONS_ID = "migrations"
+
+# EMAIL_PARSER_VECTOR_INDEX values backed by a VectorIndex sidecar, and its row type
+_SIDECAR_DTYPES = {"exact": "float32", "float16": "float16", "int8": "int8"}
+
+# SQLite databases kept beside Chroma's, and what maintenance runs on each before VACUUM
+_SIDECAR_DATABASES = {
+    BodyStore.FILENAME: (),
+    # Merge the FTS5 index's segments into one b-tree
+    FullTextIndex.FILENAME: ("INSERT INTO emails_fts(emails_fts) VALUES('optimize')",),
+    PostingIndex.FILENAME: (),
+    ChangeLog.FILENAME: (),
+}
+
 
 class EmailStore:
-    def __init__(self, persist_dir: str | None = None):
-        self._client = chromadb.PersistentClient(
-            path=persist_dir or settings.chroma_persist_dir,
-            settings=ChromaSettings(anonymized_telemetry=False),
-        )
-        self._emails = self._client.get_or_create_collection(
-            "emails",
-            metadata={"hnsw:space": "cosine"},
-        )
-        self._labels = self._client.get_or_create_collection("labels")
-        self._sync_state = self._client.get_or_create_collection("sync_state")
+    def __init__(self, persist_dir: str | None = None, vector_index: str | None = None, backend: str | None = None):
+        self._persist_dir = persist_dir or settings.chroma_persist_dir
+        self._vector_index = vector_index or settings.vector_index
+        if self._vector_index != "hnsw" and self._vector_index not in _SIDECAR_DTYPES:
+            raise StoreError(f"Unknown vector index {self._vector_index!r}; expected hnsw, exact, float16 or int8")
+        # Chroma, or its in-memory stand-in (gmail_parser.backends); the sidecars work the same over either
+        self._backend = backend or settings.store_backend
+        self._client = open_client(self._backend, self._persist_dir)
+        self._emails = _EmailsCollection(self._client)
+        if {**_HNSW_DEFAULTS, **(self._emails.metadata or {})} != hnsw_metadata():
+            logger.warning(
+                "[EmailStore] emails collection was built with %s, settings ask for %s — "
+                "run rebuild_emails_collection() to apply them",
+                self._emails.metadata, hnsw_metadata(),
+            )
+        self._labels = self._client.get_or_create_collection("labels", embedding_function=None)
+        self._sync_state = self._client.get_or_create_collection("sync_state", embedding_function=None)
         self._expenses = self._client.get_or_create_collection(
             "expenses",
             metadata={"hnsw:space": "cosine"},
         )
-        logger.debug(
-            "[EmailStore] initialized at %s", persist_dir or settings.chroma_persist_dir
-        )
+        self._changelog = ChangeLog(self._persist_dir)
+        # Versions of this instance's own email writes, already applied to the columns and vectors
+        self._own_versions: set[int] = set()
+        self._columns: MetadataColumns | None = None
+        self._columns_lock = threading.RLock()
+        self._mirror: MetadataMirror | None = None
+        self._mirror_lock = threading.RLock()
+        self._closed = threading.Event()
+        self._vectors: VectorIndex | None = None
+        self._vectors_lock = threading.RLock()
+        self._fulltext: FullTextIndex | None = None
+        self._fulltext_lock = threading.Lock()
+        self._bodies: BodyStore | None = None
+        self._bodies_lock = threading.Lock()
+        self._postings: PostingIndex | None = None
+        self._postings_lock = threading.Lock()
+        # Every mutation goes through one writer thread, which merges queued writes of a kind
+        self._writer = StoreWriter(self._apply_write, max_batch=settings.write_batch_max)
+        self._forward: Callable | None = None
+        logger.debug("[EmailStore] initialized at %s", self._persist_dir)
+
+    # --- Writes ---
+    #
+    # Public write methods queue the write on the writer thread and, unless
+    # `wait=False`, block until it is applied (raising its error). Either way
+    # they return the write's Future.
+
+    def _write(self, kind: str, *args, wait: bool = True) -> Future:
+        if self._forward is not None:
+            return self._write_forwarded(kind, args)
+        future = self._writer.submit(kind, *args)
+        if wait:
+            future.result()
+        return future
+
+    def _call(self, fn):
+        """Run a write that has no batched form (labels, sync state) on the writer thread."""
+        return self._writer.call(fn).result()
+
+    def _apply_write(self, kind: str, args: tuple):
+        {
+            writer.UPSERT_EMAILS: self._upsert_emails,
+            writer.UPDATE_EMAILS: self._update_emails,
+            writer.DELETE_EMAILS: self._delete_emails,
+            writer.UPSERT_EXPENSES: self._upsert_expenses,
+            writer.DELETE_EXPENSES: self._delete_expenses,
+        }[kind](*args)
+
+    def forward_to(self, call: Callable | None):
+        """Send writes and Chroma queries to `call(op, *args)`, which runs `serve_forwarded` on the owning store."""
+        self._forward = call
+
+    def serve_forwarded(self, op: str, *args):
+        """Apply a write or run a query forwarded by another process's store."""
+        if op == "write":
+            kind, write_args = args
+            self._write(kind, *write_args)
+        elif op == "query":
+            return self.query(*args)
+        else:
+            raise StoreError(f"Unknown forwarded store operation {op!r}")
+
+    def _write_forwarded(self, kind: str, args: tuple) -> Future:
+        # Applied by the other process before returning, so even wait=False writes block here
+        self._forward("write", kind, args)
+        if self._mirror is not None:
+            self.refresh_mirror()
+        future = Future()
+        future.set_result(None)
+        return future
+
+    def writer_stats(self) -> dict:
+        """Writes applied, batches they were merged into, and writes still queued."""
+        return self._writer.stats()
 
     # --- Emails ---
 
     def upsert_email(
-        self, gmail_id: str, document: str, embedding: list[float], metadata: dict
-    ):
-        self._emails.upsert(
-            ids=[gmail_id],
-            documents=[document],
-            embeddings=[embedding],
-            metadatas=[metadata],
-        )
+        self, gmail_id: str, document: str, embedding: list[float], metadata: dict, wait: bool = True
+    ) -> Future:
+        return self.upsert_emails_batch([gmail_id], [document], [embedding], [metadata], wait=wait)
 
     def upsert_emails_batch(
         self,
@@ -46,18 +164,38 @@ class EmailStore:
         documents: list[str],
         embeddings: list[list[float]],
         metadatas: list[dict],
-    ):
+        wait: bool = True,
+    ) -> Future:
+        return self._write(writer.UPSERT_EMAILS, ids, documents, embeddings, metadatas, wait=wait)
+
+    def _upsert_emails(self, ids: list[str], documents: list[str], embeddings, metadatas: list[dict]):
+        # Bodies go to the body store, only for the rows Chroma took; Chroma keeps an empty document.
+        # The body store is opened first: opening it after the upsert would reconcile it against these rows
+        bodies = self._load_bodies()
         batch_size = 500
-        for i in range(0, len(ids), batch_size):
-            self._emails.upsert(
-                ids=ids[i : i + batch_size],
-                documents=documents[i : i + batch_size],
-                embeddings=embeddings[i : i + batch_size],
-                metadatas=metadatas[i : i + batch_size],
-            )
+        done = 0
+        try:
+            for i in range(0, len(ids), batch_size):
+                chunk = ids[i : i + batch_size]
+                self._emails.upsert(
+                    ids=chunk,
+                    documents=[""] * len(chunk),
+                    embeddings=embeddings[i : i + batch_size],
+                    metadatas=metadatas[i : i + batch_size],
+                )
+                done = i + len(chunk)
+        finally:
+            bodies.put(ids[:done], documents[:done])
+        self._load_columns().upsert(ids, metadatas)
+        self._load_mirror().upsert(ids, metadatas)
+        self._load_fulltext().upsert(ids, [m.get("subject") for m in metadatas], documents)
+        self._load_postings().upsert(ids, metadatas)
+        if self._vector_index != "hnsw":
+            self._load_vectors().upsert(ids, embeddings)
+        self._record("emails", "upsert", ids, metadatas, upsert=True)
 
     def get_email(self, gmail_id: str) -> dict | None:
-        result = self._emails.get(ids=[gmail_id], include=["documents", "metadatas"])
+        result = self._get_emails(ids=[gmail_id], include=["documents", "metadatas"])
         if not result["ids"]:
             return None
         return {
@@ -73,60 +211,546 @@ class EmailStore:
         where: dict | None = None,
         where_document: dict | None = None,
     ) -> dict:
+        """Nearest emails to `embedding`, shaped like a Chroma query() result without documents."""
+        if where_document:
+            return self._query_documents(embedding, n_results, where, where_document)
+        if self._vector_index != "hnsw" and not where:
+            return self._query_vectors(embedding, n_results)
+        if self._forward is not None:
+            return self._forward("query", embedding, n_results, where)
         kwargs = {
             "query_embeddings": [embedding],
             "n_results": n_results,
-            "include": ["documents", "metadatas", "distances"],
+            "include": ["metadatas", "distances"],
         }
         if where:
             kwargs["where"] = where
-        if where_document:
-            kwargs["where_document"] = where_document
         return self._emails.query(**kwargs)
 
+    def _query_documents(self, embedding: list[float], n_results: int, where: dict | None, where_document: dict) -> dict:
+        """query() with `where_document` tested on the body store, over doubling rounds of hits."""
+        total = self._emails.count()
+        fetch = min(n_results * 4, total)
+        result, keep = {"ids": [[]], "metadatas": [[]], "distances": [[]]}, []
+        while fetch:
+            result = self.query(embedding, fetch, where)
+            ids = result["ids"][0]
+            bodies = self.get_bodies(ids)
+            keep = [i for i, gid in enumerate(ids) if _document_matches(where_document, bodies.get(gid, ""))]
+            if len(keep) >= n_results or len(ids) < fetch or fetch >= total:
+                break
+            fetch = min(fetch * 2, total)
+        return {key: [[result[key][0][i] for i in keep[:n_results]]] for key in ("ids", "metadatas", "distances")}
+
     def get_emails(
         self,
         where: dict | None = None,
         limit: int | None = None,
         offset: int | None = None,
+        ids: list[str] | None = None,
+        include: list[str] | None = None,
     ) -> dict:
-        kwargs = {"include": ["documents", "metadatas"]}
+        """Matching emails as a Chroma get() result; add "documents" to `include` for their bodies."""
+        include = include or ["metadatas"]
+        kwargs: dict = {"include": include}
+        if ids is not None:
+            if not ids:
+                return {"ids": [], **{key: [] for key in include}}
+            kwargs["ids"] = ids
         if where:
             kwargs["where"] = where
         if limit:
             kwargs["limit"] = limit
         if offset:
             kwargs["offset"] = offset
-        return self._emails.get(**kwargs)
+        return self._get_emails(**kwargs)
 
-    def get_all_emails(self, include: list[str] | None = None) -> dict:
-        return self._emails.get(
-            include=include or ["metadatas"], limit=self._emails.count()
-        )
+    def get_all_emails(
+        self, include: list[str] | None = None, where: dict | None = None
+    ) -> dict:
+        """Every matching email in one result. Prefer `iter_emails` for large scans."""
+        include = include or ["metadatas"]
+        result: dict = {"ids": [], **{key: [] for key in include}}
+        for page in self.iter_emails(where=where, include=include):
+            for key in result:
+                result[key].extend(page[key])
+        return result
 
-    def count(self) -> int:
+    def iter_emails(
+        self,
+        where: dict | None = None,
+        include: list[str] | None = None,
+        page_size: int = 1000,
+        ids: list[str] | None = None,
+    ) -> Iterator[dict]:
+        """Yield matching emails a page at a time, shaped like Chroma get() results, in insertion order."""
+        # Pages are read by offset: collect ids with iter_ids() first when deleting what is yielded
+        kwargs: dict = {"include": include if include is not None else ["metadatas"], "limit": page_size}
+        if where:
+            kwargs["where"] = where
+        if ids is not None:
+            del kwargs["limit"]
+            for i in range(0, len(ids), page_size):
+                page = self._get_emails(ids=ids[i : i + page_size], **kwargs)
+                if page["ids"]:
+                    yield page
+            return
+        offset = 0
+        while True:
+            page = self._get_emails(**kwargs, offset=offset)
+            if page["ids"]:
+                yield page
+            if len(page["ids"]) < page_size:
+                return
+            offset += page_size
+
+    def iter_ids(self, where: dict | None = None, page_size: int = 10000) -> Iterator[str]:
+        for page in self.iter_emails(where=where, include=[], page_size=page_size):
+            yield from page["ids"]
+
+    def count(self, where: dict | None = None) -> int:
+        if where:
+            return sum(1 for _ in self.iter_ids(where))
         return self._emails.count()
 
-    def update_metadatas_batch(self, ids: list[str], metadatas: list[dict]):
+    def update_metadatas_batch(self, ids: list[str], metadatas: list[dict], wait: bool = True) -> Future:
+        return self._write(writer.UPDATE_EMAILS, ids, metadatas, wait=wait)
+
+    def _update_emails(self, ids: list[str], metadatas: list[dict]):
         batch_size = 500
         for i in range(0, len(ids), batch_size):
             self._emails.update(
                 ids=ids[i : i + batch_size],
                 metadatas=metadatas[i : i + batch_size],
             )
+        self._load_columns().update(ids, metadatas)
+        self._load_mirror().update(ids, metadatas)
+        self._load_postings().update(ids, metadatas)
+        self._record("emails", "update", ids, metadatas)
 
     def get_all_ids(self, where: dict | None = None) -> list[str]:
-        kwargs: dict = {"include": [], "limit": self._emails.count()}
-        if where:
-            kwargs["where"] = where
-        return self._emails.get(**kwargs)["ids"]
+        return list(self.iter_ids(where))
+
+    def get_metadatas(self, ids: list[str]) -> dict[str, dict]:
+        """Metadata by id for the given ids, from the metadata mirror; ids not in the store are omitted."""
+        view = self.metadata_mirror()
+        return {gid: dict(view[gid]) for gid in ids if gid in view}
+
+    def ids_by_account(self, ids: list[str]) -> dict[str, list[str]]:
+        """`ids` grouped by the account each email belongs to; unknown ids go to the default account."""
+        view = self.metadata_mirror()
+        groups: dict[str, list[str]] = {}
+        for gid in ids:
+            account = (view[gid].get("account_id") if gid in view else None) or DEFAULT_ACCOUNT
+            groups.setdefault(account, []).append(gid)
+        return groups
 
     def get_existing_ids(self, ids: list[str]) -> set[str]:
         result = self._emails.get(ids=ids, include=[])
         return set(result["ids"])
 
-    def delete_emails(self, ids: list[str]):
+    def delete_emails(self, ids: list[str], wait: bool = True) -> Future:
+        return self._write(writer.DELETE_EMAILS, ids, wait=wait)
+
+    def _delete_emails(self, ids: list[str]):
         self._emails.delete(ids=ids)
+        self._load_bodies().delete(ids)
+        self._load_columns().delete(ids)
+        self._load_mirror().delete(ids)
+        self._load_fulltext().delete(ids)
+        self._load_postings().delete(ids)
+        if self._vector_index != "hnsw":
+            self._load_vectors().delete(ids)
+        self._record("emails", "delete", ids)
+
+    def rebuild_emails_collection(
+        self, m: int | None = None, construction_ef: int | None = None, search_ef: int | None = None
+    ) -> dict:
+        """Copy the emails into a new collection built with these HNSW parameters and swap it in."""
+        # Pause other processes' ingestion around this: a write between the last replay and the swap is lost
+        metadata = hnsw_metadata(m, construction_ef, search_ef)
+        staging = "emails_rebuild"
+        if staging in self._client.list_collections():
+            self._client.delete_collection(staging)
+        target = self._client.create_collection(staging, metadata=metadata)
+
+        def copy(ids: list[str]):
+            for i in range(0, len(ids), 5000):
+                for page in _get_by_ids(self._emails, ids[i : i + 5000], ["documents", "metadatas", "embeddings"]):
+                    if page["ids"]:
+                        target.upsert(
+                            ids=page["ids"],
+                            documents=page["documents"],
+                            embeddings=page["embeddings"],
+                            metadatas=page["metadatas"],
+                        )
+                    missing = list(set(page["requested"]) - set(page["ids"]))
+                    if missing:
+                        target.delete(ids=missing)
+
+        version = self.version()
+
+        def replay() -> bool:
+            nonlocal version
+            changes = self.changes_since(version, collection="emails")
+            if changes is None:
+                raise StoreError("Change log was compacted during the rebuild; run it again")
+            if changes:
+                version = changes[-1].version
+                copy(list(dict.fromkeys(gid for change in changes for gid in change.ids)))
+            return bool(changes)
+
+        def swap():
+            replay()
+            self._client.delete_collection("emails")
+            target.modify(name="emails")
+            self._emails.reopen()
+            self._record("emails", "swap", [])
+
+        copy(self._emails.get(include=[])["ids"])
+        for _ in range(_CATCH_UP_ROUNDS):
+            if not replay():
+                break
+        self._call(swap)
+        logger.info("[EmailStore] rebuilt emails collection (%d emails) with %s", self._emails.count(), metadata)
+        return {"emails": self._emails.count(), "metadata": metadata}
+
+    # --- Maintenance ---
+
+    def maintenance_stats(self) -> dict:
+        """Size and health of the collections, SQLite databases and sidecars on disk."""
+        persist_dir = Path(self._persist_dir)
+        segments = maintenance.hnsw_segment_dirs(persist_dir)
+        # Segments this process has open hold exact counts; saved ones may trail them
+        loaded = {}
+        if self._backend == "chroma":
+            loaded = {str(sid): seg for sid, seg in self._client._system.instance(SegmentManager)._instances.items()}
+        collections = {}
+        for collection in (self._emails, self._labels, self._sync_state, self._expenses):
+            entry: dict = {"count": collection.count()}
+            if (segment_dir := segments.get(str(collection.id))) is not None:
+                m = (collection.metadata or {}).get("hnsw:M", _HNSW_DEFAULTS["hnsw:M"])
+                entry["hnsw"] = maintenance.hnsw_stats(segment_dir, m, loaded.get(segment_dir.name))
+            collections[collection.name] = entry
+        databases = {
+            name: maintenance.sqlite_stats(persist_dir / name) for name in ("chroma.sqlite3", *_SIDECAR_DATABASES)
+        }
+        stats = {
+            "version": self.version(),
+            "total_bytes": maintenance.file_bytes(persist_dir),
+            "collections": collections,
+            "databases": {name: db for name, db in databases.items() if db is not None},
+            "files": {p.name: maintenance.file_bytes(p) for p in sorted(persist_dir.glob("*.np[yz]"))},
+            "writer": self.writer_stats(),
+        }
+        if self._vector_index != "hnsw":
+            stats["vectors"] = self._load_vectors().stats()
+        return stats
+
+    def run_maintenance(
+        self, vacuum: bool = True, compact: bool = True, force: bool = False, rebuild_hnsw: bool = False
+    ) -> dict:
+        """Compact the change log and sidecars and vacuum SQLite databases past their thresholds."""
+        def due(ratio: float, threshold: float) -> bool:
+            return ratio > 0 and (force or ratio >= threshold)
+
+        compacted: list[str] = []
+        vacuumed: dict[str, int] = {}
+        stats = self.maintenance_stats()
+        hnsw = stats["collections"]["emails"].get("hnsw")
+        hnsw_due = bool(hnsw) and hnsw["tombstone_ratio"] >= settings.maintenance_rebuild_ratio
+        if compact:
+            self._changelog.compact()
+            if rebuild_hnsw and hnsw and due(hnsw["tombstone_ratio"], settings.maintenance_rebuild_ratio):
+                params = self._emails.metadata or {}
+                self.rebuild_emails_collection(
+                    params.get("hnsw:M"), params.get("hnsw:construction_ef"), params.get("hnsw:search_ef")
+                )
+                compacted.append("emails")
+                hnsw_due = False
+            elif hnsw_due:
+                logger.info(
+                    "[EmailStore] emails HNSW graph is %.0f%% tombstones — pause ingestion and rebuild it",
+                    hnsw["tombstone_ratio"] * 100,
+                )
+            if "vectors" in stats and due(stats["vectors"]["fragmentation"], settings.maintenance_rebuild_ratio):
+                self._call(self._rebuild_vectors)
+                compacted.append("vectors")
+        if vacuum:
+            self._call(self._purge_chroma_log)
+            for name, db in self.maintenance_stats()["databases"].items():
+                if due(db["free_ratio"], settings.maintenance_vacuum_ratio):
+                    vacuumed[name] = self._call(lambda name=name: self._vacuum(name))
+        logger.info("[EmailStore] maintenance: compacted %s, vacuumed %s", compacted or "nothing", vacuumed or "nothing")
+        return {
+            "compacted": compacted,
+            "vacuumed": vacuumed,
+            "hnsw_rebuild_due": hnsw_due,
+            "stats": self.maintenance_stats(),
+        }
+
+    def _rebuild_vectors(self):
+        with self._vectors_lock:
+            self._load_vectors().rebuild(self._pages("embeddings"), self.version())
+
+    def _purge_chroma_log(self):
+        if self._backend != "chroma":
+            return
+        db = self._client._system.instance(SqliteDB)
+        for collection in (self._emails, self._labels, self._sync_state, self._expenses):
+            db.purge_log(collection.id)
+
+    def _vacuum(self, name: str) -> int:
+        """VACUUM one of the store's databases; returns the bytes freed."""
+        path = Path(self._persist_dir) / name
+        if name in _SIDECAR_DATABASES:
+            return maintenance.vacuum_sqlite(path, _SIDECAR_DATABASES[name])
+        before = maintenance.file_bytes(path)
+        self._client._system.instance(SqliteDB).vacuum(timeout=30)
+        return before - maintenance.file_bytes(path)
+
+    # --- Versioning ---
+
+    def version(self) -> int:
+        """Store version: bumped by every email/expense write, from any process sharing the store."""
+        return self._changelog.version()
+
+    def changes_since(
+        self, version: int, collection: str | None = None, limit: int | None = None
+    ) -> list[Change] | None:
+        """Email/expense writes after `version`, oldest first; None if the log no longer reaches back that far."""
+        return self._changelog.since(version, collection=collection, limit=limit)
+
+    def _record(
+        self, collection: str, op: str, ids: list[str], metadatas: list[dict] | None = None, upsert: bool = False
+    ) -> int:
+        fields = {key for meta in metadatas or [] for key in meta}
+        if upsert:
+            fields |= {"document", "embedding"}
+        version = self._changelog.record(collection, op, ids, sorted(fields))
+        if collection == "emails":
+            self._own_versions.add(version)
+        return version
+
+    def _catch_up(self, index: VersionedSidecar, include: str, field: str | None = None):
+        """Re-read the rows other processes' writes since `index.version` touched into `index`."""
+        changes = self._changelog.since(index.version, collection="emails")
+        if changes and any(c.op == "swap" and c.version not in self._own_versions for c in changes):
+            self._emails.reopen()
+        if changes is None:
+            index.rebuild(self._pages(include), self.version())
+        elif changes:
+            ids = list(dict.fromkeys(
+                gid
+                for change in changes
+                if change.version not in self._own_versions
+                and (field is None or change.op == "delete" or field in change.fields)
+                for gid in change.ids
+            ))
+            present: set[str] = set()
+            for i in range(0, len(ids), 5000):
+                for page in _get_by_ids(self._emails, ids[i : i + 5000], [include]):
+                    index.replace(page["ids"], page[include])
+                    present.update(page["ids"])
+            index.delete([gid for gid in ids if gid not in present])
+            index.advance(changes[-1].version)
+        # Own versions are only needed until every loaded index has moved past them
+        floor = min(i.version for i in (self._columns, self._mirror, self._vectors, index) if i is not None)
+        self._own_versions = {v for v in self._own_versions if v > floor}
+
+    def _pages(self, include: str) -> Iterator[tuple[list[str], list]]:
+        for page in self.iter_emails(include=[include], page_size=5000):
+            yield page["ids"], page[include]
+
+    # --- Columnar metadata ---
+
+    def metadata_columns(self, account_id: str | None = None) -> ColumnView:
+        """Hot metadata fields as NumPy columns, for vectorized analytics scans."""
+        columns = self._load_columns()
+        with self._columns_lock:
+            self._catch_up(columns, "metadatas")
+        return columns.view(account_id)
+
+    def close(self):
+        self._closed.set()
+        self._writer.close()
+        if self._columns is not None:
+            self._columns.flush()
+        if self._mirror is not None:
+            self._mirror.flush()
+        if self._vectors is not None:
+            self._vectors.flush()
+        if self._fulltext is not None:
+            self._fulltext.close()
+        if self._bodies is not None:
+            self._bodies.close()
+        if self._postings is not None:
+            self._postings.close()
+        self._changelog.close()
+
+    def _load_columns(self) -> MetadataColumns:
+        with self._columns_lock:
+            if self._columns is None:
+                self._columns = self._open_sidecar(MetadataColumns(self._persist_dir), "metadatas")
+            return self._columns
+
+    def _open_sidecar(self, sidecar: VersionedSidecar, include: str, field: str | None = None) -> VersionedSidecar:
+        """Load `sidecar` (or rebuild it from Chroma's `include` field) and catch it up on the change log."""
+        if not sidecar.load():
+            sidecar.rebuild(self._pages(include), self.version())
+        self._catch_up(sidecar, include, field=field)
+        if len(sidecar) != self._emails.count():
+            logger.info("[EmailStore] %s out of step with Chroma — rebuilding", type(sidecar).__name__)
+            sidecar.rebuild(self._pages(include), self.version())
+        return sidecar
+
+    # --- Metadata mirror ---
+
+    def metadata_mirror(self) -> MirrorView:
+        """Every email's metadata, read from memory without touching Chroma or SQLite."""
+        return self._load_mirror().view()
+
+    def refresh_mirror(self) -> MirrorView:
+        mirror = self._load_mirror()
+        with self._mirror_lock:
+            self._catch_up(mirror, "metadatas")
+        return mirror.view()
+
+    def _load_mirror(self) -> MetadataMirror:
+        with self._mirror_lock:
+            if self._mirror is None:
+                self._mirror = self._open_sidecar(MetadataMirror(self._persist_dir), "metadatas")
+                threading.Thread(target=self._refresh_mirror_loop, name="mirror-refresh", daemon=True).start()
+            return self._mirror
+
+    def _refresh_mirror_loop(self):
+        while not self._closed.wait(settings.mirror_refresh_secs):
+            try:
+                with self._mirror_lock:
+                    self._catch_up(self._mirror, "metadatas")
+            except Exception as e:
+                logger.warning("[EmailStore] metadata mirror refresh failed: %s", e)
+
+    # --- Vector sidecar ---
+
+    def _query_vectors(self, embedding: list[float], n_results: int) -> dict:
+        """Nearest emails from the vector sidecar, rescored on exact vectors when it is quantized."""
+        index = self._load_vectors()
+        with self._vectors_lock:
+            self._catch_up(index, "embeddings", field="embedding")
+        include = ["metadatas"]
+        if index.dtype == "float32":
+            hits = index.search(embedding, n_results)
+        else:
+            hits = index.search(embedding, n_results * settings.vector_rescore_factor)
+            include.append("embeddings")
+        rows: dict[str, tuple] = {}
+        for page in _get_by_ids(self._emails, [gid for gid, _ in hits], include):
+            vectors = page["embeddings"] if "embeddings" in include else [None] * len(page["ids"])
+            rows.update(zip(page["ids"], zip(page["metadatas"], vectors)))
+        if "embeddings" in include and rows:
+            exact = normalize([vector for _, vector in rows.values()]) @ normalize(embedding)[0]
+            hits = sorted(zip(rows, exact.tolist()), key=lambda hit: -hit[1])
+        result = {"ids": [], "metadatas": [], "distances": []}
+        for gid, score in hits[:n_results]:
+            if gid in rows:
+                result["ids"].append(gid)
+                result["metadatas"].append(rows[gid][0])
+                result["distances"].append(1 - score)
+        return {key: [values] for key, values in result.items()}
+
+    def _load_vectors(self) -> VectorIndex:
+        with self._vectors_lock:
+            if self._vectors is None:
+                index = VectorIndex(self._persist_dir, _SIDECAR_DTYPES[self._vector_index])
+                self._vectors = self._open_sidecar(index, "embeddings", field="embedding")
+            return self._vectors
+
+    # --- Full-text index ---
+
+    def search_text(self, query: str, limit: int = 20) -> list[tuple[str, float]]:
+        """BM25-ranked (gmail_id, score) matches for a keyword query over subject and body."""
+        return self._load_fulltext().search(query, limit)
+
+    def _load_fulltext(self) -> FullTextIndex:
+        with self._fulltext_lock:
+            if self._fulltext is None:
+                index = FullTextIndex(self._persist_dir)
+                if index.count() != self._emails.count():
+                    index.reconcile(list(self.iter_ids()), self._subjects_and_bodies)
+                self._fulltext = index
+            return self._fulltext
+
+    def _subjects_and_bodies(self, ids: list[str]) -> tuple[list[str], list[str]]:
+        result = self._get_emails(ids=ids, include=["documents", "metadatas"])
+        by_id = {
+            gid: ((meta or {}).get("subject", ""), doc or "")
+            for gid, doc, meta in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+        pairs = [by_id.get(gid, ("", "")) for gid in ids]
+        return [p[0] for p in pairs], [p[1] for p in pairs]
+
+    # --- Bodies ---
+
+    def get_bodies(self, ids: list[str]) -> dict[str, str]:
+        """Bodies by gmail_id, for readers that render them; ids not in the store are omitted."""
+        return self._load_bodies().get(ids)
+
+    def body_stats(self) -> dict:
+        return self._load_bodies().stats()
+
+    def _get_emails(self, include: list[str], **kwargs) -> dict:
+        """Chroma get() on the emails collection, with "documents" read from the body store."""
+        result = self._emails.get(include=[key for key in include if key != "documents"], **kwargs)
+        if "documents" in include:
+            bodies = self._load_bodies().get(result["ids"])
+            result["documents"] = [bodies.get(gid, "") for gid in result["ids"]]
+        return result
+
+    def _load_bodies(self) -> BodyStore:
+        with self._bodies_lock:
+            if self._bodies is None:
+                bodies = BodyStore(self._persist_dir)
+                if bodies.count() != self._emails.count():
+                    moved = bodies.reconcile(list(self.iter_ids()), self._chroma_documents)
+                    # Not waited on: the writer thread may itself be waiting for this lock
+                    self._writer.call(lambda: self._clear_documents(moved))
+                self._bodies = bodies
+            return self._bodies
+
+    def _chroma_documents(self, ids: list[str]) -> list[str]:
+        result = self._emails.get(ids=ids, include=["documents"])
+        by_id = dict(zip(result["ids"], result["documents"]))
+        return [by_id.get(gid) or "" for gid in ids]
+
+    def _clear_documents(self, ids: list[str], batch_size: int = 500):
+        """Blank the Chroma documents of emails whose bodies were copied to the body store."""
+        # Chroma re-embeds documents updated without embeddings, so the stored ones are written back
+        for i in range(0, len(ids), batch_size):
+            for page in _get_by_ids(self._emails, ids[i : i + batch_size], ["embeddings"]):
+                if page["ids"]:
+                    self._emails.update(
+                        ids=page["ids"], embeddings=page["embeddings"], documents=[""] * len(page["ids"])
+                    )
+        if ids:
+            logger.info("[EmailStore] moved %d email bodies out of Chroma", len(ids))
+
+    # --- Label and sender posting lists ---
+
+    def lookup_ids(
+        self, label: str | None = None, sender: str | None = None, limit: int | None = None
+    ) -> list[str]:
+        """Ids with `label` and from senders matching `sender`, newest first (see PostingIndex.lookup)."""
+        return self._load_postings().lookup(label=label, sender=sender, limit=limit)
+
+    def _load_postings(self) -> PostingIndex:
+        with self._postings_lock:
+            if self._postings is None:
+                index = PostingIndex(self._persist_dir)
+                if index.count() != self._emails.count():
+                    index.reconcile(self._pages("metadatas"))
+                self._postings = index
+            return self._postings
 
     # --- Expenses ---
 
@@ -136,7 +760,11 @@ class EmailStore:
         documents: list[str],
         embeddings: list[list[float]],
         metadatas: list[dict],
-    ):
+        wait: bool = True,
+    ) -> Future:
+        return self._write(writer.UPSERT_EXPENSES, ids, documents, embeddings, metadatas, wait=wait)
+
+    def _upsert_expenses(self, ids: list[str], documents: list[str], embeddings, metadatas: list[dict]):
         batch_size = 500
         for i in range(0, len(ids), batch_size):
             self._expenses.upsert(
@@ -145,6 +773,7 @@ class EmailStore:
                 embeddings=embeddings[i : i + batch_size],
                 metadatas=metadatas[i : i + batch_size],
             )
+        self._record("expenses", "upsert", ids, metadatas, upsert=True)
 
     def get_expenses(
         self,
@@ -167,32 +796,284 @@ class EmailStore:
             include=include or ["metadatas"], limit=self._expenses.count()
         )
 
-    def delete_expenses(self, ids: list[str]):
+    def delete_expenses(self, ids: list[str], wait: bool = True) -> Future:
+        return self._write(writer.DELETE_EXPENSES, ids, wait=wait)
+
+    def _delete_expenses(self, ids: list[str]):
         self._expenses.delete(ids=ids)
+        self._record("expenses", "delete", ids)
 
-    # --- Labels ---
+    # --- Snapshots ---
+
+    def export_snapshot(self, path: str | Path) -> dict:
+        """Write the whole store to a new snapshot directory at `path` and return its manifest."""
+        # Email documents come from the body store
+        collections = {"emails": SimpleNamespace(get=self._get_emails), "expenses": self._expenses}
+        version = self.version()
+        rows = {name: CollectionRows(c.get(include=[])["ids"]) for name, c in collections.items()}
+        for name, collection in collections.items():
+            self._read_snapshot_rows(collection, rows[name], rows[name].ids)
 
-    def upsert_label(self, gmail_id: str, metadata: dict):
-        self._labels.upsert(
-            ids=[gmail_id], documents=[metadata.get("name", "")], metadatas=[metadata]
+        for _ in range(_CATCH_UP_ROUNDS):
+            changes = self.changes_since(version)
+            if changes is None:
+                raise StoreError("Change log was compacted during the snapshot; retry the export")
+            if not changes:
+                break
+            version = changes[-1].version
+            for name, collection in collections.items():
+                touched = list(dict.fromkeys(gid for c in changes if c.collection == name for gid in c.ids))
+                self._read_snapshot_rows(collection, rows[name], touched)
+        else:
+            logger.warning("[EmailStore] store kept changing during the snapshot; writing it at version %d", version)
+
+        state = {}
+        for name, collection in (("labels", self._labels), ("sync_state", self._sync_state)):
+            result = collection.get(include=["documents", "metadatas"])
+            state[name] = {key: result[key] for key in ("ids", "documents", "metadatas")}
+        manifest = write_snapshot(path, version, rows, state)
+        logger.info(
+            "[EmailStore] exported snapshot to %s at version %d (%d emails, %d expenses)",
+            path, version, manifest["collections"]["emails"]["count"], manifest["collections"]["expenses"]["count"],
         )
+        return manifest
+
+    def import_snapshot(self, path: str | Path, batch_size: int = 5000) -> dict:
+        """Replace the store's contents with a snapshot written by `export_snapshot`."""
+        # Pause ingestion first: writes made while the import runs may be overwritten
+        manifest = read_manifest(path)
+        writers = {
+            "emails": (self._emails, self.upsert_emails_batch, self.delete_emails),
+            "expenses": (self._expenses, self.upsert_expenses_batch, self.delete_expenses),
+        }
+        for name, (collection, upsert, delete) in writers.items():
+            snapshot = read_collection(path, name)
+            stale = list(set(collection.get(include=[])["ids"]) - set(snapshot["ids"]))
+            for i in range(0, len(stale), batch_size):
+                delete(stale[i : i + batch_size])
+            for i in range(0, len(snapshot["ids"]), batch_size):
+                ids = snapshot["ids"][i : i + batch_size]
+                metadatas = snapshot["metadatas"][i : i + batch_size]
+                saved = dict(zip(ids, metadatas))
+                current = collection.get(ids=ids, include=["metadatas"])
+                extra = [
+                    gid for gid, meta in zip(current["ids"], current["metadatas"])
+                    if set(meta or {}) - set(saved[gid] or {})
+                ]
+                if extra:
+                    delete(extra)
+                upsert(
+                    ids,
+                    snapshot["documents"][i : i + batch_size],
+                    np.asarray(snapshot["embeddings"][i : i + batch_size]),
+                    metadatas,
+                )
+
+        def replace_state():
+            for name, collection in (("labels", self._labels), ("sync_state", self._sync_state)):
+                saved = manifest["state"][name]
+                stale = list(set(collection.get(include=[])["ids"]) - set(saved["ids"]))
+                if stale:
+                    collection.delete(ids=stale)
+                if saved["ids"]:
+                    collection.upsert(
+                        ids=saved["ids"],
+                        documents=saved["documents"],
+                        embeddings=[_PLACEHOLDER_EMBEDDING] * len(saved["ids"]),
+                        metadatas=saved["metadatas"],
+                    )
+
+        self._call(replace_state)
+        logger.info("[EmailStore] imported snapshot from %s (version %d)", path, manifest["version"])
+        return manifest
+
+    @staticmethod
+    def _read_snapshot_rows(collection, rows: CollectionRows, ids: list[str], page_size: int = 5000):
+        for i in range(0, len(ids), page_size):
+            chunk = ids[i : i + page_size]
+            for page in _get_by_ids(collection, chunk, ["documents", "metadatas", "embeddings"]):
+                rows.put(page)
+                rows.drop(set(page["requested"]) - set(page["ids"]))
 
-    def get_labels(self) -> list[dict]:
+    # --- Labels ---
+
+    # Label ids are only unique within a mailbox, so non-default accounts store
+    # theirs as "<account_id>:<label_id>". Default-account ids stay unprefixed.
+
+    def upsert_label(self, gmail_id: str, metadata: dict, account_id: str | None = None):
+        account_id = account_id or DEFAULT_ACCOUNT
+        key = gmail_id if account_id == DEFAULT_ACCOUNT else f"{account_id}:{gmail_id}"
+        self._call(lambda: self._labels.upsert(
+            ids=[key],
+            documents=[metadata.get("name", "")],
+            embeddings=[_PLACEHOLDER_EMBEDDING],
+            metadatas=[{**metadata, "account_id": account_id}],
+        ))
+
+    def get_labels(self, account_id: str | None = None) -> list[dict]:
         result = self._labels.get(include=["metadatas"])
-        return [
-            {"gmail_id": id_, **meta}
-            for id_, meta in zip(result["ids"], result["metadatas"])
-        ]
+        labels = []
+        for id_, meta in zip(result["ids"], result["metadatas"]):
+            owner = meta.get("account_id", DEFAULT_ACCOUNT)
+            if account_id and owner != account_id:
+                continue
+            gmail_id = id_ if owner == DEFAULT_ACCOUNT else id_.split(":", 1)[-1]
+            labels.append({**meta, "gmail_id": gmail_id})
+        return labels
 
     # --- Sync State ---
 
-    def get_sync_state(self) -> dict | None:
-        result = self._sync_state.get(ids=["state"], include=["metadatas"])
+    @staticmethod
+    def _sync_state_id(account_id: str | None, kind: str = "state") -> str:
+        if not account_id or account_id == DEFAULT_ACCOUNT:
+            return kind
+        return f"{kind}:{account_id}"
+
+    def get_sync_state(self, account_id: str | None = None) -> dict | None:
+        result = self._sync_state.get(
+            ids=[self._sync_state_id(account_id)], include=["metadatas"]
+        )
         if not result["ids"]:
             return None
         return result["metadatas"][0]
 
-    def update_sync_state(self, metadata: dict):
-        self._sync_state.upsert(
-            ids=["state"], documents=["sync_state"], metadatas=[metadata]
+    def update_sync_state(self, metadata: dict, account_id: str | None = None):
+        self._call(lambda: self._sync_state.upsert(
+            ids=[self._sync_state_id(account_id)],
+            documents=["sync_state"],
+            embeddings=[_PLACEHOLDER_EMBEDDING],
+            metadatas=[metadata],
+        ))
+
+    def get_backfill_state(self, account_id: str | None = None) -> dict | None:
+        result = self._sync_state.get(
+            ids=[self._sync_state_id(account_id, "backfill")], include=["metadatas"]
         )
+        if not result["ids"]:
+            return None
+        return result["metadatas"][0]
+
+    def update_backfill_state(self, metadata: dict, account_id: str | None = None):
+        self._call(lambda: self._sync_state.upsert(
+            ids=[self._sync_state_id(account_id, "backfill")],
+            documents=["backfill_state"],
+            embeddings=[_PLACEHOLDER_EMBEDDING],
+            metadatas=[metadata],
+        ))
+
+    def delete_backfill_state(self, account_id: str | None = None):
+        self._call(lambda: self._sync_state.delete(ids=[self._sync_state_id(account_id, "backfill")]))
+
+    # --- Migrations ---
+
+    def migrate_account_ids(self, batch_size: int = 5000) -> int:
+        """Stamp account_id=DEFAULT_ACCOUNT on emails stored without one; returns how many."""
+        marker = self._sync_state.get(ids=[_MIGRATIONS_ID], include=["metadatas"])
+        if marker["ids"] and marker["metadatas"][0].get("account_ids"):
+            return 0
+        ids = [gid for gid, meta in self.refresh_mirror().items() if "account_id" not in meta]
+        for i in range(0, len(ids), batch_size):
+            chunk = ids[i : i + batch_size]
+            self.update_metadatas_batch(chunk, [{"account_id": DEFAULT_ACCOUNT}] * len(chunk))
+        self._call(lambda: self._sync_state.upsert(
+            ids=[_MIGRATIONS_ID],
+            documents=["migrations"],
+            embeddings=[_PLACEHOLDER_EMBEDDING],
+            metadatas=[{**(marker["metadatas"][0] if marker["ids"] else {}), "account_ids": True}],
+        ))
+        if ids:
+            logger.info("[EmailStore] stamped account_id=%s on %d emails", DEFAULT_ACCOUNT, len(ids))
+        return len(ids)
+
+
+class _EmailsCollection:
+    """The emails collection, looked up again by name when a rebuild has replaced it."""
+
+    def __init__(self, client):
+        self._client = client
+        self.collection = client.get_or_create_collection("emails", metadata=hnsw_metadata())
+
+    def reopen(self):
+        self.collection = self._client.get_collection("emails")
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            try:
+                return getattr(self.collection, name)(*args, **kwargs)
+            except InvalidCollectionException:
+                self.reopen()
+                return getattr(self.collection, name)(*args, **kwargs)
+
+        return call
+
+
+def _get_by_ids(collection, ids: list[str], include: list[str]) -> Iterator[dict]:
+    """get() pages for `ids`, halving the request when a concurrent delete makes get() fail."""
+    if not ids:
+        return
+    try:
+        page = collection.get(ids=ids, include=include)
+    except IndexError:
+        if len(ids) == 1:
+            raise
+        middle = len(ids) // 2
+        yield from _get_by_ids(collection, ids[:middle], include)
+        yield from _get_by_ids(collection, ids[middle:], include)
+        return
+    yield {**page, "requested": ids}
+
+
+def _document_matches(where_document: dict, document: str) -> bool:
+    """Chroma's where_document operators ($contains, $not_contains, $and, $or) tested on a body."""
+    ((op, value),) = where_document.items()
+    if op == "$contains":
+        return value in document
+    if op == "$not_contains":
+        return value not in document
+    if op == "$and":
+        return all(_document_matches(clause, document) for clause in value)
+    if op == "$or":
+        return any(_document_matches(clause, document) for clause in value)
+    raise StoreError(f"Unsupported where_document operator {op!r}")
+
+
+def hnsw_metadata(m: int | None = None, construction_ef: int | None = None, search_ef: int | None = None) -> dict:
+    """Chroma collection metadata for the emails HNSW graph; unset values come from settings."""
+    return {
+        "hnsw:space": "cosine",
+        "hnsw:M": m or settings.hnsw_m,
+        "hnsw:construction_ef": construction_ef or settings.hnsw_construction_ef,
+        "hnsw:search_ef": search_ef or settings.hnsw_search_ef,
+    }
+
+
+# --- Shared stores ---
+
+_stores: dict[str, EmailStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(persist_dir: str | None = None) -> EmailStore:
+    """Process-wide EmailStore for a persist dir, created (and its account ids migrated) on first use."""
+    key = str(Path(persist_dir or settings.chroma_persist_dir).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = EmailStore(key)
+            store.migrate_account_ids()
+        return store
+
+
+def close_stores():
+    """Drop the shared stores and release Chroma's cached clients (app shutdown)."""
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+    if stores:
+        stores[0]._client.clear_system_cache()
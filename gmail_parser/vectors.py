@@ -0,0 +1,204 @@
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from gmail_parser.sidecar import VersionedSidecar, save_npz
+
+# Storage types for VectorIndex rows. Quantized rows only rank candidates;
+# float32 rows give exact scores.
+DTYPES = ("float32", "float16", "int8")
+QUANTIZED = ("float16", "int8")
+
+_STALE_MATRIX_SECS = 300
+
+# Rows decoded to float32 at a time while scanning; small enough to stay in cache
+_SCAN_BLOCK = 2048
+
+
+def normalize(vectors) -> np.ndarray:
+    """Rows scaled to unit length (zero rows stay zero), as float32."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class VectorIndex(VersionedSidecar):
+    """Email embeddings as a memory-mapped matrix of unit rows, searched by brute force."""
+
+    def __init__(self, persist_dir: str | Path, dtype: str):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported vector storage type {dtype!r}")
+        self.dtype = dtype
+        self._dir = Path(persist_dir)
+        super().__init__(self._dir / f"vectors.{dtype}.npz")
+        self._clear(0, 0)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def stats(self) -> dict:
+        """Allocated rows, live rows, and the share of rows below the scan watermark that are deleted."""
+        with self._lock:
+            live, used = len(self._index), self._used
+            return {
+                "dtype": self.dtype,
+                "capacity": len(self._ids),
+                "live": live,
+                "fragmentation": 1 - live / used if used else 0.0,
+            }
+
+    # --- Mutations ---
+
+    def upsert(self, ids: list[str], embeddings):
+        if not ids:
+            return
+        vectors = normalize(embeddings)
+        with self._lock:
+            if not self._dim:
+                self._clear(0, vectors.shape[1])
+            rows = [self._row_for(gid) for gid in ids]
+            codes, scales = self._encode(vectors)
+            self._codes[rows] = codes
+            self._scales[rows] = scales
+            self._alive[rows] = True
+            self._mark_dirty()
+
+    def replace(self, ids: list[str], embeddings):
+        """Same as `upsert`: a row always holds the whole vector."""
+        self.upsert(ids, embeddings)
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            for gid in ids:
+                row = self._index.pop(gid, None)
+                if row is not None:
+                    self._ids[row] = ""
+                    self._alive[row] = False
+                    self._free.append(row)
+            self._mark_dirty()
+
+    # --- Search ---
+
+    def search(self, embedding, k: int) -> list[tuple[str, float]]:
+        """Top-k (gmail_id, cosine similarity), most similar first; approximate when quantized."""
+        query = normalize(embedding)[0]
+        with self._lock:
+            n = self._used
+            if not self._index or k <= 0:
+                return []
+            if self.dtype == "float32":
+                scores = np.asarray(self._codes[:n] @ query)
+            else:
+                scores = self._decode_scores(query, n)
+            scores[~self._alive[:n]] = -np.inf
+            k = min(k, len(self._index))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._ids[i], float(scores[i])) for i in top]
+
+    def _decode_scores(self, query: np.ndarray, n: int) -> np.ndarray:
+        scores = np.empty(n, dtype=np.float32)
+        buffer = np.empty((min(_SCAN_BLOCK, n), self._dim), dtype=np.float32)
+        for start in range(0, n, _SCAN_BLOCK):
+            codes = self._codes[start : min(start + _SCAN_BLOCK, n)]
+            decoded = buffer[: len(codes)]
+            np.copyto(decoded, codes, casting="unsafe")
+            np.matmul(decoded, query, out=scores[start : start + len(codes)])
+        return scores * self._scales[:n]
+
+    # --- Persistence ---
+
+    def _save(self):
+        """Write the matrix to a new file, then swap the metadata that names it into place."""
+        self._dir.mkdir(parents=True, exist_ok=True)
+        matrix_name = f"vectors.{self.dtype}.{uuid.uuid4().hex[:12]}.npy"
+        np.save(self._dir / matrix_name, self._codes)
+        save_npz(
+            self._path,
+            matrix=np.array(matrix_name),
+            ids=np.array(self._ids, dtype=str),
+            scales=self._scales,
+            alive=self._alive,
+            version=np.int64(self.version),
+        )
+        if self._matrix_name:
+            (self._dir / self._matrix_name).unlink(missing_ok=True)
+        self._remove_stale_matrices(keep=matrix_name)
+        self._matrix_name = matrix_name
+        # Remap so the private copies of updated pages are released
+        self._codes = np.load(self._dir / matrix_name, mmap_mode="c")
+
+    def _read(self):
+        with np.load(self._path) as meta:
+            matrix_name = str(meta["matrix"])
+            ids = meta["ids"].tolist()
+            scales = meta["scales"].copy()
+            alive = meta["alive"].copy()
+            version = int(meta["version"])
+        codes = np.load(self._dir / matrix_name, mmap_mode="c")
+        if codes.shape[0] != len(ids) or codes.dtype != np.dtype(self.dtype):
+            raise ValueError(f"matrix {codes.shape} {codes.dtype} does not match {len(ids)} ids")
+        self._codes, self._scales, self._alive, self._ids = codes, scales, alive, ids
+        self._dim = codes.shape[1]
+        self._index = {gid: i for i, gid in enumerate(ids) if alive[i]}
+        self._used = int(np.flatnonzero(alive)[-1]) + 1 if alive.any() else 0
+        self._free = [i for i in range(len(ids) - 1, -1, -1) if not alive[i]]
+        self._matrix_name = matrix_name
+        self.version = version
+
+    def _remove_stale_matrices(self, keep: str):
+        # Matrices left behind by other processes' saves. One may have just been written and
+        # be about to be named by the metadata, so only files untouched for a while go
+        cutoff = time.time() - _STALE_MATRIX_SECS
+        for path in self._dir.glob(f"vectors.{self.dtype}.*.npy"):
+            if path.name != keep and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+
+    # --- Internals ---
+
+    def _reset(self):
+        self._clear(0, 0)
+
+    def _clear(self, capacity: int, dim: int):
+        self._dim = dim
+        self._codes = np.zeros((capacity, dim), dtype=self.dtype)
+        self._scales = np.ones(capacity, dtype=np.float32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._ids: list[str] = [""] * capacity
+        self._index: dict[str, int] = {}
+        # Free rows are popped lowest first, so rows in use stay below the `_used` watermark
+        self._free: list[int] = list(range(capacity - 1, -1, -1))
+        self._used = 0
+        self._matrix_name = getattr(self, "_matrix_name", "")
+
+    def _row_for(self, gid: str) -> int:
+        row = self._index.get(gid)
+        if row is not None:
+            return row
+        if not self._free:
+            self._grow()
+        row = self._index[gid] = self._free.pop()
+        self._used = max(self._used, row + 1)
+        self._ids[row] = gid
+        return row
+
+    def _grow(self):
+        n = len(self._ids)
+        capacity = max(1024, n * 2)
+        codes = np.zeros((capacity, self._dim), dtype=self.dtype)
+        codes[:n] = self._codes
+        self._codes = codes
+        self._scales = np.concatenate([self._scales, np.ones(capacity - n, dtype=np.float32)])
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - n, dtype=bool)])
+        self._ids += [""] * (capacity - n)
+        self._free = list(range(capacity - 1, n - 1, -1))
+
+    def _encode(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self.dtype != "int8":
+            return vectors.astype(self.dtype), np.ones(len(vectors), dtype=np.float32)
+        # Symmetric per-row scale: the largest component maps to ±127
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
@@ -0,0 +1,163 @@
+import logging
+import queue
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Write kinds that can be merged with a neighbouring write of the same kind
+UPSERT_EMAILS = "upsert_emails"
+UPDATE_EMAILS = "update_emails"
+DELETE_EMAILS = "delete_emails"
+UPSERT_EXPENSES = "upsert_expenses"
+DELETE_EXPENSES = "delete_expenses"
+# Anything else (labels, sync state, collection swaps) runs alone, in order
+CALL = "call"
+
+
+@dataclass
+class _Write:
+    kind: str
+    args: tuple
+    future: Future
+
+    def __len__(self) -> int:
+        return 1 if self.kind == CALL else len(self.args[0])
+
+
+def _merge_upserts(writes: list[_Write]) -> tuple:
+    """One upsert for a run of upserts.
+
+    The last write of an id gives its document and embedding; metadata keys
+    are merged, later over earlier, as Chroma merges sequential upserts.
+    """
+    rows: dict[str, tuple] = {}
+    for w in writes:
+        ids, documents, embeddings, metadatas = w.args
+        for i, gid in enumerate(ids):
+            earlier = rows[gid][2] if gid in rows else {}
+            rows[gid] = (documents[i], embeddings[i], {**earlier, **(metadatas[i] or {})})
+    ids = list(rows)
+    return (
+        ids,
+        [rows[gid][0] for gid in ids],
+        np.asarray([rows[gid][1] for gid in ids], dtype=np.float32),
+        [rows[gid][2] for gid in ids],
+    )
+
+
+def _merge_updates(writes: list[_Write]) -> tuple:
+    """One metadata update for a run of updates; later keys override earlier ones per id."""
+    merged: dict[str, dict] = {}
+    for w in writes:
+        for gid, meta in zip(*w.args):
+            merged[gid] = {**merged.get(gid, {}), **meta}
+    return list(merged), list(merged.values())
+
+
+def _merge_deletes(writes: list[_Write]) -> tuple:
+    return (list(dict.fromkeys(gid for w in writes for gid in w.args[0])),)
+
+
+_MERGERS = {
+    UPSERT_EMAILS: _merge_upserts,
+    UPDATE_EMAILS: _merge_updates,
+    DELETE_EMAILS: _merge_deletes,
+    UPSERT_EXPENSES: _merge_upserts,
+    DELETE_EXPENSES: _merge_deletes,
+}
+
+
+class StoreWriter:
+    """The one thread that applies an EmailStore's mutations.
+
+    Callers `submit()` a write and get a Future. The thread takes writes in
+    submission order; a run of queued writes of the same kind (say, many
+    one-email metadata updates from different request threads) is merged
+    into a single batch, applied by `apply(kind, args)` in one Chroma call,
+    and all of their futures resolve with its outcome. Writes of different
+    kinds are never reordered.
+    """
+
+    def __init__(self, apply: Callable[[str, tuple], None], max_batch: int = 2000):
+        self._apply = apply
+        self._max_batch = max_batch
+        self._queue: queue.SimpleQueue[_Write | None] = queue.SimpleQueue()
+        # A write taken from the queue that must start the next batch
+        self._carry: list[_Write | None] = []
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self.writes = 0
+        self.batches = 0
+
+    def submit(self, kind: str, *args) -> Future:
+        future: Future = Future()
+        if threading.current_thread() is self._thread:
+            # A write issued while applying one (e.g. from a CALL) would wait on itself
+            self._run_batch(kind, [_Write(kind, args, future)])
+            return future
+        self._ensure_started()
+        self._queue.put(_Write(kind, args, future))
+        return future
+
+    def call(self, fn: Callable[[], object]) -> Future:
+        """Run `fn` on the writer thread, after every write submitted before it."""
+        return self.submit(CALL, fn)
+
+    def stats(self) -> dict:
+        return {"writes": self.writes, "batches": self.batches, "queued": self._queue.qsize()}
+
+    def close(self, timeout: float | None = 30):
+        """Apply what is queued, then stop the thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="store-writer", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            first = self._carry.pop() if self._carry else self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            size = len(first)
+            while first.kind != CALL and size < self._max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None or nxt.kind != first.kind:
+                    self._carry.append(nxt)
+                    break
+                batch.append(nxt)
+                size += len(nxt)
+            self._run_batch(first.kind, batch)
+
+    def _run_batch(self, kind: str, batch: list[_Write]):
+        try:
+            if kind == CALL:
+                result = batch[0].args[0]()
+            else:
+                result = self._apply(kind, batch[0].args if len(batch) == 1 else _MERGERS[kind](batch))
+        except BaseException as e:
+            if len(batch) > 1:
+                # One bad write must not fail the others merged with it
+                for w in batch:
+                    self._run_batch(kind, [w])
+                return
+            logger.warning("[StoreWriter] %s failed: %s", kind, e)
+            batch[0].future.set_exception(e)
+        else:
+            for w in batch:
+                w.future.set_result(result)
+        self.writes += len(batch)
+        self.batches += 1
@@ -1,5 +1,28 @@
 import pytest
 
+from gmail_parser.config import settings
+
+
+@pytest.fixture(autouse=True)
+def _isolated_persist_dir(tmp_path, monkeypatch):
+    """Keep stores, sidecars and the dashboard session secret out of the repo's ./email_data."""
+    monkeypatch.setattr(settings, "chroma_persist_dir", str(tmp_path / "email_data"))
+
+
+class FakeEmbedding:
+    """Stands in for EmbeddingModel: the same vector for every text."""
+
+    def encode(self, text):
+        return [0.1] * 384
+
+    def encode_batch(self, texts, batch_size=64):
+        return [[0.1] * 384 for _ in texts]
+
+
+@pytest.fixture
+def fake_embedding():
+    return FakeEmbedding()
+
 
 @pytest.fixture
 def sample_raw_message():
@@ -0,0 +1,64 @@
+import pytest
+
+from api.routers import actions
+from gmail_parser.store import EmailStore
+
+
+class RecordingClient:
+    """Stands in for one account's GmailClient, recording what it was asked to do."""
+
+    calls: list = []
+
+    def __init__(self, auth):
+        self.account_id = auth
+
+    def trash_message(self, gmail_id):
+        self.calls.append((self.account_id, "trash", gmail_id))
+
+    def list_labels(self):
+        return [{"id": f"{self.account_id}-news", "name": "News"}]
+
+    def modify_message(self, gmail_id, add_labels=None, remove_labels=None):
+        self.calls.append((self.account_id, "modify", gmail_id, add_labels, remove_labels))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = EmailStore(persist_dir=str(tmp_path / "test_data"))
+    store.upsert_emails_batch(
+        ["a", "b", "c"],
+        ["x", "y", "z"],
+        [[0.1] * 384] * 3,
+        [{"account_id": "default"}, {"account_id": "work"}, {"subject": "stored before accounts"}],
+    )
+    monkeypatch.setattr(actions, "get_store", lambda: store)
+    monkeypatch.setattr(actions, "GmailAuth", lambda account_id: account_id)
+    monkeypatch.setattr(actions, "GmailClient", RecordingClient)
+    monkeypatch.setattr(RecordingClient, "calls", [])
+    yield store
+    store.close()
+
+
+def test_actions_use_each_emails_own_account(store):
+    actions.trash_emails(actions.IdsRequest(ids=["a", "b", "c"], confirm=True))
+    assert sorted(RecordingClient.calls) == [
+        ("default", "trash", "a"), ("default", "trash", "c"), ("work", "trash", "b")
+    ]
+
+
+def test_label_ids_are_looked_up_per_account(store):
+    result = actions.apply_label(actions.LabelRequest(ids=["a", "b"], label_name="News", confirm=True))
+    assert result["label_ids"] == {"default": "default-news", "work": "work-news"}
+    assert ("work", "modify", "b", ["work-news"], None) in RecordingClient.calls
+
+
+def test_changes_are_written_to_the_store(store):
+    store.update_metadatas_batch(["a"], [{"labels": "|INBOX|UNREAD|", "is_read": False}])
+
+    actions.mark_read(actions.IdsRequest(ids=["a", "missing"], confirm=True))
+    assert store.get_metadatas(["a"])["a"]["labels"] == "|INBOX|"
+    assert store.metadata_mirror()["a"]["is_read"] is True
+
+    actions.apply_label(actions.LabelRequest(ids=["a", "b"], label_name="News", confirm=True))
+    assert store.get_metadatas(["a"])["a"]["labels"] == "|INBOX|News|"
+    assert store.get_metadatas(["b"])["b"]["labels"] == "|News|"
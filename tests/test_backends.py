@@ -0,0 +1,74 @@
+import pytest
+
+from gmail_parser.backends import MemoryClient, compile_where, open_client
+
+
+@pytest.fixture(params=["chroma", "memory"])
+def collection(request, tmp_path):
+    client = open_client(request.param, str(tmp_path / request.param))
+    collection = client.get_or_create_collection("things", metadata={"hnsw:space": "cosine"})
+    collection.upsert(
+        ids=["a", "b", "c", "d"],
+        embeddings=[[1, 0], [0, 1], [1, 1], [-1, 0]],
+        documents=["da", "db", "dc", "dd"],
+        metadatas=[{"x": 1, "s": "one"}, {"x": 2.5, "flag": True}, {"x": "str"}, {"s": "two", "flag": False}],
+    )
+    return collection
+
+
+@pytest.mark.parametrize(
+    "where, expected",
+    [
+        ({"x": 1}, ["a"]),
+        ({"x": {"$gt": 1}}, ["b"]),
+        ({"x": {"$lte": 2.5}}, ["a", "b"]),
+        ({"x": {"$ne": 1}}, ["b", "c", "d"]),  # includes a string value and a missing key
+        ({"x": {"$in": [1, 7]}}, ["a"]),
+        ({"s": {"$nin": ["one"]}}, ["b", "c", "d"]),
+        ({"flag": True}, ["b"]),
+        ({"flag": {"$ne": True}}, ["a", "c", "d"]),
+        ({"$or": [{"s": "two"}, {"x": "str"}]}, ["c", "d"]),
+        ({"$and": [{"x": {"$gte": 1}}, {"flag": True}]}, ["b"]),
+    ],
+)
+def test_where_matches_chroma(collection, where, expected):
+    assert collection.get(where=where, include=[])["ids"] == expected
+
+
+@pytest.mark.parametrize("where", [{"x": 1, "s": "one"}, {"x": {"$gt": "a"}}, {"$and": [{"x": 1}]}, {"x": {"$in": []}}])
+def test_invalid_where_is_rejected(collection, where):
+    with pytest.raises(ValueError):
+        collection.get(where=where)
+
+
+def test_reads_and_writes_match_chroma(collection):
+    collection.upsert(ids=["a"], embeddings=[[1, 0]], metadatas=[{"x": 3}])
+    collection.update(ids=["b", "missing"], metadatas=[{"z": 1}, {"z": 2}])
+
+    result = collection.get(ids=["c", "b", "a", "missing"], include=["documents", "metadatas"])
+    assert result["ids"] == ["a", "b", "c"]  # storage order, not request order
+    assert result["documents"] == ["da", "db", "dc"]
+    assert result["metadatas"][0] == {"x": 3, "s": "one"}  # upsert merges metadata
+    assert result["metadatas"][1] == {"x": 2.5, "flag": True, "z": 1}
+    assert result["embeddings"] is None
+    assert collection.get(limit=2, offset=1, include=[])["ids"] == ["b", "c"]
+
+    found = collection.query(query_embeddings=[[1, 0.1]], n_results=10, where={"s": {"$ne": "two"}})
+    assert found["ids"] == [["a", "c", "b"]]
+    assert found["distances"][0] == pytest.approx([0.005, 0.226, 0.9005], abs=1e-3)
+
+    collection.delete(where={"flag": False})
+    assert collection.count() == 3
+
+
+def test_memory_client_is_shared_per_dir(tmp_path):
+    MemoryClient.at(tmp_path).get_or_create_collection("things").upsert(ids=["a"], embeddings=[[1.0]])
+    assert MemoryClient.at(str(tmp_path)).get_collection("things").count() == 1
+    MemoryClient.clear_system_cache()
+    assert MemoryClient.at(tmp_path).list_collections() == []
+
+
+def test_compile_where_missing_key():
+    assert compile_where({"n": {"$lt": 5}})({"n": 4})
+    assert not compile_where({"n": {"$lt": 5}})({})
+    assert compile_where({"n": {"$nin": [1, 2]}})(None)
@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+from datetime import UTC, datetime
+
+from gmail_parser.backfill import BackfillScheduler
+
+
+class FakeStore:
+    def __init__(self):
+        self.backfill = {}
+
+    def get_backfill_state(self, account_id=None):
+        return self.backfill.get(account_id)
+
+    def update_backfill_state(self, metadata, account_id=None):
+        self.backfill[account_id] = dict(metadata)
+
+    def delete_backfill_state(self, account_id=None):
+        self.backfill.pop(account_id, None)
+
+
+class FakeClient:
+    def __init__(self):
+        self.inter_batch_delay = 2.0
+
+    @contextmanager
+    def throttled(self, delay):
+        previous, self.inter_batch_delay = self.inter_batch_delay, delay
+        try:
+            yield self
+        finally:
+            self.inter_batch_delay = previous
+
+
+class FakePipeline:
+    account_id = "default"
+
+    def __init__(self, cancel_after=None):
+        self.store = FakeStore()
+        self.client = FakeClient()
+        self.calls = []
+        self.cancel_after = cancel_after
+
+    def full_sync(self, **kwargs):
+        self.calls.append({**kwargs, "delay": self.client.inter_batch_delay})
+        return 10
+
+    def cancelled(self):
+        return self.cancel_after is not None and len(self.calls) >= self.cancel_after
+
+
+def _scheduler(pipeline):
+    return BackfillScheduler(
+        pipeline,
+        recent_days=30,
+        window_days=365,
+        inter_batch_delay=6.0,
+        floor=datetime(2020, 1, 1, tzinfo=UTC),
+    )
+
+
+def test_recent_first_then_older_windows():
+    pipeline = FakePipeline()
+    state = _scheduler(pipeline).run()
+
+    first, *windows = pipeline.calls
+    assert first["days_ago"] == 30 and first["delay"] == 2.0
+    assert all(w["delay"] == 6.0 and w["update_history"] is False for w in windows)
+    # Windows walk backwards contiguously and stop at the floor
+    for newer, older in zip(windows, windows[1:]):
+        assert older["before"] == newer["after"]
+    assert windows[-1]["after"] == datetime(2020, 1, 1, tzinfo=UTC)
+    assert state["status"] == "complete"
+    assert state["emails_synced"] == 10 * len(pipeline.calls)
+    assert pipeline.client.inter_batch_delay == 2.0
+
+
+def test_cancel_keeps_progress_and_resumes():
+    pipeline = FakePipeline(cancel_after=3)
+    scheduler = _scheduler(pipeline)
+    state = scheduler.run(cancel_check=pipeline.cancelled)
+
+    # The window in flight when cancelled is not recorded as done
+    assert state["status"] == "history"
+    assert state["windows_done"] == 1
+    resume_from = pipeline.calls[2]["before"]
+    assert datetime.fromisoformat(scheduler.state()["cursor"]) == resume_from
+
+    pipeline.cancel_after = None
+    pipeline.calls.clear()
+    state = scheduler.run()
+    assert "days_ago" not in pipeline.calls[0]
+    assert pipeline.calls[0]["before"] == resume_from
+    assert state["status"] == "complete"
+
+
+def test_completed_backfill_is_noop():
+    pipeline = FakePipeline()
+    scheduler = _scheduler(pipeline)
+    scheduler.run()
+    pipeline.calls.clear()
+    scheduler.run()
+    assert pipeline.calls == []
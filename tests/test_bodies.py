@@ -0,0 +1,39 @@
+from gmail_parser.bodies import BodyStore
+from gmail_parser.store import EmailStore
+
+
+def test_bodies_are_compressed_and_shared(tmp_path):
+    bodies = BodyStore(tmp_path)
+    newsletter = "Weekly digest. " * 200
+    bodies.put(["a", "b", "c", "d"], [newsletter, newsletter, "short ✓", ""])
+
+    assert bodies.get(["a", "c", "d", "missing"]) == {"a": newsletter, "c": "short ✓", "d": ""}
+    stats = bodies.stats()
+    assert stats["bodies"] == 4 and stats["blobs"] == 3
+    assert stats["stored_bytes"] < len(newsletter) // 10
+
+
+def test_unreferenced_blobs_are_dropped(tmp_path):
+    bodies = BodyStore(tmp_path)
+    bodies.put(["a", "b"], ["same", "same"])
+    bodies.put(["a"], ["changed"])
+    assert bodies.stats()["blobs"] == 2
+
+    bodies.delete(["b"])
+    assert bodies.stats()["blobs"] == 1
+    assert bodies.get(["a", "b"]) == {"a": "changed"}
+
+
+def test_store_moves_chroma_documents_out(tmp_path):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    store.upsert_emails_batch(["m1"], ["kept"], [[0.1] * 384], [{"subject": "New"}])
+    # An email written before bodies left Chroma
+    store._emails.upsert(ids=["m0"], documents=["old body"], embeddings=[[0.2] * 384], metadatas=[{"subject": "Old"}])
+    store.close()
+
+    reopened = EmailStore(persist_dir=str(tmp_path / "data"))
+    assert reopened.get_email("m0")["document"] == "old body"
+    assert reopened.get_bodies(["m0", "m1"]) == {"m0": "old body", "m1": "kept"}
+    reopened._writer.call(lambda: None).result()  # documents are blanked on the writer thread
+    assert reopened._emails.get(ids=["m0", "m1"], include=["documents"])["documents"] == ["", ""]
+    assert reopened.get_emails(ids=["m0"])["metadatas"] == [{"subject": "Old"}]
@@ -0,0 +1,64 @@
+from gmail_parser.changelog import ChangeLog
+from gmail_parser.store import EmailStore
+
+
+def test_versions_are_monotonic_across_reopen(tmp_path):
+    log = ChangeLog(tmp_path)
+    assert log.version() == 0
+    assert log.record("emails", "upsert", ["a"], ["subject"]) == 1
+    assert log.record("expenses", "delete", ["x"], []) == 2
+    log.close()
+
+    log = ChangeLog(tmp_path)
+    assert log.record("emails", "update", ["a"], ["is_read"]) == 3
+    assert [c.version for c in log.since(1)] == [2, 3]
+    assert [c.op for c in log.since(0, collection="emails")] == ["upsert", "update"]
+    assert log.since(0, limit=1)[0].ids == ["a"]
+
+
+def test_compacted_history_returns_none(tmp_path):
+    log = ChangeLog(tmp_path)
+    for i in range(5):
+        log.record("emails", "upsert", [f"m{i}"], [])
+    log.compact(retain=2)
+    assert log.since(1) is None
+    assert [c.version for c in log.since(3)] == [4, 5]
+    assert log.since(5) == []
+
+    log.compact(retain=0)
+    assert log.since(4) is None
+    assert log.since(5) == []
+    assert log.record("emails", "delete", ["m0"], []) == 6
+
+
+def test_store_records_writes(tmp_path):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    store.upsert_emails_batch(["m1"], ["one"], [[0.1] * 384], [{"subject": "Hi", "date_timestamp": 1}])
+    store.update_metadatas_batch(["m1"], [{"is_read": True}])
+    store.delete_emails(["m1"])
+    store.upsert_expenses_batch(["e1"], ["coffee"], [[0.1] * 384], [{"amount": 3.5}])
+
+    changes = store.changes_since(0)
+    assert store.version() == 4
+    assert [(c.collection, c.op, c.ids) for c in changes] == [
+        ("emails", "upsert", ["m1"]),
+        ("emails", "update", ["m1"]),
+        ("emails", "delete", ["m1"]),
+        ("expenses", "upsert", ["e1"]),
+    ]
+    assert changes[0].fields == ["date_timestamp", "document", "embedding", "subject"]
+    assert changes[1].fields == ["is_read"]
+
+
+def test_columns_catch_up_on_other_writers(tmp_path):
+    reader = EmailStore(persist_dir=str(tmp_path / "data"))
+    writer = EmailStore(persist_dir=str(tmp_path / "data"))
+    writer.upsert_emails_batch(["m1", "m2"], ["one", "two"], [[0.1] * 384] * 2, [{"date_timestamp": 1}] * 2)
+    assert reader.metadata_columns().ids == ["m1", "m2"]
+
+    writer.update_metadatas_batch(["m1"], [{"date_timestamp": 5}])
+    writer.delete_emails(["m2"])
+    writer.upsert_emails_batch(["m3"], ["three"], [[0.1] * 384], [{"date_timestamp": 9}])
+    view = reader.metadata_columns()
+    assert view.ids == ["m1", "m3"]
+    assert view.ts.tolist() == [5, 9]
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from gmail_parser.columns import FLAG_READ, FLAG_STARRED, FLAG_UNSUBSCRIBE, MetadataColumns
+from gmail_parser.store import EmailStore
+
+
+def _meta(sender, ts, **extra):
+    return {
+        "sender": sender,
+        "date_timestamp": ts,
+        "date_iso": "2024-01-01T10:00:00+02:00",
+        "category": "Other",
+        **extra,
+    }
+
+
+@pytest.fixture
+def columns(tmp_path):
+    return MetadataColumns(tmp_path)
+
+
+def test_upsert_update_delete(columns):
+    columns.upsert(
+        ["a", "b", "c"],
+        [
+            _meta("x@a.com", 100, is_read=False, labels="|INBOX|"),
+            _meta("y@b.com", 200, is_starred=True, list_unsubscribe="<mailto:u@b.com>"),
+            _meta("x@a.com", 300, labels="|INBOX|Work|", account_id="work"),
+        ],
+    )
+    columns.update(["a"], [{"is_read": True, "category": "Finance"}])
+    columns.delete(["b"])
+
+    view = columns.view()
+    assert view.ids == ["a", "c"]
+    assert view.ts.tolist() == [100, 300]
+    assert view.has(FLAG_READ).all()
+    assert not view.has(FLAG_STARRED | FLAG_UNSUBSCRIBE).any()
+    assert [view.categories[c] for c in view.category] == ["Finance", "Other"]
+    assert view.ids_where(view.label_mask(["Work"])) == ["c"]
+    assert view.ids_where(view.label_mask(["INBOX"])) == ["a", "c"]
+    assert view.iso(0) == "1970-01-01T02:01:40+02:00"
+    assert columns.view("work").ids == ["c"]
+
+
+def test_upsert_merges_into_existing_rows(columns):
+    columns.upsert(["a"], [_meta("x@a.com", 100, category="Work", is_starred=True, labels="|INBOX|")])
+    columns.upsert(["a", "b"], [{"subject": "B"}, _meta("y@b.com", 200)])
+    view = columns.view()
+    # Like Chroma, keys the second upsert left out keep their values
+    assert [view.categories[c] for c in view.category] == ["Work", "Other"]
+    assert view.has(FLAG_STARRED).tolist() == [True, False]
+    assert view.ids_where(view.label_mask(["INBOX"])) == ["a"]
+    assert view.ts.tolist() == [100, 200]
+
+    columns.replace(["a"], [_meta("x@a.com", 300)])
+    view = columns.view()
+    assert view.categories[view.category[0]] == "Other"
+    assert not view.has(FLAG_STARRED)[0]
+
+
+def test_label_bitset_widens(columns):
+    names = [f"L{i}" for i in range(70)]
+    columns.upsert(["a", "b"], [_meta("x", 1, labels="|L0|"), _meta("y", 2, labels="|" + "|".join(names) + "|")])
+    view = columns.view()
+    assert view.labels.shape[1] == 2
+    assert view.ids_where(view.label_mask(["L69"])) == ["b"]
+    assert view.ids_where(view.label_mask(["L0"])) == ["a", "b"]
+
+
+def test_flush_and_reload(tmp_path, columns):
+    columns.upsert(["a"], [_meta("x@a.com", 100)])
+    columns.advance(7)
+    columns.flush()
+
+    reloaded = MetadataColumns(tmp_path)
+    assert reloaded.load()
+    assert reloaded.view().ids == ["a"]
+    assert reloaded.view().senders == ["x@a.com"]
+    assert reloaded.version == 7
+
+
+def test_rebuild(tmp_path, columns):
+    assert not columns.load()
+    columns.rebuild(iter([(["a"], [_meta("x@a.com", 100)]), (["b"], [_meta("y@b.com", 200)])]), version=3)
+    assert columns.view().ids == ["a", "b"]
+    assert columns.version == 3
+
+    (tmp_path / MetadataColumns.FILENAME).write_bytes(b"garbage")
+    assert not MetadataColumns(tmp_path).load()
+
+
+def test_store_keeps_columns_in_sync(tmp_path):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    store.upsert_emails_batch(
+        ["m1", "m2"],
+        ["one", "two"],
+        [[0.1] * 384, [0.2] * 384],
+        [_meta("a@x.com", 100, is_read=False), _meta("b@y.com", 200)],
+    )
+    assert store.metadata_columns().ids == ["m1", "m2"]
+
+    store.update_metadatas_batch(["m1"], [{"is_read": True}])
+    store.delete_emails(["m2"])
+    view = store.metadata_columns()
+    assert view.ids == ["m1"]
+    assert view.has(FLAG_READ).tolist() == [True]
+
+    store.close()
+    reopened = EmailStore(persist_dir=str(tmp_path / "data"))
+    assert np.array_equal(reopened.metadata_columns().ts, view.ts)
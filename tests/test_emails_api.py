@@ -0,0 +1,28 @@
+import pytest
+from fastapi import HTTPException
+
+from api.routers import emails
+from gmail_parser.store import EmailStore
+
+
+class OfflineClient:
+    def __init__(self, auth):
+        pass
+
+    def get_message(self, gmail_id, format="full"):
+        raise ConnectionError("Gmail unreachable")
+
+
+def test_body_falls_back_to_the_store_when_gmail_is_unreachable(tmp_path, monkeypatch):
+    store = EmailStore(persist_dir=str(tmp_path / "test_data"))
+    monkeypatch.setattr(emails, "get_store", lambda: store)
+    monkeypatch.setattr(emails, "GmailAuth", lambda account_id: None)
+    monkeypatch.setattr(emails, "GmailClient", OfflineClient)
+    try:
+        store.upsert_email("msg_1", "Stored body", [0.1] * 384, {"subject": "A"})
+        assert emails.get_email_body("msg_1") == {"text": "Stored body"}
+        with pytest.raises(HTTPException) as e:
+            emails.get_email_body("missing")
+        assert e.value.status_code == 502
+    finally:
+        store.close()
@@ -1,4 +1,14 @@
+import sys
+import threading
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from gmail_parser import embeddings
 from gmail_parser.embeddings import EmbeddingModel
+from gmail_parser.exceptions import EmbeddingError
 
 
 def test_prepare_email_text():
@@ -20,3 +30,110 @@ def test_prepare_email_text_none_handling():
     result = EmbeddingModel.prepare_email_text(None, None, None)
     assert "From: " in result
     assert "Subject: " in result
+
+
+def test_model_is_loaded_once_and_shared(monkeypatch):
+    loads = []
+
+    class FakeTransformer:
+        def __init__(self, name):
+            loads.append(name)
+
+        def encode(self, texts, **kwargs):
+            return np.ones((len(texts), 2)) if isinstance(texts, list) else np.ones(2)
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=FakeTransformer))
+    embeddings.clear_models()
+    try:
+        threads = [threading.Thread(target=EmbeddingModel("fake-model").encode, args=("hi",)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert EmbeddingModel("fake-model").encode_batch(["a", "b"]) == [[1.0, 1.0], [1.0, 1.0]]
+        assert loads == ["fake-model"]
+        EmbeddingModel("other-model").encode("hi")
+        assert loads == ["fake-model", "other-model"]
+    finally:
+        embeddings.clear_models()
+
+
+def test_query_cache_skips_repeated_encodes(monkeypatch):
+    calls = []
+
+    class FakeTransformer:
+        def __init__(self, name):
+            pass
+
+        def encode(self, text, **kwargs):
+            calls.append(text)
+            return np.full(2, float(len(calls)))
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=FakeTransformer))
+    embeddings.clear_models()
+    monkeypatch.setitem(embeddings._query_caches, "fake-model", embeddings.QueryCache(2))
+    try:
+        model = EmbeddingModel("fake-model")
+        first = model.encode("dentist  appointment ")
+        first.append(99.0)  # callers get their own copy
+        assert EmbeddingModel("fake-model").encode("dentist appointment") == [1.0, 1.0]
+        model.encode("b")
+        model.encode("c")  # evicts "dentist appointment", the least recently used
+        model.encode("dentist appointment")
+        assert calls == ["dentist appointment", "b", "c", "dentist appointment"]
+        assert model.cache_stats() == {"size": 2, "max_size": 2, "hits": 1, "misses": 4}
+    finally:
+        embeddings.clear_models()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        EmbeddingModel("fake-model", backend="tensorrt")
+
+
+def test_interrupted_onnx_export_leaves_nothing_to_load(tmp_path, monkeypatch):
+    fail = [True]
+
+    class FakeTransformer:
+        def __init__(self, name, backend=None):
+            pass
+
+        def save_pretrained(self, path):
+            (Path(path) / "config.json").write_text("{}")
+            if fail[0]:
+                raise RuntimeError("export interrupted")
+            (Path(path) / "model.onnx").write_bytes(b"onnx")
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=FakeTransformer))
+    monkeypatch.setattr(embeddings, "onnx_dir", lambda name: tmp_path / "models" / name)
+    with pytest.raises(RuntimeError):
+        embeddings.export_onnx("fake-model")
+    assert list((tmp_path / "models").iterdir()) == []
+
+    fail[0] = False
+    path, file_name = embeddings.export_onnx("fake-model")
+    assert (path / file_name).read_bytes() == b"onnx"
+    assert [p.name for p in (tmp_path / "models").iterdir()] == ["fake-model"]
+
+
+@pytest.mark.parametrize("backend, min_cosine", [("onnx", 0.9999), ("onnx-int8", 0.98)])
+def test_onnx_backend_matches_torch(backend, min_cosine, tmp_path, monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("optimum.onnxruntime")
+    monkeypatch.setattr(embeddings, "onnx_dir", lambda name: tmp_path / name.replace("/", "--"))
+    texts = [
+        EmbeddingModel.prepare_email_text("Invoice #4411", "Your payment of $120.00 is due on the 3rd.", "billing@acme.com"),
+        EmbeddingModel.prepare_email_text("Lunch?", "Want to grab tacos on Friday around noon?", "sam@example.com"),
+        "dentist appointment next week",
+    ]
+    embeddings.clear_models()
+    try:
+        try:
+            expected = np.array(EmbeddingModel(backend="torch").encode_batch(texts))
+            actual = np.array(EmbeddingModel(backend=backend).encode_batch(texts))
+        except EmbeddingError as e:
+            pytest.skip(f"model unavailable: {e}")
+        # Both are unit length, so the row-wise dot product is the cosine similarity
+        assert (expected * actual).sum(axis=1).min() > min_cosine
+    finally:
+        embeddings.clear_models()
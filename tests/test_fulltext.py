@@ -0,0 +1,71 @@
+import pytest
+
+from gmail_parser.fulltext import FullTextIndex, to_match_query
+from gmail_parser.search import EmailSearch
+from gmail_parser.store import EmailStore
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FullTextIndex(tmp_path)
+    index.upsert(
+        ["a", "b", "c"],
+        ["Quarterly report", "Lunch", "Invoice #42"],
+        ["The quarterly report is attached", "Budget meeting moved to Friday", "Your invoices for the report"],
+    )
+    return index
+
+
+def test_to_match_query():
+    assert to_match_query('budget "quarterly report" invoic*') == '"budget" "quarterly report" "invoic"*'
+    assert to_match_query("a-b (c) OR") == '"a b" "c" "OR"'
+    assert to_match_query('"unclosed phrase') == '"unclosed phrase"'
+    assert to_match_query('*** ""') is None
+
+
+def test_phrase_prefix_and_ranking(index):
+    assert [gid for gid, _ in index.search('"quarterly report"')] == ["a"]
+    assert [gid for gid, _ in index.search("invoic*")] == ["c"]
+    assert [gid for gid, _ in index.search("meeting budget")] == ["b"]
+    # Stemming matches plural forms; the subject hit outranks a body-only hit
+    assert [gid for gid, _ in index.search("report")] == ["a", "c"]
+
+
+def test_upsert_replaces_and_delete_removes(index):
+    index.upsert(["b"], ["Dinner"], ["Nothing about money"])
+    assert index.search("budget") == []
+    # Without a subject (metadata that left it out) the indexed one stays
+    index.upsert(["c"], [None], ["Shipping update for the report"])
+    assert [gid for gid, _ in index.search("invoice")] == ["c"]
+    assert [gid for gid, _ in index.search("shipping")] == ["c"]
+    index.delete(["a"])
+    assert [gid for gid, _ in index.search("report")] == ["c"]
+    assert index.count() == 2
+
+
+def test_reconcile_with_store_ids(index):
+    index.reconcile(["b", "c", "d"], lambda ids: (["New"] * len(ids), ["fresh body"] * len(ids)))
+    assert index.ids() == {"b", "c", "d"}
+    assert [gid for gid, _ in index.search("fresh")] == ["d"]
+
+
+def test_store_maintains_index(tmp_path, fake_embedding):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    store.upsert_emails_batch(
+        ["m1", "m2"],
+        ["budget meeting notes", "holiday photos"],
+        [[0.1] * 384, [0.2] * 384],
+        [{"subject": "Meeting", "sender": "a@b.com"}, {"subject": "Trip", "sender": "c@d.com"}],
+    )
+    search = EmailSearch(store=store, embedding_model=fake_embedding)
+    [hit] = search.fulltext_search("budget")
+    assert hit["id"] == "m1" and hit["metadata"]["subject"] == "Meeting" and hit["score"] > 0
+
+    store.delete_emails(["m1"])
+    assert search.fulltext_search("budget") == []
+    store.close()
+
+    # An index out of step with Chroma is reconciled when the store reopens
+    (tmp_path / "data" / FullTextIndex.FILENAME).unlink()
+    reopened = EmailStore(persist_dir=str(tmp_path / "data"))
+    assert [r[0] for r in reopened.search_text("photos")] == ["m2"]
@@ -0,0 +1,78 @@
+import pytest
+
+from gmail_parser.ingestion import IngestionPipeline
+from gmail_parser.journal import BatchJournal
+from gmail_parser.store import EmailStore
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return BatchJournal(tmp_path / "journal.jsonl")
+
+
+def test_pending_tracks_stages(journal):
+    run = journal.begin_run("default", "100")
+    journal.begin_batch(run, 0, ["a", "b"])
+    journal.mark(run, 0, "stored")
+    journal.mark(run, 0, "llm")
+    journal.begin_batch(run, 100, ["c"])
+    journal.mark(run, 100, "stored")
+
+    [pending] = journal.pending()
+    assert pending["history_id"] == "100"
+    assert not pending["synced"]
+    assert [b["stages"] for b in pending["batches"]] == [{"stored", "llm"}, {"stored"}]
+    assert journal.pending("other") == []
+
+
+def test_end_run_compacts_finished_runs(journal):
+    done = journal.begin_run("default", "1")
+    open_run = journal.begin_run("default", "2")
+    journal.begin_batch(done, 0, ["a"])
+    journal.end_run(done)
+
+    assert [r["run"] for r in journal.pending()] == [open_run]
+    assert done not in journal.path.read_text()
+
+
+def test_torn_last_line_is_ignored(journal):
+    run = journal.begin_run("default", None)
+    with open(journal.path, "a") as f:
+        f.write('{"op": "batch", "run": "')
+    assert journal.pending()[0]["run"] == run
+
+
+class FakeClient:
+    def __init__(self, raw_messages):
+        self.raw_messages = raw_messages
+
+    def batch_get_messages(self, ids, format="full"):
+        return [m for m in self.raw_messages if m["id"] in ids], []
+
+
+def test_recover_finishes_missing_stages(tmp_path, journal, sample_raw_message, monkeypatch, fake_embedding):
+    extracted = []
+    monkeypatch.setattr(
+        "gmail_parser.llm_extractor.extract_batch",
+        lambda inputs: extracted.extend(i["id"] for i in inputs) or {},
+    )
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    store.upsert_email("stored_1", "body", [0.1] * 384, {"subject": "Hi", "sender": "a@b.com"})
+
+    # Crash after storing batch 0 (before its LLM stage) and before storing batch 100
+    run = journal.begin_run("default", None)
+    journal.begin_batch(run, 0, ["stored_1"])
+    journal.mark(run, 0, "stored")
+    journal.begin_batch(run, 100, ["msg_123"])
+
+    pipeline = IngestionPipeline(
+        client=FakeClient([sample_raw_message]),
+        store=store,
+        embedding_model=fake_embedding,
+        journal=journal,
+    )
+    assert pipeline.recover() == {"runs": 1, "stored": 1, "llm": 2}
+    assert sorted(extracted) == ["msg_123", "stored_1"]
+    assert store.get_email("msg_123") is not None
+    assert store.get_email("stored_1")["metadata"]["actions_extracted"] is True
+    assert journal.pending() == []
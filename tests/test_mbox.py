@@ -0,0 +1,108 @@
+from gmail_parser.ingestion import IngestionPipeline
+from gmail_parser.mbox import iter_mbox, parse_label_header, parse_mbox_batch, parse_mbox_message
+from gmail_parser.store import EmailStore
+
+_MBOX = b"""From 1780000000000000001@xxx Tue Nov 14 12:00:00 +0000 2023
+X-GM-THRID: 1780000000000000000
+X-Gmail-Labels: Inbox,Unread,Category Promotions,"Work, Projects"
+From: Alice <alice@example.com>
+To: me@example.com
+Subject: Quarterly report
+Date: Tue, 14 Nov 2023 12:00:00 +0000
+Content-Type: text/plain; charset="utf-8"
+
+Please see the report.
+>From the team
+
+From 1780000000000000002@xxx Tue Nov 14 13:00:00 +0000 2023
+X-GM-THRID: 1780000000000000002
+X-Gmail-Labels: Spam
+From: spam@example.com
+Subject: Win
+Date: Tue, 14 Nov 2023 13:00:00 +0000
+
+Buy now
+
+From 1780000000000000003@xxx Tue Nov 14 14:00:00 +0000 2023
+X-GM-THRID: 1780000000000000003
+X-Gmail-Labels: Opened,Starred
+From: Bob <bob@example.com>
+Subject: Lunch
+Date: Tue, 14 Nov 2023 14:00:00 +0000
+MIME-Version: 1.0
+Content-Type: multipart/mixed; boundary="b"
+
+--b
+Content-Type: text/html; charset="utf-8"
+
+<p>See you at <b>noon</b></p>
+--b
+Content-Type: application/pdf
+Content-Disposition: attachment; filename="menu.pdf"
+Content-Transfer-Encoding: base64
+
+JVBERi0=
+--b--
+"""
+
+
+def _write(tmp_path):
+    path = tmp_path / "takeout.mbox"
+    path.write_bytes(_MBOX)
+    return str(path)
+
+
+def test_iter_mbox_splits_messages(tmp_path):
+    messages = list(iter_mbox(_write(tmp_path)))
+    assert len(messages) == 3
+    from_line, raw = messages[0]
+    assert from_line.startswith(b"From 1780000000000000001@")
+    assert b"\nFrom the team" in raw
+
+
+def test_parse_mbox_message_matches_client_shape(tmp_path):
+    from_line, raw = next(iter_mbox(_write(tmp_path)))
+    parsed = parse_mbox_message(from_line, raw, {"Work, Projects": "Label_7"})
+    assert parsed["gmail_id"] == format(1780000000000000001, "x")
+    assert parsed["thread_id"] == format(1780000000000000000, "x")
+    assert parsed["label_ids"] == ["INBOX", "UNREAD", "CATEGORY_PROMOTIONS", "Label_7"]
+    assert parsed["is_read"] is False
+    assert parsed["subject"] == "Quarterly report"
+    assert parsed["sender"] == "Alice <alice@example.com>"
+    assert parsed["recipients"]["to"] == "me@example.com"
+    assert parsed["date"].year == 2023
+    assert "Please see the report." in parsed["body_text"]
+
+
+def test_parse_mbox_batch_skips_spam_and_extracts_html(tmp_path):
+    parsed = parse_mbox_batch(list(iter_mbox(_write(tmp_path))), {})
+    assert [p["subject"] for p in parsed] == ["Quarterly report", "Lunch"]
+    lunch = parsed[1]
+    assert lunch["is_read"] is True
+    assert lunch["is_starred"] is True
+    assert "noon" in lunch["body_text"]
+    assert lunch["has_attachments"] is True
+    assert lunch["attachments"][0]["filename"] == "menu.pdf"
+
+
+def test_parse_label_header_keeps_unknown_user_labels():
+    assert parse_label_header("Sent,Opened,Receipts", {}) == ["SENT", "Receipts"]
+
+
+def test_import_mbox_skips_an_id_the_previous_batch_is_still_writing(tmp_path, fake_embedding):
+    first = _MBOX[: _MBOX.index(b"From 1780000000000000002@")]
+    path = tmp_path / "takeout.mbox"
+    path.write_bytes(first + first + _MBOX[len(first) :])
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    progress = []
+    pipeline = IngestionPipeline(client=object(), store=store, embedding_model=fake_embedding, journal=object())
+    try:
+        imported = pipeline.import_mbox(
+            str(path), workers=1, batch_size=1, catch_up=False,
+            progress_callback=lambda done, skipped: progress.append((done, skipped)),
+        )
+        assert imported == 2
+        assert progress[-1] == (2, 1)
+        assert sorted(store.get_all_ids()) == [format(1780000000000000001, "x"), format(1780000000000000003, "x")]
+    finally:
+        store.close()
@@ -0,0 +1,103 @@
+import pytest
+
+from gmail_parser.postings import PostingIndex, domain_keys, normalize_address, sender_matches
+from gmail_parser.search import EmailSearch, SearchFilters
+from gmail_parser.store import EmailStore
+
+
+def test_normalize_and_match():
+    assert normalize_address('"Shop" <Deals@Mail.Shop.com>') == "deals@mail.shop.com"
+    assert normalize_address("no address") == ""
+    assert domain_keys("deals@mail.shop.com") == ["mail.shop.com", "shop.com"]
+    assert sender_matches("Deals@mail.shop.com", "deals@mail.shop.com")
+    assert sender_matches("@shop.com", "deals@mail.shop.com")
+    assert sender_matches("shop.com", "deals@mail.shop.com")
+    assert not sender_matches("hop.com", "deals@mail.shop.com")
+    assert sender_matches("deals@", "deals@mail.shop.com")
+    assert sender_matches("amazon", '"Amazon" <ship@amzn.com>')
+    assert not sender_matches("amazon.com", '"Amazon" <ship@amzn.com>')
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = PostingIndex(tmp_path)
+    index.upsert(
+        ["a", "b", "c"],
+        [
+            {"sender": "Shop <deals@mail.shop.com>", "labels": "|INBOX|Promo|", "date_timestamp": 100},
+            {"sender": "Bob <bob@example.com>", "labels": "|INBOX|", "date_timestamp": 300},
+            {"sender": "orders@shop.com", "labels": "|Promo|", "date_timestamp": 200},
+        ],
+    )
+    return index
+
+
+def test_lookup_intersects_newest_first(index):
+    assert index.lookup(label="Promo") == ["c", "a"]
+    assert index.lookup(sender="shop.com") == ["c", "a"]
+    assert index.lookup(sender="bob@example.com") == ["b"]
+    assert index.lookup(label="INBOX", sender="shop.com") == ["a"]
+    assert index.lookup(sender="deal") == ["a"]
+    assert index.lookup(sender="Shop") == ["c", "a"]  # display name or address
+    assert index.lookup(sender="nobody") == []
+    assert index.lookup(limit=2) == ["b", "c"]
+
+
+def test_updates_and_deletes(index):
+    index.update(["a"], [{"labels": "|INBOX|", "is_read": True}])
+    assert index.lookup(label="Promo") == ["c"]
+    assert index.lookup(sender="shop.com") == ["c", "a"]
+
+    index.update(["b"], [{"date_timestamp": 50}])
+    assert index.lookup(label="INBOX") == ["a", "b"]
+
+    index.delete(["c"])
+    assert index.lookup(label="Promo") == []
+    assert index.count() == 2
+
+
+def test_upsert_merges_like_chroma(index):
+    # Fields the new metadata leaves out keep their postings
+    index.upsert(["a"], [{"subject": "again", "date_timestamp": 400}])
+    assert index.lookup(label="Promo") == ["a", "c"]
+    assert index.lookup(sender="deals@mail.shop.com") == ["a"]
+    index.upsert(["a"], [{"labels": "|Work|"}])
+    assert index.lookup(label="Promo") == ["c"]
+    assert index.lookup(label="Work") == ["a"]
+
+
+def test_older_index_is_rebuilt(tmp_path, index):
+    index._conn.execute("PRAGMA user_version = 1")
+    index.close()
+    assert PostingIndex(tmp_path).count() == 0
+
+
+def test_reconcile(index):
+    index.reconcile(iter([(["b", "d"], [{"sender": "b@x.com"}, {"sender": "d@y.com", "labels": "|Work|"}])]))
+    assert index.ids() == {"b", "d"}
+    assert index.lookup(label="Work") == ["d"]
+
+
+def test_search_uses_posting_lists(tmp_path, fake_embedding):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    store.upsert_emails_batch(
+        ["m1", "m2", "m3"],
+        ["one", "two", "three"],
+        [[0.1] * 384] * 3,
+        [
+            {"sender": "A <a@shop.com>", "labels": "|INBOX|", "date_timestamp": 1, "subject": "Sale"},
+            {"sender": "B <b@other.org>", "labels": "|INBOX|Work|", "date_timestamp": 2, "subject": "Notes"},
+            {"sender": "C <c@news.shop.com>", "labels": "|Work|", "date_timestamp": 3, "subject": "Sale"},
+        ],
+    )
+    search = EmailSearch(store=store, embedding_model=fake_embedding)
+    assert [e["id"] for e in search.get_emails_by_sender("shop.com")] == ["m3", "m1"]
+    assert [e["id"] for e in search.get_emails_by_label("Work")] == ["m3", "m2"]
+    assert [e["id"] for e in search.filter_emails(SearchFilters(sender="@shop.com", label="Work"))] == ["m3"]
+    assert [e["id"] for e in search.filter_emails(SearchFilters(sender="b"))] == ["m2"]
+
+    store.update_metadatas_batch(["m1"], [{"labels": "|Work|"}])
+    assert [e["id"] for e in search.get_emails_by_label("Work")] == ["m3", "m2", "m1"]
+
+    path = tmp_path / "out.csv"
+    assert search.export_csv(path, SearchFilters(label="Work", subject_contains="Sale")) == 2
@@ -0,0 +1,54 @@
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from gmail_parser.exceptions import SyncError
+from gmail_parser.push import Debouncer, parse_push_notification
+
+
+def _envelope(payload: dict) -> dict:
+    data = base64.b64encode(json.dumps(payload).encode()).decode()
+    return {"message": {"data": data, "messageId": "m1"}, "subscription": "s"}
+
+
+def test_parse_push_notification():
+    note = parse_push_notification(_envelope({"emailAddress": "Me@Example.com", "historyId": 42}))
+    assert note == {"email_address": "me@example.com", "history_id": "42", "message_id": "m1"}
+
+
+def test_parse_push_notification_rejects_missing_fields():
+    with pytest.raises(SyncError):
+        parse_push_notification(_envelope({"emailAddress": "me@example.com"}))
+    with pytest.raises(SyncError):
+        parse_push_notification({"message": {}})
+
+
+def test_debouncer_coalesces_burst():
+    calls = []
+    done = threading.Event()
+
+    def callback(key):
+        calls.append(key)
+        done.set()
+
+    debouncer = Debouncer(callback, delay=0.1, max_delay=5.0)
+    for _ in range(10):
+        debouncer.trigger("default")
+        time.sleep(0.01)
+    assert done.wait(2.0)
+    time.sleep(0.2)
+    assert calls == ["default"]
+
+
+def test_debouncer_max_delay_caps_wait():
+    fired = threading.Event()
+    debouncer = Debouncer(lambda key: fired.set(), delay=0.2, max_delay=0.3)
+    start = time.monotonic()
+    while not fired.is_set() and time.monotonic() - start < 2.0:
+        debouncer.trigger("default")
+        time.sleep(0.05)
+    assert fired.is_set()
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,96 @@
+import pytest
+
+from gmail_parser.exceptions import SearchError
+from gmail_parser.search import EmailSearch, SearchFilters, make_cursor
+from gmail_parser.store import EmailStore
+
+
+@pytest.fixture
+def search(tmp_path, fake_embedding):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    # m0..m9; m4 and m5 share a timestamp to exercise the id tie-break
+    timestamps = [100, 200, 300, 400, 500, 500, 700, 800, 900, 1000]
+    store.upsert_emails_batch(
+        [f"m{i}" for i in range(10)],
+        [f"body {i}" for i in range(10)],
+        [[0.1] * 384] * 10,
+        [
+            {
+                "subject": f"Invoice {i}" if i % 3 == 0 else f"Hello {i}",
+                "sender": f"Shop <shop{i % 2}@store.com>",
+                "labels": "|INBOX|Work|" if i < 5 else "|INBOX|",
+                "is_read": i % 2 == 0,
+                "date_timestamp": ts,
+                "date_iso": "2024-01-01T00:00:00+00:00",
+                "category": "Money" if i % 2 else "Other",
+            }
+            for i, ts in enumerate(timestamps)
+        ],
+    )
+    return EmailSearch(store=store, embedding_model=fake_embedding)
+
+
+def _ids(results):
+    return [r["id"] for r in results]
+
+
+def test_filter_emails_newest_first_with_offset(search):
+    assert _ids(search.filter_emails(SearchFilters(), limit=4)) == ["m9", "m8", "m7", "m6"]
+    assert _ids(search.filter_emails(SearchFilters(), limit=3, offset=3)) == ["m6", "m5", "m4"]
+    # List results leave bodies in the body store; get_email reads them
+    newest = search.filter_emails(SearchFilters(), limit=1)[0]
+    assert "document" not in newest
+    assert search.get_email(newest["id"])["document"] == "body 9"
+
+
+def test_cursor_pages_cover_everything_once(search):
+    seen, cursor = [], None
+    while True:
+        page = search.filter_emails(SearchFilters(), limit=3, cursor=cursor)
+        seen += _ids(page)
+        if len(page) < 3:
+            break
+        cursor = make_cursor(page[-1])
+    assert seen == ["m9", "m8", "m7", "m6", "m5", "m4", "m3", "m2", "m1", "m0"]
+
+
+def test_column_filters(search):
+    assert _ids(search.filter_emails(SearchFilters(sender="shop1@"))) == ["m9", "m7", "m5", "m3", "m1"]
+    assert _ids(search.filter_emails(SearchFilters(label="Work", is_read=False))) == ["m3", "m1"]
+    assert _ids(search.filter_emails(SearchFilters(category="Other"), limit=2)) == ["m8", "m6"]
+
+
+def test_subject_filter_pages_through_metadata(search):
+    filters = SearchFilters(subject_contains="Invoice")
+    assert _ids(search.filter_emails(filters)) == ["m9", "m6", "m3", "m0"]
+    first = search.filter_emails(filters, limit=2)
+    assert _ids(search.filter_emails(filters, limit=2, cursor=make_cursor(first[-1]))) == ["m3", "m0"]
+
+
+def test_subject_filter_rereads_rows_the_mirror_lacks(search, monkeypatch):
+    store = search._store
+    lagging = store.get_metadatas
+    monkeypatch.setattr(store, "get_metadatas", lambda ids: {k: v for k, v in lagging(ids).items() if k != "m6"})
+    assert _ids(search.filter_emails(SearchFilters(subject_contains="Invoice"))) == ["m9", "m6", "m3", "m0"]
+
+
+def test_rare_subject_match_doubles_the_batch(tmp_path, monkeypatch, fake_embedding):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    n = 3000
+    store.upsert_emails_batch(
+        [f"m{i}" for i in range(n)],
+        [""] * n,
+        [[0.1] * 384] * n,
+        [{"subject": "Needle" if i == 0 else "Hay", "date_timestamp": i} for i in range(n)],
+    )
+    search = EmailSearch(store=store, embedding_model=fake_embedding)
+    batches = []
+    reads = store.get_metadatas
+    monkeypatch.setattr(store, "get_metadatas", lambda ids: batches.append(len(ids)) or reads(ids))
+    assert _ids(search.filter_emails(SearchFilters(subject_contains="Needle"), limit=1)) == ["m0"]
+    assert batches[:4] == [200, 400, 800, 1600]
+
+
+def test_invalid_cursor(search):
+    with pytest.raises(SearchError):
+        search.filter_emails(SearchFilters(), cursor="not-a-cursor")
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from gmail_parser.columns import FLAG_TRANSACTIONS
+from gmail_parser.exceptions import StoreError
+from gmail_parser.snapshot import decode_metadatas, encode_metadatas, read_collection
+from gmail_parser.store import EmailStore
+
+
+def test_metadata_columns_round_trip():
+    metadatas = [
+        {"subject": "Hi ✓", "date_timestamp": 5, "is_read": True, "amount": 2.0},
+        {},
+        {"subject": "", "date_timestamp": 7.5, "is_read": False},
+    ]
+    assert decode_metadatas(encode_metadatas(metadatas), 3) == metadatas
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EmailStore(persist_dir=str(tmp_path / "source"))
+    store.upsert_emails_batch(
+        ["m1", "m2", "m3"],
+        ["one", "two", "three"],
+        [[0.1] * 384, [0.2] * 384, [0.3] * 384],
+        [{"subject": f"S{i}", "date_timestamp": i, "labels": "|INBOX|"} for i in range(3)],
+    )
+    store.upsert_expenses_batch(["e1"], ["coffee"], [[0.5] * 384], [{"amount": 3.5, "currency": "USD"}])
+    store.upsert_label("Label_1", {"name": "Work"})
+    store.update_sync_state({"history_id": "42"})
+    return store
+
+
+def test_export_and_import(tmp_path, store):
+    manifest = store.export_snapshot(tmp_path / "snap")
+    assert manifest["version"] == store.version()
+    assert manifest["collections"]["emails"] == {"count": 3, "dim": 384}
+
+    emails = read_collection(tmp_path / "snap", "emails")
+    assert isinstance(emails["embeddings"], np.memmap)
+    assert emails["embeddings"].dtype == np.float32
+    assert emails["documents"] == ["one", "two", "three"]
+
+    target = EmailStore(persist_dir=str(tmp_path / "target"))
+    target.upsert_emails_batch(["old"], ["gone"], [[0.9] * 384], [{"subject": "Old"}])
+    target.import_snapshot(tmp_path / "snap")
+
+    assert target.get_all_ids() == ["m1", "m2", "m3"]
+    assert target.get_email("m2") == store.get_email("m2")
+    assert target.get_all_expenses()["metadatas"] == [{"amount": 3.5, "currency": "USD"}]
+    assert target.get_labels() == store.get_labels()
+    assert target.get_sync_state() == {"history_id": "42"}
+    assert [gid for gid, _ in target.search_text("two")] == ["m2"]
+    assert target.metadata_columns().ids == ["m1", "m2", "m3"]
+
+
+def test_import_rolls_back_keys_added_since_the_snapshot(tmp_path, store):
+    store.export_snapshot(tmp_path / "snap")
+    store.update_metadatas_batch(["m1"], [{"has_transactions": True, "subject": "Changed"}])
+    store.import_snapshot(tmp_path / "snap")
+
+    expected = {"subject": "S0", "date_timestamp": 0, "labels": "|INBOX|"}
+    assert store.get_email("m1")["metadata"] == expected
+    assert store.get_metadatas(["m1"]) == {"m1": expected}
+    assert not store.metadata_columns().has(FLAG_TRANSACTIONS).any()
+    assert sorted(store.get_all_ids()) == ["m1", "m2", "m3"]
+
+
+def test_export_replays_writes_made_during_the_scan(tmp_path, store, monkeypatch):
+    read_rows = EmailStore._read_snapshot_rows
+    writes = iter([lambda: (store.delete_emails(["m1"]), store.update_metadatas_batch(["m2"], [{"subject": "New"}]))])
+
+    def read_and_write(collection, rows, ids, page_size=5000):
+        read_rows(collection, rows, ids, page_size)
+        next(writes, lambda: None)()
+
+    monkeypatch.setattr(EmailStore, "_read_snapshot_rows", staticmethod(read_and_write))
+    manifest = store.export_snapshot(tmp_path / "snap")
+    emails = read_collection(tmp_path / "snap", "emails")
+    assert manifest["version"] == store.version()
+    assert emails["ids"] == ["m2", "m3"]
+    assert emails["metadatas"][0]["subject"] == "New"
+
+
+def test_export_refuses_existing_path_and_import_needs_snapshot(tmp_path, store):
+    (tmp_path / "snap").mkdir()
+    with pytest.raises(StoreError):
+        store.export_snapshot(tmp_path / "snap")
+    with pytest.raises(StoreError):
+        store.import_snapshot(tmp_path / "snap")
@@ -1,9 +1,11 @@
 import shutil
 import tempfile
 
+import numpy as np
 import pytest
 
-from gmail_parser.store import EmailStore
+from gmail_parser.config import settings
+from gmail_parser.store import EmailStore, close_stores, get_store
 
 
 @pytest.fixture
@@ -61,3 +63,198 @@ def test_query(store):
     store.upsert_email("msg_2", "Invoice attached", [0.1] * 384, {"subject": "Invoice", "sender": "c@d.com"})
     results = store.query([0.5] * 384, n_results=1)
     assert results["ids"][0][0] == "msg_1"
+    # Bodies live in the body store, not Chroma, but where_document still filters on them
+    assert store.query([0.5] * 384, n_results=2, where_document={"$contains": "Invoice"})["ids"] == [["msg_2"]]
+    assert store.query([0.5] * 384, where_document={"$not_contains": "e"})["ids"] == [[]]
+
+
+def test_failed_upsert_stores_no_bodies(store, monkeypatch):
+    def fail(**kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(store._emails, "upsert", fail, raising=False)
+    with pytest.raises(RuntimeError):
+        store.upsert_email("msg_1", "Body", [0.1] * 384, {"subject": "A"})
+    assert store.get_bodies(["msg_1"]) == {}
+
+
+def test_sync_state_per_account(store):
+    store.update_sync_state({"last_history_id": "1"})
+    store.update_sync_state({"last_history_id": "2"}, account_id="shared")
+    assert store.get_sync_state()["last_history_id"] == "1"
+    assert store.get_sync_state("shared")["last_history_id"] == "2"
+    assert store.get_sync_state("other") is None
+
+
+def test_labels_per_account(store):
+    store.upsert_label("INBOX", {"name": "INBOX", "type": "system"})
+    store.upsert_label("Label_1", {"name": "Work", "type": "user"}, account_id="shared")
+    assert {l["name"] for l in store.get_labels()} == {"INBOX", "Work"}
+    shared = store.get_labels("shared")
+    assert [(l["gmail_id"], l["name"]) for l in shared] == [("Label_1", "Work")]
+
+
+def test_count_by_account(store):
+    store.upsert_email("msg_1", "A", [0.1] * 384, {"account_id": "default"})
+    store.upsert_email("msg_2", "B", [0.2] * 384, {"account_id": "shared"})
+    assert store.count() == 2
+    assert store.count({"account_id": "shared"}) == 1
+
+
+def test_iter_emails_pages(store):
+    ids = [f"msg_{i}" for i in range(7)]
+    store.upsert_emails_batch(
+        ids, [f"doc {i}" for i in range(7)], [[0.1] * 384] * 7, [{"n": i, "even": i % 2 == 0} for i in range(7)]
+    )
+    pages = list(store.iter_emails(include=["documents", "metadatas"], page_size=3))
+    assert [len(p["ids"]) for p in pages] == [3, 3, 1]
+    assert [i for p in pages for i in p["ids"]] == ids
+    assert pages[2]["documents"] == ["doc 6"] and pages[2]["metadatas"][0]["n"] == 6
+
+    assert list(store.iter_ids(where={"even": True}, page_size=2)) == ["msg_0", "msg_2", "msg_4", "msg_6"]
+    assert store.get_all_emails(where={"even": False})["ids"] == ["msg_1", "msg_3", "msg_5"]
+    assert list(store.iter_emails(where={"n": 99})) == []
+
+
+def test_get_store_is_shared_per_dir(tmp_path):
+    a = get_store(str(tmp_path / "a"))
+    assert get_store(str(tmp_path / "a")) is a
+    assert get_store(str(tmp_path / "b")) is not a
+    close_stores()
+    assert get_store(str(tmp_path / "a")) is not a
+    close_stores()
+
+
+def test_account_id_migration_runs_once(tmp_path):
+    persist_dir = str(tmp_path / "data")
+    legacy = EmailStore(persist_dir=persist_dir)
+    legacy.upsert_emails_batch(
+        ["old1", "old2", "new"],
+        ["a", "b", "c"],
+        [[0.1] * 384] * 3,
+        [{"subject": "A"}, {"subject": "B"}, {"subject": "C", "account_id": "work"}],
+    )
+    legacy.close()
+
+    # With a single account configured too: ?account=default must still find them
+    store = get_store(persist_dir)
+    try:
+        assert store.get_all_ids(where={"account_id": "default"}) == ["old1", "old2"]
+        assert store.get_metadatas(["old1"]) == {"old1": {"subject": "A", "account_id": "default"}}
+        assert store.metadata_columns("default").ids == ["old1", "old2"]
+        assert store.metadata_columns("work").ids == ["new"]
+
+        # The marker keeps later opens from scanning again
+        store.upsert_email("later", "d", [0.1] * 384, {"subject": "D"})
+        assert store.migrate_account_ids() == 0
+        assert "account_id" not in store.get_email("later")["metadata"]
+    finally:
+        close_stores()
+
+
+def test_rebuild_emails_collection(store, monkeypatch):
+    from gmail_parser import store as store_module
+
+    store.upsert_emails_batch(
+        ["msg_1", "msg_2"], ["one", "two"], [[0.1] * 384, [0.2] * 383 + [0.9]], [{"n": 1}, {"n": 2}]
+    )
+    get_by_ids = store_module._get_by_ids
+    writes = iter([lambda: (store.delete_emails(["msg_1"]), store.upsert_email("msg_3", "three", [0.3] * 384, {"n": 3}))])
+
+    def get_then_write(collection, ids, include):
+        yield from get_by_ids(collection, ids, include)
+        next(writes, lambda: None)()
+
+    monkeypatch.setattr(store_module, "_get_by_ids", get_then_write)
+    result = store.rebuild_emails_collection(m=32, search_ef=200)
+
+    assert result["metadata"]["hnsw:M"] == 32
+    assert store._emails.metadata["hnsw:search_ef"] == 200
+    assert store.get_all_ids() == ["msg_2", "msg_3"]
+    assert store.get_email("msg_2")["metadata"] == {"n": 2}
+    assert store.query([0.2] * 383 + [0.9], n_results=1)["ids"] == [["msg_2"]]
+    assert EmailStore(persist_dir=store._persist_dir).count() == 2
+
+
+def test_other_stores_follow_a_rebuilt_collection(store):
+    store.upsert_emails_batch(["msg_1", "msg_2"], ["one", "two"], [[0.1] * 384, [0.2] * 384], [{"n": 1}, {"n": 2}])
+    other = EmailStore(persist_dir=store._persist_dir)
+    other.metadata_mirror()
+    store.rebuild_emails_collection(m=32)
+
+    # A call on the deleted collection is retried on the new one
+    assert other.get_email("msg_1")["metadata"] == {"n": 1}
+    other.update_metadatas_batch(["msg_2"], [{"n": 20}])
+    assert store.get_email("msg_2")["metadata"] == {"n": 20}
+    # The logged swap moves the other store over before it reads anything
+    third = EmailStore(persist_dir=store._persist_dir)
+    third.metadata_mirror()
+    store.rebuild_emails_collection(m=16)
+    third.refresh_mirror()
+    assert third._emails.collection.id == store._emails.collection.id
+    assert third.count() == 2
+
+
+@pytest.mark.skipif(settings.store_backend != "chroma", reason="HNSW and SQLite files are Chroma's")
+def test_maintenance_compacts_and_vacuums(store):
+    vectors = np.random.default_rng(0).normal(size=(1500, 384)).astype(np.float32)
+    ids = [f"msg_{i}" for i in range(1500)]
+    store.upsert_emails_batch(ids, ["body " * 200] * 1500, vectors, [{"n": i} for i in range(1500)])
+    store.delete_emails(ids[:1000])
+
+    hnsw = store.maintenance_stats()["collections"]["emails"]["hnsw"]
+    assert hnsw["tombstones"] == 1000
+    assert hnsw["tombstone_ratio"] == pytest.approx(2 / 3)
+
+    # The HNSW rebuild swaps collections, so it only runs when asked for
+    result = store.run_maintenance(vacuum=False)
+    assert result["compacted"] == []
+    assert result["hnsw_rebuild_due"]
+
+    result = store.run_maintenance(rebuild_hnsw=True)
+    assert result["compacted"] == ["emails"]
+    assert not result["hnsw_rebuild_due"]
+    assert "chroma.sqlite3" in result["vacuumed"]
+    after = result["stats"]
+    assert after["collections"]["emails"]["count"] == 500
+    assert after["databases"]["chroma.sqlite3"]["free_pages"] == 0
+    assert store.query(vectors[1200].tolist(), n_results=1)["ids"] == [["msg_1200"]]
+    # Nothing left past the thresholds
+    assert store.run_maintenance(rebuild_hnsw=True)["compacted"] == []
+
+
+def test_metadata_mirror_snapshots_and_catch_up(tmp_path):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    store.upsert_emails_batch(["m1", "m2"], ["a", "b"], [[0.1] * 384] * 2, [{"subject": "A"}, {"subject": "B"}])
+    before = store.metadata_mirror()
+
+    store.update_metadatas_batch(["m1"], [{"is_read": True}])
+    store.delete_emails(["m2"])
+    after = store.metadata_mirror()
+    assert dict(before) == {"m1": {"subject": "A"}, "m2": {"subject": "B"}}
+    assert dict(after) == {"m1": {"subject": "A", "is_read": True}}
+    assert store.get_metadatas(["m1", "m2"]) == {"m1": {"subject": "A", "is_read": True}}
+
+    # Another process's writes arrive through the change log; a restart starts from the saved mirror
+    other = EmailStore(persist_dir=str(tmp_path / "data"))
+    other.upsert_emails_batch(["m3"], ["c"], [[0.3] * 384], [{"subject": "C", "account_id": "work"}])
+    assert [gid for gid, _ in store.refresh_mirror().select(account_id="work")] == ["m3"]
+    store.close()
+    reopened = EmailStore(persist_dir=str(tmp_path / "data"))
+    assert list(reopened.metadata_mirror()) == ["m1", "m3"]
+
+
+def test_reupsert_merges_metadata_like_chroma(tmp_path):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    store.upsert_email("m1", "a", [0.1] * 384, {"subject": "A", "category": "Work"})
+    store.upsert_email("m1", "b", [0.1] * 384, {"subject": "B"})
+    assert store.get_email("m1")["metadata"] == {"subject": "B", "category": "Work"}
+    assert store.get_metadatas(["m1"]) == {"m1": {"subject": "B", "category": "Work"}}
+    view = store.metadata_columns()
+    assert view.categories[view.category[0]] == "Work"
+
+    # Catching up on another process's writes takes Chroma's whole record, not a merge
+    other = EmailStore(persist_dir=str(tmp_path / "data"))
+    other.delete_emails(["m1"])
+    other.upsert_email("m1", "c", [0.1] * 384, {"subject": "C"})
+    assert dict(store.refresh_mirror()) == {"m1": {"subject": "C"}}
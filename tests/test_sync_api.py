@@ -0,0 +1,139 @@
+import base64
+import json
+import time
+import types
+
+import pytest
+from fastapi import HTTPException
+
+from api.routers import push as push_router
+from api.routers import sync
+from gmail_parser.store import EmailStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = EmailStore(persist_dir=str(tmp_path / "test_data"))
+    monkeypatch.setattr(sync, "get_store", lambda: store)
+    yield store
+    store.close()
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_categorize_runs_as_a_background_job(store, monkeypatch):
+    store.upsert_emails_batch(
+        ["a", "b", "c"],
+        ["x", "y", "z"],
+        [[0.1] * 384] * 3,
+        [{"subject": "Invoice"}, {"subject": "Lunch"}, {"subject": "Invoice due"}],
+    )
+    monkeypatch.setattr(sync, "do_categorize", lambda m: "Finance" if "Invoice" in m["subject"] else "Personal")
+
+    assert sync.categorize_emails() == {"message": "Categorization started"}
+    _wait_for(lambda: not sync.categorize_status()["is_running"])
+
+    status = sync.categorize_status()
+    assert status["error"] is None
+    assert (status["processed"], status["total"], status["updated"]) == (3, 3, 3)
+    assert status["categories"] == {"Finance": 2, "Personal": 1}
+    assert store.get_email("b")["metadata"]["category"] == "Personal"
+
+
+@pytest.fixture
+def push(store, monkeypatch):
+    """Fresh push state, with the debouncer replaced by a list of the accounts it was given."""
+    triggered = []
+    monkeypatch.setattr(sync, "_states", {})
+    monkeypatch.setattr(sync, "_push_state", {"received": 0, "stale": 0, "syncs": 0, "last_received": None})
+    monkeypatch.setattr(sync, "_push_pending", set())
+    monkeypatch.setattr(sync, "_account_addresses", {"me@example.com": "default"})
+    monkeypatch.setattr(sync, "_unknown_addresses", {})
+    monkeypatch.setattr(sync, "_push_debouncer", types.SimpleNamespace(trigger=triggered.append))
+    return triggered
+
+
+def _envelope(address: str, history_id: int) -> dict:
+    data = base64.b64encode(json.dumps({"emailAddress": address, "historyId": history_id}).encode()).decode()
+    return {"message": {"data": data, "messageId": "m1"}, "subscription": "s"}
+
+
+def test_push_notification_is_queued_unless_stale(store, push):
+    store.update_sync_state({"last_history_id": "100"})
+
+    assert sync.handle_push_notification(_envelope("me@example.com", 90)) == {
+        "accepted": True, "queued": False, "account": "default"
+    }
+    assert push == []
+    assert sync.handle_push_notification(_envelope("Me@Example.com", 120)) == {
+        "accepted": True, "queued": True, "account": "default"
+    }
+    assert push == ["default"]
+    assert (sync._push_state["received"], sync._push_state["stale"]) == (2, 1)
+
+
+def test_push_for_an_unknown_mailbox_is_ignored_and_remembered(push, monkeypatch):
+    lookups = []
+
+    class FailingClient:
+        def __init__(self, auth):
+            pass
+
+        def get_profile(self):
+            lookups.append(1)
+            raise ConnectionError("token expired")
+
+    monkeypatch.setattr(sync, "GmailAuth", lambda account_id: account_id)
+    monkeypatch.setattr(sync, "GmailClient", FailingClient)
+    monkeypatch.setattr(sync.parser_settings, "account_list", lambda: ["default", "work"])
+
+    for _ in range(3):
+        assert sync.handle_push_notification(_envelope("stranger@example.com", 5)) == {
+            "accepted": False, "reason": "unknown mailbox"
+        }
+    assert len(lookups) == 1  # only "work" was looked up, and only once within the TTL
+    assert push == []
+
+    monkeypatch.setattr(sync, "_UNKNOWN_ADDRESS_TTL_SECS", 0)
+    sync.handle_push_notification(_envelope("stranger@example.com", 5))
+    assert len(lookups) == 2
+
+
+def test_push_during_a_sync_runs_one_more_when_it_finishes(push, monkeypatch):
+    started = []
+    monkeypatch.setattr(sync, "_run_incremental", started.append)
+    with sync._lock:
+        sync._state_for("default")["is_syncing"] = True
+
+    sync._on_push_ready("default")
+    sync._on_push_ready("default")
+    assert started == [] and sync._push_pending == {"default"}
+
+    sync._sync_finished("default")
+    _wait_for(lambda: started)
+    assert started == ["default"]
+    assert sync._push_pending == set()
+    assert sync._state_for("default")["is_syncing"]  # the queued sync holds the slot
+
+
+def test_webhook_checks_the_push_token(push, monkeypatch):
+    monkeypatch.setattr(push_router.settings, "push_token", "")
+    with pytest.raises(HTTPException) as e:
+        push_router.gmail_push(_envelope("me@example.com", 120), token="")
+    assert e.value.status_code == 404
+
+    monkeypatch.setattr(push_router.settings, "push_token", "s3cret")
+    with pytest.raises(HTTPException) as e:
+        push_router.gmail_push(_envelope("me@example.com", 120), token="guess")
+    assert e.value.status_code == 403
+    assert push == []
+
+    assert push_router.gmail_push(_envelope("me@example.com", 120), token="s3cret")["queued"]
+    assert push == ["default"]
+    # A malformed message is acknowledged so Pub/Sub doesn't redeliver it
+    assert push_router.gmail_push({"message": {}}, token="s3cret")["accepted"] is False
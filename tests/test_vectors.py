@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from gmail_parser.exceptions import StoreError
+from gmail_parser.store import EmailStore
+from gmail_parser.vectors import VectorIndex
+
+
+def _vectors(n, dim=32, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_search_ranks_by_cosine(tmp_path, dtype):
+    vectors = _vectors(200)
+    index = VectorIndex(tmp_path, dtype)
+    index.upsert([f"m{i}" for i in range(200)], vectors)
+
+    query = vectors[17] + 0.01
+    hits = index.search(query, 5)
+    assert hits[0][0] == "m17"
+    assert hits[0][1] == pytest.approx(1.0, abs=0.02)
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+
+def test_delete_reuses_rows_and_persists(tmp_path):
+    vectors = _vectors(3)
+    index = VectorIndex(tmp_path, "int8")
+    index.upsert(["a", "b", "c"], vectors)
+    index.delete(["b"])
+    assert [gid for gid, _ in index.search(vectors[1], 3)] in (["a", "c"], ["c", "a"])
+
+    index.upsert(["d"], vectors[1:2])
+    index.advance(9)
+    index.flush()
+
+    reloaded = VectorIndex(tmp_path, "int8")
+    assert reloaded.load()
+    assert isinstance(reloaded._codes, np.memmap)
+    assert reloaded.version == 9
+    assert len(reloaded) == 3
+    assert reloaded.search(vectors[1], 1)[0][0] == "d"
+
+
+def test_store_rejects_unknown_vector_index(tmp_path):
+    with pytest.raises(StoreError):
+        EmailStore(persist_dir=str(tmp_path / "data"), vector_index="float8")
+
+
+def test_exact_index_matches_brute_force(tmp_path):
+    vectors = _vectors(500)
+    index = VectorIndex(tmp_path, "float32")
+    index.upsert([f"m{i}" for i in range(500)], vectors)
+    query = _vectors(1, seed=5)[0]
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ (query / np.linalg.norm(query))))[:10]
+    hits = index.search(query, 10)
+    assert [gid for gid, _ in hits] == [f"m{i}" for i in expected]
+
+
+@pytest.mark.parametrize("backend", ["exact", "int8"])
+def test_store_queries_through_sidecar(tmp_path, backend):
+    vectors = _vectors(50, dim=384)
+    ids = [f"m{i}" for i in range(50)]
+    metadatas = [{"subject": f"S{i}", "date_timestamp": i} for i in range(50)]
+    store = EmailStore(persist_dir=str(tmp_path / "data"), vector_index=backend)
+    store.upsert_emails_batch(ids, [f"body {i}" for i in range(50)], vectors, metadatas)
+
+    result = store.query(vectors[3].tolist(), n_results=3)
+    assert result["ids"][0][0] == "m3"
+    assert result["metadatas"][0][0]["subject"] == "S3"
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-5)
+
+    hnsw = EmailStore(persist_dir=str(tmp_path / "data"))
+    assert hnsw.query(vectors[3].tolist(), n_results=3)["ids"] == result["ids"]
+
+    # Writes from another store instance are picked up from the change log
+    hnsw.delete_emails(["m3"])
+    hnsw.upsert_emails_batch(["new"], ["fresh"], vectors[3:4], [{"subject": "New"}])
+    assert store.query(vectors[3].tolist(), n_results=1)["ids"] == [["new"]]
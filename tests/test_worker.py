@@ -0,0 +1,153 @@
+import functools
+import socket
+import threading
+import time
+from contextlib import suppress
+from multiprocessing.connection import Listener
+
+import pytest
+from fastapi import HTTPException
+
+from api import cache, worker
+from gmail_parser.store import EmailStore
+
+AUTHKEY = b"test-key"
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _serve(address) -> Listener:
+    listener = Listener(address, authkey=AUTHKEY)
+
+    def run():
+        with suppress(OSError):
+            worker._accept(listener)
+
+    threading.Thread(target=run, daemon=True).start()
+    return listener
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    monkeypatch.setattr(worker, "COMMANDS", {})
+    monkeypatch.setattr(worker, "_subscribers", [])
+    monkeypatch.setattr(worker, "_RECONNECT_SECS", 0.05)
+    return worker.COMMANDS
+
+
+@pytest.fixture
+def connected(commands, monkeypatch):
+    """A worker serving on a thread, and the API-side client routed to it."""
+    listener = _serve(("127.0.0.1", 0))
+    client = worker.WorkerClient(listener.address, AUTHKEY)
+    monkeypatch.setattr(worker, "_client", client)
+    yield client
+    client.close()
+    listener.close()
+
+
+def test_commands_are_forwarded_to_the_worker(connected):
+    ran_on = []
+
+    @worker.command
+    def add(a, b=0):
+        ran_on.append(threading.current_thread())
+        return a + b
+
+    assert add(2, b=3) == 5
+    assert ran_on and ran_on[0] is not threading.current_thread()
+
+
+def test_command_errors_keep_their_status(connected):
+    @worker.command
+    def busy():
+        raise HTTPException(status_code=409, detail="Sync already in progress")
+
+    @worker.command
+    def broken():
+        raise ValueError("boom")
+
+    with pytest.raises(HTTPException) as e:
+        busy()
+    assert (e.value.status_code, e.value.detail) == (409, "Sync already in progress")
+    with pytest.raises(HTTPException) as e:
+        broken()
+    assert (e.value.status_code, e.value.detail) == (500, "boom")
+
+
+def test_bad_auth_key_is_rejected(connected):
+    @worker.command
+    def ping():
+        return "pong"
+
+    intruder = worker.WorkerClient(connected._address, b"wrong-key")
+    try:
+        with pytest.raises(HTTPException) as e:
+            intruder.call("ping")
+        assert e.value.status_code == 503
+    finally:
+        intruder.close()
+    assert ping() == "pong"  # the worker keeps serving
+
+
+def test_subscriber_mirrors_invalidations(connected, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(cache, "invalidate", lambda *keys: invalidated.append(keys))
+    _wait_for(lambda: len(worker._subscribers) == 1)
+
+    worker._broadcast(("rules", "overrides"))
+    _wait_for(lambda: invalidated)
+    assert invalidated == [("rules", "overrides")]
+
+
+def test_cache_is_cleared_once_per_connection(commands, monkeypatch):
+    clears = []
+    monkeypatch.setattr(cache, "clear", lambda: clears.append(1))
+    address = ("127.0.0.1", _free_port())
+    client = worker.WorkerClient(address, AUTHKEY)
+    try:
+        time.sleep(0.3)  # several reconnect attempts while the worker is down
+        assert clears == []
+
+        listener = _serve(address)
+        try:
+            _wait_for(lambda: clears)
+            time.sleep(0.2)
+            assert clears == [1]
+        finally:
+            listener.close()
+    finally:
+        client.close()
+
+
+def test_store_writes_and_queries_are_forwarded(connected, tmp_path, monkeypatch):
+    owner = EmailStore(persist_dir=str(tmp_path / "test_data"), vector_index="hnsw")
+    api_side = EmailStore(persist_dir=str(tmp_path / "test_data"), vector_index="hnsw")
+    monkeypatch.setattr(worker, "get_store", lambda: owner)
+    worker.COMMANDS["store"] = worker._store
+    api_side.forward_to(functools.partial(connected.call, "store"))
+    try:
+        api_side.metadata_mirror()
+        api_side.upsert_emails_batch(["a", "b"], ["x", "y"], [[1.0] + [0.0] * 383, [0.0, 1.0] + [0.0] * 382],
+                                     [{"subject": "A"}, {"subject": "B"}])
+        assert owner.writer_stats()["writes"] == 1
+        assert api_side.writer_stats()["writes"] == 0
+        assert api_side.metadata_mirror()["b"]["subject"] == "B"
+
+        api_side.update_metadatas_batch(["a"], [{"is_read": True}], wait=False)
+        assert owner.get_email("a")["metadata"]["is_read"] is True
+        assert api_side.query([1.0] + [0.0] * 383, n_results=1)["ids"] == [["a"]]
+    finally:
+        api_side.close()
+        owner.close()
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from gmail_parser.store import EmailStore
+from gmail_parser.writer import UPDATE_EMAILS, UPSERT_EMAILS, StoreWriter
+
+
+def _held(writer: StoreWriter) -> threading.Event:
+    """Park the writer thread until the returned event is set, so writes queue up behind it."""
+    release, parked = threading.Event(), threading.Event()
+    writer.call(lambda: (parked.set(), release.wait()))
+    parked.wait()
+    return release
+
+
+def test_queued_updates_are_merged_into_one_batch():
+    applied = []
+    writer = StoreWriter(lambda kind, args: applied.append((kind, args)))
+    release = _held(writer)
+    futures = [
+        writer.submit(UPDATE_EMAILS, ["m1"], [{"is_read": True}]),
+        writer.submit(UPDATE_EMAILS, ["m2", "m1"], [{"category": "Work"}, {"is_starred": True}]),
+    ]
+    release.set()
+    for f in futures:
+        f.result(timeout=5)
+    writer.close()
+
+    assert applied == [(UPDATE_EMAILS, (["m1", "m2"], [{"is_read": True, "is_starred": True}, {"category": "Work"}]))]
+    assert writer.stats() == {"writes": 3, "batches": 2, "queued": 0}
+
+
+def test_queued_upserts_of_an_id_merge_metadata():
+    applied = []
+    writer = StoreWriter(lambda kind, args: applied.append(args))
+    release = _held(writer)
+    futures = [
+        writer.submit(UPSERT_EMAILS, ["m1"], ["a"], [[0.1]], [{"subject": "A", "category": "Work"}]),
+        writer.submit(UPSERT_EMAILS, ["m1"], ["b"], [[0.2]], [{"subject": "B"}]),
+    ]
+    release.set()
+    for f in futures:
+        f.result(timeout=5)
+    writer.close()
+
+    ids, documents, embeddings, metadatas = applied[-1]
+    assert (ids, documents) == (["m1"], ["b"])
+    assert embeddings.tolist() == [[pytest.approx(0.2)]]
+    assert metadatas == [{"subject": "B", "category": "Work"}]
+
+
+def test_a_failing_write_does_not_fail_the_writes_merged_with_it():
+    def apply(kind, args):
+        if "bad" in args[0]:
+            raise ValueError("bad id")
+
+    writer = StoreWriter(apply)
+    release = _held(writer)
+    good = writer.submit(UPDATE_EMAILS, ["m1"], [{}])
+    bad = writer.submit(UPDATE_EMAILS, ["bad"], [{}])
+    release.set()
+    good.result(timeout=5)
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    writer.close()
+
+
+def test_store_writes_return_futures(tmp_path):
+    store = EmailStore(persist_dir=str(tmp_path / "data"))
+    future = store.upsert_emails_batch(["m1"], ["body"], [[0.1] * 384], [{"subject": "A"}], wait=False)
+    store.update_metadatas_batch(["m1"], [{"is_read": True}], wait=False).result(timeout=10)
+    assert future.done()
+    assert store.get_email("m1")["metadata"] == {"subject": "A", "is_read": True}
+    store.close()